@@ -2,26 +2,65 @@ from __future__ import annotations
 
 import os
 import socket
-import subprocess
-from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Sequence
 
-from PySide6.QtCore import QObject
+from PySide6.QtCore import QObject, Signal, Slot
 from PySide6.QtWidgets import QMessageBox
 
 from core.adb_manager import AdbManager
+from core.agent_client import AgentClient, AgentError
+from core.apk_manifest import ApkInfo, ApkParseError, read_apk_info
 from core.appium_manager import AppiumManager
-from core.constants import LOGIN_FIRST_TEXT, LOGIN_SECOND_TEXT, LOGIN_SCREEN_TEXTS
+from core.appium_servers import AppiumServerPool
+from core.constants import (
+    JOB_TIMEOUTS,
+    FREETV_MAIN_ACTIVITY,
+    FREETV_PROD_PACKAGE,
+    LOGIN_FIRST_TEXT,
+    LOGIN_SECOND_TEXT,
+    LOGIN_SCREEN_TEXTS,
+    VISUAL_RUNS_DIR,
+)
+from core.frame_stats import FrameSample, JankSampler
+from core.input_latency import InputLatencyProbe, LatencyResult
+from core.locator_cache import LocatorCache
+from core.jobs import PRIORITY_KEY, PRIORITY_NORMAL, Job, JobScheduler
 from core.logger import logger
+from core.preconditions import APPIUM_UP, DEVICE_ONLINE, FOREGROUND, SESSION_HEALTHY
+from core.rcu_manager import RcuManager, parse_key_sequence
+from core.scenario import Scenario, ScenarioReport, ScenarioRunner, StepResult
+from core.uia2_client import Uia2Driver
+from core.visual_diff import Sweep, VisualReport, VisualSweepRunner
 
 
 class AndroidManagerController(QObject):
-    def __init__(self, *, log_cb: Callable[[str, str], None], app_host: str, app_port: int, parent=None) -> None:
+    # Error popups requested from job workers are shown on the GUI thread (queued connection).
+    sigPopupError = Signal(str, str)
+
+    def __init__(self, *, log_cb: Callable[[str, str], None], app_host: str, app_port: int,
+                 agent_url: Optional[str] = None, agent_token: Optional[str] = None, parent=None) -> None:
         super().__init__(parent)
+        self.sigPopupError.connect(self._show_popup)
         self._log_cb = log_cb
         self._host = app_host
         self._port = app_port
         self.adb_manager = AdbManager(self._log)
-        self.appium_manager = AppiumManager(self._log, parent=self, host=self._host, port=self._port)
+        # Element locations per (resolution, app version, screen), shared by every Appium session.
+        self.locators = LocatorCache()
+        self.appium_manager = AppiumManager(self._log, parent=self, host=self._host, port=self._port,
+                                            locators=self.locators)
+        self.appium_servers = AppiumServerPool(self._log, host=self._host)
+        self._device_appium: dict[str, AppiumManager] = {}  # per-device sessions on pooled servers
+        self.direct_uia2 = False  # new sessions skip Appium and talk to UiAutomator2 directly
+        self.apk_info: Optional[ApkInfo] = None
+        # Verified facts (device online, Appium up, session, foreground) with TTLs; see core.preconditions.
+        self.preconditions = self.adb_manager.preconditions
+        self._session_device: Optional[str] = None  # device the current Appium session was created for
+        # Device operations run as jobs: one serial queue per device, priorities, cancel / timeouts.
+        self.jobs = JobScheduler(normalize=AdbManager.serial)
+        # Client mode: device operations go to a shared agent (see core.agent) instead of the local adb.
+        self.agent = AgentClient(agent_url, token=agent_token) if agent_url else None
 
     # ---- logging helpers ----
 
@@ -31,8 +70,11 @@ class AndroidManagerController(QObject):
         except Exception:
             pass
 
-    @staticmethod
-    def _popup_error(title: str, message: str) -> None:
+    def _popup_error(self, title: str, message: str) -> None:
+        self.sigPopupError.emit(title, message)
+
+    @Slot(str, str)
+    def _show_popup(self, title: str, message: str) -> None:
         QMessageBox.critical(None, title, message)
 
     # ---- utils ----
@@ -51,90 +93,409 @@ class AndroidManagerController(QObject):
         lines = [ln for ln in adb_list_output.splitlines() if ln.strip() and not ln.startswith("List")]
         return any("\tdevice" in ln for ln in lines)
 
+    def _device_online(self, device_ip: Optional[str]) -> bool:
+        output = self.adb_manager.list_devices()
+        if not device_ip:
+            return self._has_connected_devices(output)
+        return f"{self.adb_manager.serial(device_ip)}\tdevice" in output
+
+    def _screen_context(self, device_ip: Optional[str], package: str) -> tuple[str, str]:
+        """(resolution, app version) keying the locator cache; served from AdbManager's caches when known."""
+        props = self.adb_manager.props.get(device_ip)
+        size = f"{props.screen_size[0]}x{props.screen_size[1]}" if props and props.screen_size else "?"
+        inv = self.adb_manager.inventory.snapshot().get(self.adb_manager.serial(device_ip)) if device_ip else None
+        info = inv.version_of(package) if inv is not None else None
+        if info is not None:
+            return size, info.version_name or str(info.version_code)
+        out = self.adb_manager.run(["adb", "shell", f"dumpsys package {package} | grep -m1 versionName"], device_ip)
+        return size, out.split("versionName=", 1)[1].strip() if "versionName=" in out else "?"
+
+    def _remote(self, operation: str, device_ip: Optional[str], *, priority: str = "normal", **params):
+        """Run an operation on the agent (blocking); failures are logged and re-raised."""
+        try:
+            return self.agent.run(operation, device_ip or None, priority=priority, **params)
+        except AgentError as e:
+            self._log(str(e), "ERROR")
+            raise
+
     @staticmethod
     def _valid_phone(phone: str) -> bool:
         phone = (phone or "").strip()
         return phone.startswith("05") and len(phone) in (10, 11) and phone.isdigit()
 
+    # ---- Fleet ----
+    def start_fleet_monitor(self, update: Callable[[str, dict], None]) -> None:
+        """Feed the device table: `update(serial, fields)` is called from worker threads (see core.fleet)."""
+        if self.agent is None:
+            self.adb_manager.fleet.start(update)
+            return
+        self._log(f"Client mode: device operations run on the agent at {self.agent.url}")
+
+        def _on_event(event: dict) -> None:
+            if event["type"] == "device":
+                update(event["serial"], event["fields"])
+            elif event["type"] == "log" and event.get("job") in self.agent.own_jobs:
+                self._log(f"[agent] {event['msg']}", event["level"])
+
+        self.agent.subscribe(_on_event)
+
+    # ---- Jobs ----
+    def schedule(self, operation: str, action: Callable[[Optional[str]], object],
+                 device_ips: Sequence[Optional[str]], *, priority: int = PRIORITY_NORMAL,
+                 timeout: Optional[float] = None) -> list[Job]:
+        """
+        Queue action(device_ip) as one job per target (see core.jobs); returns immediately.
+        Jobs on the same device run one at a time; the device table shows each job's result.
+        """
+        timeout = JOB_TIMEOUTS.get(operation, JOB_TIMEOUTS["default"]) if timeout is None else timeout
+        return [
+            self.jobs.submit(ip, operation, lambda _cancel, ip=ip: action(ip), priority=priority, timeout=timeout)
+            for ip in (list(device_ips) or [None])
+        ]
+
+    def send_key(self, name: str, code: int, *, device_ips: Sequence[Optional[str]]) -> None:
+        """RCU key as a high-priority job: it runs before anything still queued for the device."""
+        def _press(device_ip: Optional[str]) -> None:
+            if self.agent is not None:
+                out = self._remote("key", device_ip, priority="key", key=code,
+                                   backend=self.adb_manager.key_backend)  # the RCU dialog's choice applies on the agent too
+            else:
+                out = self.adb_manager.keyevent(code, device_ip=device_ip)
+            self._log(f"RCU: {name} ({code}) → {out}")
+
+        self.schedule(f"key {name}", _press, device_ips, priority=PRIORITY_KEY)
+
     # ---- ADB ops ----
     def connect_device(self, ip: str) -> None:
         if not ip:
             self._popup_error("Missing IP", "No IP provided.")
             logger.error("No IP provided.")
             return
-        self._log(self.adb_manager.connect(ip))
+        self._log(self._remote("connect", ip) if self.agent is not None else self.adb_manager.connect(ip))
 
     def disconnect_device(self) -> None:
-        self._log(self.adb_manager.disconnect())
+        self._log(self._remote("disconnect", None) if self.agent is not None else self.adb_manager.disconnect())
+
+    def discover_devices(self, cidrs: list[str], *, connect: bool = True) -> list[str]:
+        """Scan CIDR ranges for wireless-ADB devices (blocking; run off the GUI thread)."""
+        devices = self.adb_manager.discover(cidrs, connect=connect)
+        return [d.address for d in devices]
 
     def list_devices(self) -> None:
-        self._log(self.adb_manager.list_devices())
+        self._log(self._remote("list_devices", None) if self.agent is not None else self.adb_manager.list_devices())
 
     def reboot_device(self, *, device_ip: Optional[str] = None) -> None:
+        if self.agent is not None:
+            self._log(self._remote("reboot", device_ip))
+            return
         self._log(self.adb_manager.reboot_device(device_ip=device_ip))
 
-    def install_apk(self, apk_path: str, *, device_ip: Optional[str] = None) -> None:
-        if not apk_path or not apk_path.endswith(".apk"):
+    def select_apk(self, apk_path: str | Sequence[str]) -> Optional[ApkInfo]:
+        """
+        Read the APK manifest (package, version, SDK, launcher) and remember it for install/launch.
+        For a set of split APKs the base APK's manifest is used.
+        """
+        paths = [apk_path] if isinstance(apk_path, str) else list(apk_path)
+        infos = []
+        for path in paths:
+            try:
+                infos.append(read_apk_info(path))
+            except (ApkParseError, OSError) as e:
+                self._log(f"Could not read APK metadata from {path}: {e}", "WARN")
+        base = next((i for i in infos if not i.split), None)
+        self.apk_info = base
+        if base is None:
+            return None
+        splits = [i.split for i in infos if i.split]
+        self._log(f"APK metadata: {base.summary()}" + (f" + splits: {', '.join(splits)}" if splits else ""))
+        return base
+
+    def install_apk(self, apk_path: str | Sequence[str], *, device_ip: Optional[str] = None,
+                    force: bool = False) -> None:
+        paths = [apk_path] if isinstance(apk_path, str) else list(apk_path)
+        if not paths or not all(p and p.endswith(".apk") for p in paths):
             self._popup_error("Invalid APK", "Invalid APK path.")
             logger.error("Invalid APK path.")
             return
-        self._log(self.adb_manager.install_apk(apk_path, device_ip=device_ip))
+        if self.agent is not None:
+            # The agent installs from its own copy; each APK is uploaded once per content.
+            remote = [self.agent.upload(p) for p in paths]
+            self._log(self._remote("install_apk", device_ip, priority="bulk", paths=remote))
+            return
+
+        if self.apk_info is not None and self.apk_info.path in paths:
+            info = self.apk_info
+        else:
+            info = self.select_apk(paths)
+        if info is not None:
+            props = self.adb_manager.get_device_props(device_ip=device_ip)
+            if props is not None and props.sdk and info.min_sdk > props.sdk:
+                msg = f"APK needs Android SDK {info.min_sdk}; device runs SDK {props.sdk} (Android {props.android_version})."
+                self._popup_error("Incompatible APK", msg)
+                logger.error(msg)
+                return
+            installed = self.adb_manager.installed_version_code(info.package, device_ip=device_ip)
+            if installed == info.version_code and not force:
+                self._log(
+                    f"{info.package} versionCode {installed} is already installed on "
+                    f"{device_ip or 'default'}; skipping install."
+                )
+                return
+        self._log(self.adb_manager.install_apk(paths if len(paths) > 1 else paths[0], device_ip=device_ip))
+
+    def launch_component_for(self, package: str) -> str:
+        """Launch component for a package: from the selected APK's manifest if it matches, else the default."""
+        if self.apk_info is not None and self.apk_info.package == package and self.apk_info.launch_component:
+            return self.apk_info.launch_component
+        return f"{package}/{FREETV_MAIN_ACTIVITY}"
+
+    def launch_package(self, package: str, *, device_ip: Optional[str] = None) -> None:
+        self.launch_activity(package_activity=self.launch_component_for(package), device_ip=device_ip)
 
     def launch_activity(self, *, package_activity: str, device_ip: Optional[str] = None) -> None:
-        res = self.adb_manager.launch_app(package_activity, device_ip=device_ip)
+        if self.agent is not None:
+            res = self._remote("launch", device_ip, component=package_activity)
+        else:
+            res = self.adb_manager.launch_app(package_activity, device_ip=device_ip)
         self._log(f"Launch result: {res}")
 
     def uninstall_package(self, package: str, *, device_ip: Optional[str] = None) -> None:
-        res = self.adb_manager.uninstall_package(package, device_ip=device_ip)
+        if self.agent is not None:
+            res = self._remote("uninstall", device_ip, package=package)
+        else:
+            res = self.adb_manager.uninstall_package(package, device_ip=device_ip)
         self._log(f"Uninstalled {package}: {res}")
 
     def kill_app(self, package: str, *, device_ip: Optional[str] = None) -> None:
-        res = self.adb_manager.kill_app(package, device_ip=device_ip)
+        if self.agent is not None:
+            res = self._remote("kill_app", device_ip, package=package)
+        else:
+            res = self.adb_manager.kill_app(package, device_ip=device_ip)
         self._log(f"Killed {package}: {res}")
 
     def clear_data(self, package: str, *, device_ip: Optional[str] = None) -> None:
-        res = self.adb_manager.clear_data(package, device_ip=device_ip)
+        if self.agent is not None:
+            res = self._remote("clear_data", device_ip, package=package)
+        else:
+            res = self.adb_manager.clear_data(package, device_ip=device_ip)
         self._log(f"Data cleared for {package}: {res}")
 
+    def fleet_inventory(self, target: Optional[dict[str, int]] = None) -> None:
+        """Log a table of FreeTV PROD/UAT builds on all connected devices (blocking; run off the GUI thread)."""
+        if target is None and self.apk_info is not None:
+            target = {self.apk_info.package: self.apk_info.version_code}
+        table = self.adb_manager.collect_inventory(target)
+        for line in table.splitlines():
+            self._log(line)
+
+    def push_files(self, local_path: str, remote_dir: str, *, device_ips: Optional[Sequence[str]] = None) -> None:
+        """Push a file/folder to one or more devices (blocking; run off the GUI thread)."""
+        if not os.path.exists(local_path):
+            self._log(f"Push failed, not found: {local_path}", "ERROR")
+            return
+        for report in self.adb_manager.push_files(local_path, remote_dir, device_ips=list(device_ips or [])):
+            if report.failures:
+                self._log(f"Push to {report.device} had {len(report.failures)} failure(s); run again to resume.",
+                          "ERROR")
+
+    def pull_files(self, remote_path: str, local_dir: str, *, device_ips: Optional[Sequence[str]] = None) -> None:
+        """Pull a remote file/folder from one or more devices (blocking; run off the GUI thread)."""
+        for report in self.adb_manager.pull_files(remote_path, local_dir, device_ips=list(device_ips or [])):
+            if report.failures:
+                self._log(f"Pull from {report.device} had {len(report.failures)} failure(s); run again to resume.",
+                          "ERROR")
+
+    def collect_diagnostics(self, out_dir: str, *, device_ips: Optional[Sequence[str]] = None,
+                            include_bugreport: bool = False) -> str:
+        """Collect a diagnostics bundle (blocking; run off the GUI thread). Returns the archive path."""
+        report = self.adb_manager.collect_diagnostics(
+            out_dir, device_ips=list(device_ips or []), include_bugreport=include_bugreport
+        )
+        for t in report.failed:
+            self._log(f"Diagnostics: {t.device}/{t.name} {t.outcome} after {t.duration:.1f}s", "WARN")
+        return report.archive
+
+    def benchmark_app_start(self, package: str, csv_path: str, *, iterations: int,
+                            device_ips: Optional[Sequence[str]] = None, clear_data: bool = False) -> str:
+        """Cold/warm start benchmark of a package, saved as CSV (blocking; run off the GUI thread)."""
+        result = self.adb_manager.benchmark_app_start(
+            self.launch_component_for(package),
+            device_ips=list(device_ips or []),
+            iterations=iterations,
+            clear_data=clear_data,
+            use_logcat=True,
+        )
+        result.write_csv(csv_path)
+        return csv_path
+
+    def measure_jank(self, package: str, sequence: str, *, device_ip: Optional[str] = None,
+                     csv_path: Optional[str] = None) -> FrameSample:
+        """
+        Play an RCU key sequence (e.g. "DOWN*20, UP*20") while sampling gfxinfo framestats and
+        return the jank score for it (blocking; run off the GUI thread).
+        """
+        keys = parse_key_sequence(sequence)
+        rcu = RcuManager(self.adb_manager, lambda *_: None)
+        sampler = JankSampler(self.adb_manager.run, package, device_ip, csv_path=csv_path)
+        result = sampler.measure(lambda: rcu.press_sequence(keys, device_ip=device_ip, delay=0.15))
+        self._log(
+            f"Jank ({package}, {sequence}): {result.jank_pct:.1f}% of {result.frames} frames, "
+            f"p90 {result.p90_ms:.1f}ms, p99 {result.p99_ms:.1f}ms"
+        )
+        return result
+
+    def measure_key_latency(self, package: str, sequence: str, *, iterations: int,
+                            device_ips: Optional[Sequence[str]] = None,
+                            csv_path: Optional[str] = None) -> LatencyResult:
+        """
+        Key-to-screen latency of a package per key and device, with the injection overhead
+        reported separately (see core.input_latency; blocking, run off the GUI thread).
+        """
+        keys = parse_key_sequence(sequence)
+        devices = list(device_ips or [])
+        self._log(f"Measuring key latency of {package} ({sequence} x{iterations}) on {', '.join(devices or ['default'])}")
+        result = InputLatencyProbe(self.adb_manager, package).run(devices, keys, iterations=iterations)
+        for line in result.summary().splitlines():
+            self._log(line)
+        if csv_path:
+            result.write_csv(csv_path)
+            self._log(f"Key latency samples saved: {csv_path}")
+        return result
+
+    def run_scenario(self, scenario: Scenario, variables: dict[str, str], *,
+                     device_ips: Optional[Sequence[str]] = None,
+                     report_path: Optional[str] = None) -> ScenarioReport:
+        """
+        Run a declarative scenario (see core.scenario and scenarios/) on the given devices in
+        parallel; optionally saves the per-step report as .json or .csv (blocking; run off the GUI thread).
+        """
+        devices = list(device_ips or [])
+        self._log(f"Running scenario '{scenario.name}' on {', '.join(devices or ['default'])}")
+        if self.agent is not None:
+            report = self._run_scenario_remote(scenario, variables, devices)
+        else:
+            report = ScenarioRunner(self.adb_manager, self._log).run(scenario, devices, variables)
+        for line in report.summary().splitlines():
+            self._log(line, "INFO" if report.ok else "WARN")
+        if report_path:
+            if report_path.lower().endswith(".csv"):
+                report.write_csv(report_path)
+            else:
+                report.write_json(report_path)
+            self._log(f"Scenario report saved: {report_path}")
+        return report
+
+    def _run_scenario_remote(self, scenario: Scenario, variables: dict[str, str],
+                             devices: list[str]) -> ScenarioReport:
+        """One agent job per device (they run in parallel there); the per-device reports are merged."""
+        params = {"scenario": scenario.to_dict(), "variables": variables}
+        report = ScenarioReport(scenario.name)
+        for job in self.agent.submit("scenario", devices, params):
+            job = self.agent.wait(job["id"])
+            if job["state"] != "done":
+                self._log(f"Scenario on {job['device']} {job['state']}: {job['error']}", "ERROR")
+                continue
+            report.results.extend(StepResult(**r) for r in job["result"]["results"])
+            report.duration = max(report.duration, job["result"]["duration"])
+        return report
+
+    def visual_sweep(self, sweep: Sweep, *, device_ips: Optional[Sequence[str]] = None,
+                     baseline_dir: Optional[str] = None, reference: Optional[str] = None) -> VisualReport:
+        """
+        Capture a screenshot sweep (see core.visual_diff and visual/) on the given devices and compare
+        it with a baseline folder or a reference device; report.html / report.csv land in the run
+        folder under VISUAL_RUNS_DIR (blocking; run off the GUI thread).
+        """
+        devices = list(device_ips or [])
+        self._log(f"Visual sweep '{sweep.name}' ({len(sweep.screens)} screens) on "
+                  f"{', '.join(devices or ['default'])} vs {baseline_dir or f'device {reference}'}")
+        report = VisualSweepRunner(self.adb_manager, self._log).run(
+            sweep, devices, VISUAL_RUNS_DIR, baseline_dir=baseline_dir, reference=reference
+        )
+        for line in report.summary().splitlines():
+            self._log(line, "INFO" if report.ok else "WARN")
+        self._log(f"Visual report: {os.path.abspath(os.path.join(report.run_dir, 'report.html'))}")
+        return report
+
     def get_device_ip(self) -> str:
         return self.adb_manager.get_device_ip()
 
+    def show_device_info(self, *, device_ip: Optional[str] = None, refresh: bool = False) -> None:
+        if self.agent is not None:
+            self._log(f"Device info ({device_ip or 'default'}): {self._remote('device_info', device_ip, refresh=refresh)}")
+            return
+        props = self.adb_manager.get_device_props(device_ip=device_ip, refresh=refresh)
+        if props is None:
+            self._log(f"Could not read device info from {device_ip or 'default'}.", "ERROR")
+            return
+        self._log(f"Device info ({device_ip or 'default'}): {props.summary()}")
+
     # add near other ADB ops
     def go_home(self, *, device_ip: Optional[str] = None) -> None:
         """Send HOME key to a device to background the current app."""
         self._log(f"Sending HOME to {device_ip or 'default'}")
-        res = self.adb_manager.keyevent(3, device_ip=device_ip)  # 3 = KEYCODE_HOME
+        if self.agent is not None:
+            res = self._remote("key", device_ip, priority="key", key=3)
+        else:
+            res = self.adb_manager.keyevent(3, device_ip=device_ip)  # 3 = KEYCODE_HOME
         self._log(f"HOME result: {res}")
 
     # ---- Appium lifecycle ----
-    def start_appium(self) -> None:
-        try:
-            if self._port_open(self._host, self._port):
-                self._log(f"Appium already running on {self._host}:{self._port}")
-                return
-            start_script = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "start_appium.sh")
-            if os.path.exists(start_script):
-                subprocess.Popen(["bash", start_script], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                self._log("Attempted to start Appium via scripts/start_appium.sh")
-            else:
-                subprocess.Popen(["appium"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                self._log("Appium server start requested (direct).")
-        except Exception as e:
-            self._popup_error("Appium Error", f"Failed to start Appium server:\n{e}")
-            logger.error("Failed to start Appium server: %s", e)
+    def start_appium(self, *, device_ips: Optional[Sequence[str]] = None) -> None:
+        """
+        Start one supervised Appium server per device (or the default server on the configured
+        port when no device is given) and wait until each answers /status (blocking; run off the GUI thread).
+        """
+        self.preconditions.invalidate(facts=[APPIUM_UP, SESSION_HEALTHY])
+        devices = [self.adb_manager.serial(ip) for ip in device_ips or []] or [None]
+        with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+            futures = {pool.submit(self.appium_servers.start, d): d for d in devices}
+        for future, device in futures.items():
+            try:
+                server = future.result()
+                if server.device:
+                    self._log(f"Appium for {server.device}: http://{self._host}:{server.port} "
+                              f"(systemPort {server.system_port})")
+            except (OSError, RuntimeError) as e:
+                self._log(f"Failed to start Appium for {device or 'default'}: {e}", "ERROR")
+                logger.error("Failed to start Appium server: %s", e)
 
     def kill_appium(self) -> None:
-        try:
-            kill_script = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "kill_appium.sh")
-            if os.path.exists(kill_script):
-                subprocess.call(["bash", kill_script])
-                self._log("Requested Appium stop via scripts/kill_appium.sh")
-            else:
-                subprocess.call(["pkill", "-f", "appium"])
-                self._log("Appium server kill requested (pkill).")
-        except Exception as e:
-            self._popup_error("Appium Error", f"Failed to kill Appium server:\n{e}")
-            logger.error("Failed to kill Appium server: %s", e)
+        """Stop only the Appium servers this tool started (other Appium instances are left alone)."""
+        self.preconditions.invalidate(facts=[APPIUM_UP, SESSION_HEALTHY])
+        for manager in [self.appium_manager, *self._device_appium.values()]:
+            manager.close_driver()
+        self._device_appium.clear()
+        stopped = self.appium_servers.stop_all()
+        self._log(f"Stopped {stopped} Appium server(s) started by this tool." if stopped
+                  else "No Appium servers started by this tool are running.")
+
+    def appium_for(self, device_ip: Optional[str]) -> AppiumManager:
+        """The AppiumManager bound to the device's own server if one runs, else the default one."""
+        server = self.appium_servers.get(self.adb_manager.serial(device_ip)) if device_ip else None
+        if server is None or server.state != "ready":
+            return self.appium_manager
+        manager = self._device_appium.get(server.device)
+        if manager is None or manager.port != server.port:
+            manager = AppiumManager(self._log, parent=self, host=self._host, port=server.port,
+                                    locators=self.locators)
+            self._device_appium[server.device] = manager
+        return manager
+
+    def set_direct_uia2(self, enabled: bool) -> None:
+        """Choose the automation path for the next session (current sessions are replaced on next use)."""
+        self.direct_uia2 = enabled
+        self.preconditions.invalidate(facts=[SESSION_HEALTHY])
+        self._log(f"Automation path: {'direct UiAutomator2' if enabled else 'Appium server'}")
+
+    def shutdown(self) -> None:
+        """Called when the window closes: cancel queued jobs, stop our Appium servers, monkey key servers, the fleet monitor and the agent link."""
+        self.jobs.shutdown()
+        self.adb_manager.fleet.stop()
+        self.adb_manager.monkey.close_all()
+        if self.agent is not None:
+            self.agent.close()
+        self.appium_servers.stop_all()
 
     # ---- Account flow ----
     def connect_account(self, *, phone: str, device_ip: Optional[str] = None) -> None:
@@ -144,53 +505,75 @@ class AndroidManagerController(QObject):
             logger.error("Incorrect phone number.")
             return
 
+        # Steps 1-4 are served from the precondition cache when verified recently
+        # (invalidated on disconnect / reboot / kill / clear data / keys / Appium restart).
         # 1) Device connected?
-        devices_output = self.adb_manager.list_devices()
-        if not self._has_connected_devices(devices_output):
+        if not self.preconditions.check(DEVICE_ONLINE, lambda: self._device_online(device_ip), device=device_ip):
             self._popup_error("No Device", "No device connected. Please connect a device first.")
             logger.error("No device connected.")
             return
 
-        # 2) Appium up?
-        if not self._port_open(self._host, self._port):
+        # 2) Appium up? (the device's own pooled server if one was started, else the default;
+        #    not needed on the direct UiAutomator2 path)
+        appium = self.appium_for(device_ip)
+        if not self.direct_uia2 and not self.preconditions.check(APPIUM_UP, lambda: self._port_open(appium.host, appium.port),
+                                        subject=f"{appium.host}:{appium.port}"):
             self._popup_error("Appium Not Running", "Appium server is not running.")
             logger.error("Appium server is not running.")
             return
 
-        # 3) Create Appium session WITHOUT launching the app
+        # 3) Reuse a healthy Appium session; otherwise create one WITHOUT launching the app
         #    Provide package/activity only as metadata; auto_launch=False ensures no launch.
-        self.appium_manager.init_driver(
-            package="tv.freetv.androidtv",
-            activity="pl.atende.mobile.tv.ui.gui.main.activity.MainActivity",
-            auto_launch=False,
-        )
-        if not getattr(self.appium_manager, "driver", None):
-            return
+        if not self.preconditions.check(
+            SESSION_HEALTHY,
+            lambda: (appium is not self.appium_manager or self._session_device == device_ip)
+            and isinstance(appium.driver, Uia2Driver) == self.direct_uia2
+            and appium.is_session_alive(),
+            device=device_ip,
+        ):
+            if self.direct_uia2:
+                appium.init_direct(device_ip, self.adb_manager.run)
+            else:
+                appium.init_driver(
+                    package=FREETV_PROD_PACKAGE,
+                    activity=self.launch_component_for(FREETV_PROD_PACKAGE).split("/", 1)[1],
+                    auto_launch=False,
+                )
+            if not getattr(appium, "driver", None):
+                return
+            if appium is self.appium_manager:
+                self._session_device = device_ip
+                self.preconditions.invalidate(facts=[SESSION_HEALTHY])  # the shared session was replaced
+            self.preconditions.record(SESSION_HEALTHY, device=device_ip)
 
         # 4) Verify FreeTV in foreground; if not, ask user to open it
-        if not self.appium_manager.is_package_in_foreground("tv.freetv.androidtv"):
+        if not self.preconditions.check(
+            FOREGROUND, lambda: appium.is_package_in_foreground(FREETV_PROD_PACKAGE),
+            device=device_ip, subject=FREETV_PROD_PACKAGE,
+        ):
             self._popup_error(
                 "Open FreeTV",
                 "FreeTV is not open on the device.\n\nPlease open the FreeTV app on the Android TV, then press 'Connect to Account' again."
             )
             logger.warning("FreeTV not in foreground when connecting to account.")
             return
+        appium.screen_context = self._screen_context(device_ip, FREETV_PROD_PACKAGE)
 
         # 5) Verify Login screen (quick)
-        if not self.appium_manager.verify_login_screen_fast(LOGIN_SCREEN_TEXTS, max_wait_ms=1200):
+        if not appium.verify_login_screen_fast(LOGIN_SCREEN_TEXTS, max_wait_ms=1200):
             self._popup_error("Login Screen Missing", "Could not detect the login screen.")
             logger.error("Login screen not detected.")
             return
 
         # 6) Report focused button text
-        focused_text = self.appium_manager.get_focused_element_text()
+        focused_text = appium.get_focused_element_text()
         if focused_text:
             self._log(f"Currently focused: {focused_text}")
         else:
             self._log("No focused element detected.", "WARN")
 
         # 7) Move to the second button and press OK
-        if not self.appium_manager.focus_second_and_enter(LOGIN_FIRST_TEXT, LOGIN_SECOND_TEXT):
+        if not appium.focus_second_and_enter(LOGIN_FIRST_TEXT, LOGIN_SECOND_TEXT):
             self._popup_error(
                 "Cannot Focus Button",
                 "Could not highlight the 'כניסה למנויים קיימים' button. Check the login screen and try again."
@@ -200,4 +583,4 @@ class AndroidManagerController(QObject):
 
         # 8) Proceed to keypad entry
         self._log(f"Connecting to account with phone: {phone}")
-        self.appium_manager.connect_to_account(phone)
+        appium.connect_to_account(phone)
@@ -1,2 +1,2 @@
 # Keep this file minimal to avoid circular imports.
-__all__ = ["adb_manager", "appium_manager", "rcu_manager", "logger", "constants"]
\ No newline at end of file
+__all__ = ["adb_manager", "appium_manager", "rcu_manager", "logger", "constants", "device_props", "discovery", "connection_supervisor", "adb_exec", "inventory", "apk_manifest", "apk_installer", "file_sync", "diagnostics", "app_start", "stats", "frame_stats", "resource_sampler", "scenario", "preconditions", "appium_servers", "uia2_client", "locator_cache", "fleet", "jobs", "agent", "agent_client", "log_search", "visual_diff", "input_latency", "monkey_input"]
\ No newline at end of file
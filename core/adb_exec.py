@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+from core.constants import ADB_DEADLINES, ADB_HEDGE_DELAY, ADB_HEDGE_MIN_SAMPLES
+from core.logger import logger
+
+# Shell verbs that only read state; safe to run twice (hedged) and to kill at any time.
+_READ_ONLY_SHELL = {"getprop", "dumpsys", "cat", "ls", "pidof", "ps", "df", "stat"}
+# Verbs that read only with these subcommands (`settings put`, `wm size 1280x720` write).
+_READ_ONLY_SUBCOMMANDS = {"settings": {"get", "list"}, "pm": {"list", "path"}}
+_WRITING_IP_WORDS = {"add", "append", "change", "del", "delete", "flush", "replace", "set"}
+_SHELL_METACHARS = (">", "<", "|", ";", "&", "`", "$(")  # redirection / chaining can write anything
+_READ_ONLY_ADB = {"devices", "get-state", "get-serialno", "version", "mdns"}
+
+
+class CancelToken:
+    """Thread-safe cancellation flag; callbacks run once when cancel() is called."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception:
+                logger.exception("Cancel callback failed")
+
+    def on_cancel(self, cb: Callable[[], None]) -> Callable[[], None]:
+        """Register cb (runs immediately if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(cb)
+
+                def _unregister() -> None:
+                    with self._lock:
+                        if cb in self._callbacks:
+                            self._callbacks.remove(cb)
+                return _unregister
+        cb()
+        return lambda: None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+
+_scope = threading.local()
+
+
+@contextmanager
+def cancel_scope(token: CancelToken) -> Iterator[CancelToken]:
+    """
+    Make `token` the default cancel token for adb commands run on this thread inside the
+    block (e.g. by a scheduled job), so code that does not pass `cancel=` is still stoppable.
+    """
+    previous = getattr(_scope, "token", None)
+    _scope.token = token
+    try:
+        yield token
+    finally:
+        _scope.token = previous
+
+
+def current_cancel() -> Optional[CancelToken]:
+    return getattr(_scope, "token", None)
+
+
+@dataclass
+class ExecResult:
+    output: str
+    stderr: str
+    returncode: Optional[int]
+    outcome: str            # ok / error / timeout / cancelled / failed
+    duration: float
+    command_class: str
+    hedged: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == "ok"
+
+
+def _strip_target(argv: Sequence[str]) -> List[str]:
+    """Drop 'adb' and global options (-s SERIAL, -t ID, -d, -e) to expose the adb verb."""
+    args = list(argv[1:])
+    while args and args[0].startswith("-"):
+        flag = args.pop(0)
+        if flag in ("-s", "-t", "-H", "-P", "-L") and args:
+            args.pop(0)
+    return args
+
+
+def classify(argv: Sequence[str]) -> str:
+    """Map an adb command line to a deadline class (see ADB_DEADLINES)."""
+    args = _strip_target(argv)
+    if not args:
+        return "default"
+    verb = args[0]
+    if verb in ("install", "install-multiple", "install-multi-package"):
+        return "install"
+    if verb in ("reboot", "wait-for-device", "root", "unroot"):
+        return "reboot"
+    if verb in ("connect", "disconnect"):
+        return "connect"
+    if verb in ("push", "pull", "sync", "exec-out", "exec-in", "bugreport"):
+        return "transfer"
+    if verb in _READ_ONLY_ADB:
+        return "query"
+    if verb == "shell" and len(args) > 1:
+        shell_cmd = " ".join(args[1:]).split()
+        head = shell_cmd[0] if shell_cmd else ""
+        if head == "input":
+            return "key"
+        if head == "pm" and len(shell_cmd) > 1 and shell_cmd[1].startswith("install"):
+            return "install"
+        return "query" if _read_only_shell(shell_cmd) else "shell"
+    return "default"
+
+
+def _read_only_shell(words: Sequence[str]) -> bool:
+    """True only for shell commands that cannot change device state (they may be hedged, i.e. run twice)."""
+    if not words or any(m in w for w in words for m in _SHELL_METACHARS):
+        return False
+    head, rest = words[0], list(words[1:])
+    if head in _READ_ONLY_SHELL:
+        return True
+    if head in _READ_ONLY_SUBCOMMANDS:
+        return bool(rest) and rest[0] in _READ_ONLY_SUBCOMMANDS[head]
+    if head == "wm":
+        return len(rest) == 1 and rest[0] in ("size", "density")
+    if head == "ip":
+        return not _WRITING_IP_WORDS.intersection(rest)
+    return False
+
+
+class CommandStats:
+    """Rolling per-class durations and outcome counters (for p50/p99 and hedge delays)."""
+
+    def __init__(self, window: int = 256) -> None:
+        self._window = window
+        self._durations: Dict[str, Deque[float]] = {}
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, result: ExecResult) -> None:
+        with self._lock:
+            self._durations.setdefault(result.command_class, deque(maxlen=self._window)).append(result.duration)
+            counts = self._outcomes.setdefault(result.command_class, {})
+            counts[result.outcome] = counts.get(result.outcome, 0) + 1
+
+    def percentile(self, command_class: str, pct: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._durations.get(command_class, ()))
+        if not values:
+            return None
+        idx = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+        return values[idx]
+
+    def samples(self, command_class: str) -> int:
+        with self._lock:
+            return len(self._durations.get(command_class, ()))
+
+    def summary(self) -> str:
+        with self._lock:
+            classes = sorted(self._durations)
+            outcomes = {c: dict(self._outcomes.get(c, {})) for c in classes}
+        lines = []
+        for c in classes:
+            p50, p99 = self.percentile(c, 50), self.percentile(c, 99)
+            counts = ", ".join(f"{k}={v}" for k, v in sorted(outcomes[c].items()))
+            lines.append(f"{c}: n={self.samples(c)} p50={p50 * 1000:.0f}ms p99={p99 * 1000:.0f}ms ({counts})")
+        return "\n".join(lines) or "no adb commands recorded yet"
+
+
+def _popen_kwargs() -> dict:
+    if os.name == "posix":
+        return {"start_new_session": True}  # own process group -> kill adb and anything it spawned
+    return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+class AdbExecutor:
+    """
+    Runs adb client processes with a deadline per command class.
+
+    - Timeouts and cancellation kill the adb process group, which also closes its
+      connection to the adb server / device.
+    - Read-only commands may be hedged: if the first attempt is slower than the class's
+      recent p95 (or ADB_HEDGE_DELAY), a second copy starts and the first to finish wins.
+    - Every attempt's duration and outcome is recorded in `stats`.
+    """
+
+    def __init__(self, deadlines: Optional[Dict[str, float]] = None) -> None:
+        self.deadlines = dict(ADB_DEADLINES)
+        if deadlines:
+            self.deadlines.update(deadlines)
+        self.stats = CommandStats()
+
+    def deadline_for(self, command_class: str) -> float:
+        return self.deadlines.get(command_class, self.deadlines["default"])
+
+    def hedge_delay(self, command_class: str) -> float:
+        if self.stats.samples(command_class) >= ADB_HEDGE_MIN_SAMPLES:
+            p95 = self.stats.percentile(command_class, 95) or ADB_HEDGE_DELAY
+            return max(0.05, p95)
+        return ADB_HEDGE_DELAY
+
+    def execute(
+        self,
+        argv: Sequence[str],
+        *,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelToken] = None,
+        hedge: Optional[bool] = None,
+        device: Optional[str] = None,
+        stdin_path: Optional[str] = None,
+        stdout_file: Optional[BinaryIO] = None,
+    ) -> ExecResult:
+        """
+        Run one adb command. `stdin_path` streams a file into the child's stdin straight
+        from disk (the OS reads it; nothing is buffered in Python); likewise `stdout_file`
+        receives the child's stdout directly (result.output is then empty).
+        """
+        command_class = classify(argv)
+        timeout = self.deadline_for(command_class) if timeout is None else timeout
+        if cancel is None:
+            cancel = current_cancel()
+        if hedge is None:
+            hedge = command_class == "query" and stdin_path is None and stdout_file is None
+        start = time.monotonic()
+        deadline = start + timeout
+
+        if hedge:
+            result = self._hedged(argv, deadline, cancel, command_class)
+        else:
+            result = self._attempt(argv, deadline, cancel, command_class, stdin_path, stdout_file)
+        result.duration = time.monotonic() - start  # caller-perceived latency, incl. hedge wait
+
+        self.stats.record(result)
+        if result.outcome in ("timeout", "cancelled", "failed"):
+            logger.warning(
+                f"adb {command_class} command {result.outcome} after {result.duration:.2f}s: {' '.join(argv)}",
+                extra={"device": device, "operation": f"adb_{command_class}",
+                       "duration_ms": round(result.duration * 1000, 2)},
+            )
+        else:
+            logger.debug(
+                f"adb {command_class} {result.outcome} in {result.duration * 1000:.0f}ms: {' '.join(argv)}",
+                extra={"device": device, "operation": f"adb_{command_class}",
+                       "duration_ms": round(result.duration * 1000, 2)},
+            )
+        return result
+
+    def _attempt(self, argv: Sequence[str], deadline: float, cancel: Optional[CancelToken],
+                 command_class: str, stdin_path: Optional[str] = None,
+                 stdout_file: Optional[BinaryIO] = None) -> ExecResult:
+        start = time.monotonic()
+        if cancel is not None and cancel.cancelled:
+            return ExecResult("", "", None, "cancelled", 0.0, command_class)
+        stdin = None
+        try:
+            stdin = open(stdin_path, "rb") if stdin_path else subprocess.DEVNULL
+            proc = subprocess.Popen(
+                list(argv), stdin=stdin, stdout=stdout_file if stdout_file is not None else subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True, encoding="utf-8", errors="replace", **_popen_kwargs(),
+            )
+        except OSError as e:
+            return ExecResult(str(e), "", None, "failed", time.monotonic() - start, command_class)
+        finally:
+            if stdin_path and stdin not in (None, subprocess.DEVNULL):
+                stdin.close()  # the child holds its own descriptor
+
+        unregister = cancel.on_cancel(lambda: _kill(proc)) if cancel is not None else (lambda: None)
+        try:
+            out, err = proc.communicate(timeout=max(0.0, deadline - time.monotonic()))
+            if cancel is not None and cancel.cancelled:
+                outcome = "cancelled"
+            else:
+                outcome = "ok" if proc.returncode == 0 else "error"
+        except subprocess.TimeoutExpired:
+            _kill(proc)
+            out, err = proc.communicate()
+            outcome = "timeout"
+        finally:
+            unregister()
+        return ExecResult(out or "", err or "", proc.returncode, outcome, time.monotonic() - start, command_class)
+
+    def _hedged(self, argv: Sequence[str], deadline: float, cancel: Optional[CancelToken],
+                command_class: str) -> ExecResult:
+        results: "queue.Queue[ExecResult]" = queue.Queue()
+        tokens: List[CancelToken] = []
+
+        def launch(hedged: bool) -> None:
+            token = CancelToken()
+            tokens.append(token)
+
+            def _run() -> None:
+                result = self._attempt(argv, deadline, token, command_class)
+                result.hedged = hedged
+                results.put(result)
+
+            threading.Thread(target=_run, name="adb-hedge", daemon=True).start()
+
+        unregister = cancel.on_cancel(lambda: [t.cancel() for t in list(tokens)]) if cancel else (lambda: None)
+        try:
+            launch(False)
+            try:
+                first = results.get(timeout=min(self.hedge_delay(command_class), max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                if cancel is not None and cancel.cancelled:
+                    first = results.get()
+                else:
+                    launch(True)
+                    first = results.get()
+            if first.ok or len(tokens) == 1:
+                winner = first
+            else:
+                # First finisher failed; give the other attempt until the deadline.
+                winner = results.get()
+        finally:
+            for t in tokens:
+                t.cancel()
+            unregister()
+        return winner
@@ -1,32 +1,130 @@
-import subprocess
+import ipaddress
 import os
+from concurrent.futures import ThreadPoolExecutor
+from core.adb_exec import AdbExecutor, ExecResult, classify
+from core.apk_installer import ApkInstaller
+from core.app_start import AppStartBenchmark
+from core.connection_supervisor import ConnectionSupervisor
+from core.constants import (
+    ADB_PORT, DEVICE_PROPS_VOLATILE_TTL, KEY_BACKEND, SUPERVISOR_READY_TIMEOUT, TRANSFER_MAX_DEVICES,
+)
+from core.device_props import DevicePropsCache
+from core.diagnostics import DiagnosticsCollector, default_commands
+from core.discovery import connect_all, discover_devices
+from core.file_sync import FileTransfer
+from core.fleet import FleetMonitor
+from core.inventory import PackageInventory
 from core.logger import logger
+from core.monkey_input import MonkeyError, MonkeyInput, MonkeyNoReply
+from core.preconditions import DEVICE_FACTS, FOREGROUND, PreconditionCache
 
 
 class AdbManager:
     def __init__(self, log_func):
         self.log = log_func
+        self.executor = AdbExecutor()
+        self.props = DevicePropsCache(self.run)
+        self.inventory = PackageInventory(self.run)
+        self.installer = ApkInstaller(self.run, self._device_sdk)
+        self.supervisor = ConnectionSupervisor(self.run, log_func, on_reconnect=self._on_reconnected)
+        self.diagnostics = DiagnosticsCollector(self.execute)
+        self.preconditions = PreconditionCache()
+        self.fleet = FleetMonitor(self.run, self.inventory, self.serial)
+        self.monkey = MonkeyInput(self.run, self.serial)
+        self.key_backend = KEY_BACKEND  # "input" or "monkey", see core.monkey_input
 
-    def run(self, command, device_ip=None):
-        """Execute ADB command, optionally targeting a specific device IP."""
+    def execute(self, command, device_ip=None, *, timeout=None, cancel=None, hedge=None,
+                stdin_path=None, stdout_file=None):
+        """
+        Lower-level run(): returns the full core.adb_exec.ExecResult (outcome, stderr, duration).
+        `stdout_file` receives the command's stdout directly instead of buffering it.
+        """
         if device_ip:
-            command = ["adb", "-s", f"{device_ip}:5555"] + command[1:]
+            serial = self.serial(device_ip)
+            if not self.supervisor.wait_ready(serial, SUPERVISOR_READY_TIMEOUT):
+                msg = f"Device {serial} is offline (no reconnection within {SUPERVISOR_READY_TIMEOUT:.0f}s)."
+                logger.warning(msg)
+                return ExecResult(msg, "", None, "failed", 0.0, classify(command))
+            command = ["adb", "-s", serial] + command[1:]
+        return self.executor.execute(
+            command, timeout=timeout, cancel=cancel, hedge=hedge, device=device_ip,
+            stdin_path=stdin_path, stdout_file=stdout_file,
+        )
+
+    def run(self, command, device_ip=None, *, timeout=None, cancel=None, hedge=None, stdin_path=None):
+        """
+        Execute ADB command, optionally targeting a specific device IP (or ip:port serial).
+
+        The deadline defaults to the command's class (see ADB_DEADLINES); on timeout or
+        cancel (core.adb_exec.CancelToken) the adb process is killed. Read-only commands
+        are hedged unless hedge=False. `stdin_path` streams a file into the command's stdin.
+        """
         try:
-            result = subprocess.run(command, capture_output=True, text=True)
-            output = result.stdout.strip()
-            if result.stderr:
-                logger.warning(f"ADB stderr: {result.stderr.strip()}")
-            return output
+            result = self.execute(
+                command, device_ip, timeout=timeout, cancel=cancel, hedge=hedge, stdin_path=stdin_path
+            )
         except Exception as e:
             logger.exception("ADB command failed")
             return str(e)
+        if result.outcome == "timeout":
+            return f"ADB command timed out after {result.duration:.1f}s."
+        if result.outcome == "cancelled":
+            return "ADB command cancelled."
+        if result.stderr:
+            logger.warning(f"ADB stderr: {result.stderr.strip()}")
+        return result.output.strip()
+
+    def _on_reconnected(self, serial):
+        # Props are keyed by what callers pass (bare IP or ip:port); drop both.
+        self.props.invalidate(serial)
+        self.props.invalidate(serial.rsplit(":", 1)[0])
+        self.preconditions.invalidate(serial)
+        self.preconditions.invalidate(serial.rsplit(":", 1)[0])
+
+    @staticmethod
+    def serial(device_ip):
+        """
+        ADB serial for a target: '192.168.1.25' -> '192.168.1.25:5555'.
+        'ip:port' and USB serials (as listed by `adb devices`) are kept as-is.
+        """
+        if ":" in device_ip:
+            return device_ip
+        try:
+            ipaddress.ip_address(device_ip)
+        except ValueError:
+            return device_ip
+        return f"{device_ip}:{ADB_PORT}"
 
-    def connect(self, ip):
+    def connect(self, ip, port=ADB_PORT):
         self.log(f"Connecting to device at IP: {ip}")
-        return self.run(["adb", "connect", f"{ip}:5555"])
+        self.props.invalidate(ip)
+        self.preconditions.invalidate(ip)
+        out = self.run(["adb", "connect", f"{ip}:{port}"])
+        if "connected to" in out:  # also matches "already connected to"
+            self.supervisor.track(f"{ip}:{port}")
+        return out
+
+    def discover(self, cidrs, use_mdns=True, connect=True):
+        """
+        Scan CIDR ranges (plus `adb mdns services`) for wireless-ADB devices and,
+        if requested, `adb connect` all hits in parallel. Returns the discovered devices.
+        """
+        cidrs = list(cidrs)
+        self.log(f"Scanning {', '.join(cidrs)} for ADB devices...")
+        devices = discover_devices(cidrs, run=self.run, use_mdns=use_mdns)
+        self.log(f"Found {len(devices)} device(s): {', '.join(d.address for d in devices) or 'none'}")
+        if connect and devices:
+            for address, out in connect_all(self.connect, devices).items():
+                self.log(f"{address}: {out}")
+        return devices
 
     def disconnect(self):
         self.log("Disconnecting all ADB devices")
+        self.supervisor.untrack_all()
+        self.props.invalidate()
+        self.preconditions.invalidate(facts=DEVICE_FACTS)
+        self.inventory.forget_device()
+        self.monkey.close_all()
         return self.run(["adb", "disconnect"])
 
     def list_devices(self):
@@ -34,40 +132,152 @@ class AdbManager:
 
     def reboot_device(self, device_ip=None):
         self.log(f"Rebooting device: {device_ip or 'default'}")
-        return self.run(["adb", "reboot"], device_ip)
+        self.props.invalidate(device_ip)
+        self.preconditions.invalidate(device_ip, facts=DEVICE_FACTS)
+        out = self.run(["adb", "reboot"], device_ip)
+        if device_ip:
+            self.supervisor.mark_rebooting(self.serial(device_ip))
+        return out
+
+    def _device_sdk(self, device_ip=None):
+        props = self.props.get(device_ip)
+        return props.sdk if props else 0
 
     def install_apk(self, apk_path, device_ip=None):
-        self.log(f"Installing APK on device {device_ip or 'default'}: {apk_path}")
-        if not apk_path or not os.path.isfile(apk_path):
+        """Install one APK, or a list of split APKs in a single step (see core.apk_installer)."""
+        paths = [apk_path] if isinstance(apk_path, str) else list(apk_path)
+        self.log(f"Installing APK on device {device_ip or 'default'}: {', '.join(paths)}")
+        if not paths or not all(p and os.path.isfile(p) for p in paths):
             error_msg = "APK path is invalid or file not found."
             logger.warning(error_msg)
             return error_msg
-        return self.run(["adb", "-s", device_ip, "install", "-r", "-d", apk_path], device_ip)
+        self.preconditions.invalidate(device_ip, facts=[FOREGROUND])  # an update kills the running app
+        result = self.installer.install(paths, device_ip)
+        logger.info(
+            result.summary(),
+            extra={"device": device_ip, "operation": "install_apk", "duration_ms": round(result.duration * 1000, 2)},
+        )
+        if device_ip and result.ok:
+            self.inventory.refresh_packages(self.serial(device_ip))
+        return result.summary()
 
     def uninstall_package(self, package, device_ip=None):
         self.log(f"Uninstalling package '{package}' on device {device_ip or 'default'}")
-        return self.run(["adb", "uninstall", package], device_ip)
+        self.preconditions.invalidate(device_ip, facts=[FOREGROUND])
+        out = self.run(["adb", "uninstall", package], device_ip)
+        if device_ip and "Success" in out:
+            self.inventory.forget_package(self.serial(device_ip), package)
+        return out
+
+    def collect_inventory(self, target=None):
+        """Audit tracked packages on every connected device in parallel; returns the fleet table."""
+        self.log("Collecting package inventory from connected devices...")
+        self.inventory.collect()
+        return self.inventory.fleet_table(target)
+
+    def installed_version_code(self, package, device_ip=None):
+        """versionCode of an installed package, or None if it is not installed."""
+        out = self.run(["adb", "shell", "pm", "list", "packages", "--show-versioncode", package], device_ip)
+        for line in out.splitlines():
+            parts = line.strip().split()
+            if parts and parts[0] == f"package:{package}":
+                for part in parts[1:]:
+                    if part.startswith("versionCode:") and part[len("versionCode:"):].isdigit():
+                        return int(part[len("versionCode:"):])
+                return 0
+        return None
+
+    def _transfer(self, direction, source, dest, device_ips, cancel):
+        targets = list(device_ips) if device_ips else [None]
+
+        def _one(device_ip):
+            serial = self.serial(device_ip) if device_ip else None
+            ft = FileTransfer(serial, run=self.run)
+            if direction == "push":
+                return ft.push(source, dest, cancel)
+            # Several devices -> one subfolder per device so trees don't collide.
+            local_dir = os.path.join(dest, serial.replace(":", "_")) if serial and len(targets) > 1 else dest
+            return ft.pull(source, local_dir, cancel)
+
+        with ThreadPoolExecutor(max_workers=min(TRANSFER_MAX_DEVICES, len(targets))) as pool:
+            reports = list(pool.map(_one, targets))
+        for report in reports:
+            self.log(report.summary())
+        return reports
+
+    def push_files(self, local_path, remote_dir, device_ips=None, cancel=None):
+        """
+        Push a file or directory tree to one or more devices over parallel sync streams.
+        Unchanged files are skipped and interrupted ones resumed; returns a TransferReport per device.
+        """
+        self.log(f"Pushing {local_path} -> {remote_dir} on {', '.join(device_ips or ['default'])}")
+        return self._transfer("push", local_path, remote_dir, device_ips, cancel)
+
+    def pull_files(self, remote_path, local_dir, device_ips=None, cancel=None):
+        """Pull a remote file or directory tree from one or more devices (see push_files)."""
+        self.log(f"Pulling {remote_path} -> {local_dir} from {', '.join(device_ips or ['default'])}")
+        return self._transfer("pull", remote_path, local_dir, device_ips, cancel)
+
+    def collect_diagnostics(self, out_dir, device_ips=None, include_bugreport=False, cancel=None):
+        """Snapshot dumpsys/logcat/... from one or more devices into a zip in out_dir; returns the report."""
+        self.log(f"Collecting diagnostics from {', '.join(device_ips or ['default'])}...")
+        report = self.diagnostics.collect(
+            list(device_ips or []), out_dir, default_commands(include_bugreport=include_bugreport), cancel
+        )
+        self.log(report.summary())
+        return report
+
+    def benchmark_app_start(self, package_activity, device_ips=None, **options):
+        """
+        Cold/warm start benchmark (see core.app_start.AppStartBenchmark); devices run in parallel.
+        Returns a StartBenchmarkResult with per-launch samples tagged with the installed versionCode.
+        """
+        devices = list(device_ips or []) or [None]
+        package = package_activity.split("/", 1)[0]
+        self.log(f"Benchmarking app start of {package_activity} on {', '.join(d or 'default' for d in devices)}")
+        versions = {d: self.installed_version_code(package, d) or 0 for d in devices}
+        result = AppStartBenchmark(self.run).run(devices, package_activity, version_codes=versions, **options)
+        for line in result.summary().splitlines():
+            self.log(line)
+        return result
 
     def launch_app(self, package_activity, device_ip=None):
         self.log(f"Launching app '{package_activity}' on device {device_ip or 'default'}")
+        self.preconditions.invalidate(device_ip, facts=[FOREGROUND])
         return self.run(["adb", "shell", "am", "start", "-n", package_activity], device_ip)
 
     def kill_app(self, package, device_ip=None):
         self.log(f"Killing app '{package}' on device {device_ip or 'default'}")
+        self.preconditions.invalidate(device_ip, facts=[FOREGROUND])
         return self.run(["adb", "shell", "am", "force-stop", package], device_ip)
 
-    def keyevent(self, code, device_ip=None):
+    def keyevent(self, code, device_ip=None, *, backend=None):
+        """
+        Press a key. `backend` (default: self.key_backend) is "input" (`adb shell input keyevent`)
+        or "monkey" (persistent `monkey --port`, see core.monkey_input); if monkey can't be
+        reached the key is sent with `input` instead. A key monkey got but never confirmed is
+        not sent again (it may have been pressed); the error text is returned.
+        """
         self.log(f"Sending keyevent {code} to device {device_ip or 'default'}")
+        self.preconditions.invalidate(device_ip, facts=[FOREGROUND])  # HOME / BACK / OK can switch apps
+        if (backend or self.key_backend) == "monkey":
+            try:
+                return self.monkey.press(code, device_ip)
+            except MonkeyNoReply as e:
+                logger.warning(f"monkey key injection unconfirmed, not resending: {e}")
+                return str(e)
+            except MonkeyError as e:
+                logger.warning(f"monkey key injection failed, using input keyevent: {e}")
         return self.run(["adb", "shell", "input", "keyevent", str(code)], device_ip)
 
-    def get_device_ip(self):
-        result = self.run(["adb", "shell", "ip", "-f", "inet", "addr", "show", "wlan0"])
-        lines = result.splitlines()
-        for line in lines:
-            line = line.strip()
-            if line.startswith("inet "):
-                ip_address = line.split()[1].split("/")[0]
-                return ip_address
+    def get_device_props(self, device_ip=None, refresh=False):
+        """Cached property snapshot (model, OS, build, IP, screen) or None if the device is unreachable."""
+        return self.props.get(device_ip, refresh=refresh)
+
+    def get_device_ip(self, device_ip=None):
+        props = self.props.get(device_ip, max_age=DEVICE_PROPS_VOLATILE_TTL)
+        if props and props.ip:
+            return props.ip
         warning_msg = "IP address not found."
         logger.warning(warning_msg)
         return warning_msg
@@ -75,6 +285,7 @@ class AdbManager:
     def clear_data(self, package, device_ip=None):
         """Clear all app data for the given package (equivalent to Settings > Storage > Clear data)."""
         self.log(f"Clearing data for package '{package}' on device {device_ip or 'default'}")
+        self.preconditions.invalidate(device_ip, facts=[FOREGROUND])
         out = self.run(["adb", "shell", "pm", "clear", package], device_ip)
 
         if out.strip().lower().startswith("success"):
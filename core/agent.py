@@ -0,0 +1,667 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import inspect
+import json
+import logging
+import os
+import re
+import struct
+import threading
+from dataclasses import asdict
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from core.adb_manager import AdbManager
+from core.constants import (
+    AGENT_EVENT_BACKLOG, AGENT_HOST, AGENT_IDLE_TIMEOUT, AGENT_LONG_POLL, AGENT_MAX_JSON, AGENT_PORT,
+    AGENT_UPLOAD_DIR, JOB_TIMEOUTS, RCU_KEYCODES,
+)
+from core.jobs import FINISHED, PRIORITY_BULK, PRIORITY_KEY, PRIORITY_NORMAL, Job, JobScheduler, current_job
+from core.logger import STRUCTURED_FIELDS, logger
+from core.monkey_input import BACKENDS
+from core.rcu_manager import RcuManager, parse_key_sequence
+from core.scenario import ScenarioRunner, parse_scenario
+
+PRIORITIES = {"key": PRIORITY_KEY, "normal": PRIORITY_NORMAL, "bulk": PRIORITY_BULK}
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x8, 0x9, 0xA
+_LEVELS = {"WARN": logging.WARNING, "WARNING": logging.WARNING, "ERROR": logging.ERROR, "DEBUG": logging.DEBUG}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- WebSocket framing (RFC 6455, unfragmented frames only) ----------
+
+def ws_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+
+def ws_unmask(data: bytes, key: bytes) -> bytes:
+    n = len(data)
+    if not n:
+        return data
+    pad = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(pad, "big")).to_bytes(n, "big")
+
+
+def ws_frame(payload: bytes, opcode: int = WS_TEXT, *, mask: bool = False) -> bytes:
+    """One final frame; clients must mask what they send (mask=True), servers must not."""
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    head = bytes([0x80 | opcode])
+    if n < 126:
+        head += bytes([bit | n])
+    elif n < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", n)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", n)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    return head + key + ws_unmask(payload, key)
+
+
+async def _read_ws_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > AGENT_MAX_JSON:
+        raise ConnectionError("WebSocket frame too large")
+    key = await reader.readexactly(4) if b1 & 0x80 else b""
+    data = await reader.readexactly(n)
+    return b0 & 0x0F, ws_unmask(data, key) if key else data
+
+
+# ---------- Operations ----------
+
+# name -> fn(service, device, **params); each runs as one job on the device's queue.
+OPERATIONS: Dict[str, Callable[..., Any]] = {}
+
+
+def operation(name: str):
+    def register(fn):
+        OPERATIONS[name] = fn
+        return fn
+    return register
+
+
+@operation("connect")
+def _connect(svc: "AgentService", device: Optional[str]) -> str:
+    return svc.adb.connect(device)
+
+
+@operation("disconnect")
+def _disconnect(svc: "AgentService", device: Optional[str]) -> str:
+    return svc.adb.disconnect()
+
+
+@operation("list_devices")
+def _list_devices(svc: "AgentService", device: Optional[str]) -> str:
+    return svc.adb.list_devices()
+
+
+@operation("install_apk")
+def _install_apk(svc: "AgentService", device: Optional[str], paths: List[str]) -> str:
+    return svc.adb.install_apk(paths if len(paths) > 1 else paths[0], device_ip=device)
+
+
+@operation("uninstall")
+def _uninstall(svc: "AgentService", device: Optional[str], package: str) -> str:
+    return svc.adb.uninstall_package(package, device_ip=device)
+
+
+@operation("launch")
+def _launch(svc: "AgentService", device: Optional[str], component: str) -> str:
+    return svc.adb.launch_app(component, device_ip=device)
+
+
+@operation("kill_app")
+def _kill_app(svc: "AgentService", device: Optional[str], package: str) -> str:
+    return svc.adb.kill_app(package, device_ip=device)
+
+
+@operation("clear_data")
+def _clear_data(svc: "AgentService", device: Optional[str], package: str) -> str:
+    return svc.adb.clear_data(package, device_ip=device)
+
+
+@operation("key")
+def _key(svc: "AgentService", device: Optional[str], key: Any, backend: Optional[str] = None) -> str:
+    """`key` is a name from RCU_KEYCODES or a raw keycode; `backend` is "input" or "monkey" (default: the agent's)."""
+    code = int(key) if str(key).isdigit() else RCU_KEYCODES.get(str(key).upper())
+    if code is None:
+        raise ValueError(f"Unknown RCU key name: {key}")
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown key backend: {backend}")
+    return svc.adb.keyevent(code, device_ip=device, backend=backend)
+
+
+@operation("keys")
+def _keys(svc: "AgentService", device: Optional[str], sequence: str, delay: float = 0.0) -> str:
+    keys = parse_key_sequence(sequence)
+    svc.rcu.press_sequence(keys, device_ip=device, delay=delay)
+    return f"{len(keys)} key(s) sent"
+
+
+@operation("reboot")
+def _reboot(svc: "AgentService", device: Optional[str]) -> str:
+    return svc.adb.reboot_device(device_ip=device)
+
+
+@operation("device_info")
+def _device_info(svc: "AgentService", device: Optional[str], refresh: bool = False) -> str:
+    props = svc.adb.get_device_props(device_ip=device, refresh=refresh)
+    return props.summary() if props is not None else f"Could not read device info from {device or 'default'}."
+
+
+@operation("scenario")
+def _scenario(svc: "AgentService", device: Optional[str], scenario: Dict[str, Any],
+              variables: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    report = ScenarioRunner(svc.adb, svc.log).run(parse_scenario(scenario), [device], variables or {},
+                                                  cancel=current_job().cancel)
+    return {"scenario": report.scenario, "duration": report.duration, "ok": report.ok,
+            "summary": report.summary(), "results": [asdict(r) for r in report.results]}
+
+
+def job_dict(job: Job) -> Dict[str, Any]:
+    result = job.result if job.state in FINISHED else None
+    if result is not None and not isinstance(result, (str, int, float, bool, dict, list)):
+        result = str(result)
+    return {
+        "id": job.id, "device": job.device, "operation": job.name, "priority": job.priority,
+        "state": job.state, "submitted_at": job.submitted_at, "started_at": job.started_at,
+        "finished_at": job.finished_at, "waited": job.waited, "duration": job.duration,
+        "error": job.error, "result": result,
+    }
+
+
+class _EventLogHandler(logging.Handler):
+    """Log records (INFO+) as "log" events, tagged with the agent job that produced them."""
+
+    def __init__(self, publish: Callable[[Dict[str, Any]], None]) -> None:
+        super().__init__(logging.INFO)
+        self._publish = publish
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            job = current_job()
+            event = {"type": "log", "ts": record.created, "level": record.levelname,
+                     "msg": record.getMessage(), "job": job.id if job is not None else None}
+            for name in STRUCTURED_FIELDS:
+                value = getattr(record, name, None)
+                if value is not None:
+                    event[name] = value
+            self._publish(event)
+        except Exception:
+            self.handleError(record)
+
+
+class AgentService:
+    """
+    What agent mode exposes, without any transport or Qt.
+
+    - Operations (see OPERATIONS) run as jobs on one JobScheduler, so every client's work
+      on a device shares that device's serial queue while different devices run in parallel.
+    - Device rows come from the FleetMonitor (one `adb devices -l` poll for everybody).
+    - Device row changes, job changes and log records are handed to `publish` as events.
+    """
+
+    def __init__(self, adb: Optional[AdbManager] = None, jobs: Optional[JobScheduler] = None) -> None:
+        self.adb = adb or AdbManager(self.log)
+        self.jobs = jobs or JobScheduler(normalize=AdbManager.serial)
+        self.rcu = RcuManager(self.adb, self.log)
+        self.publish: Callable[[Dict[str, Any]], None] = lambda event: None
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._rows_lock = threading.Lock()
+        self._log_handler = _EventLogHandler(self._emit)
+
+    def log(self, text: str, level: str = "INFO") -> None:
+        logger.log(_LEVELS.get(level.upper(), logging.INFO), text)
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        self.publish(event)
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> None:
+        self.jobs.on_change = lambda job: self._emit({"type": "job", "job": job_dict(job)})
+        logger.addHandler(self._log_handler)
+        self.adb.fleet.start(self._on_row)
+
+    def stop(self) -> None:
+        self.jobs.shutdown()
+        self.adb.fleet.stop()
+        self.adb.monkey.close_all()
+        logger.removeHandler(self._log_handler)
+
+    def _on_row(self, serial: str, fields: Dict[str, object]) -> None:
+        with self._rows_lock:
+            self._rows.setdefault(serial, {"serial": serial}).update(fields)
+        self._emit({"type": "device", "serial": serial, "fields": dict(fields)})
+
+    def device_rows(self) -> List[Dict[str, Any]]:
+        with self._rows_lock:
+            return [dict(row) for _, row in sorted(self._rows.items())]
+
+    # ---------- Jobs ----------
+
+    def submit(self, operation_name: str, device: Optional[str], params: Dict[str, Any], *,
+               priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> Job:
+        fn = OPERATIONS.get(operation_name)
+        if fn is None:
+            raise ValueError(f"Unknown operation '{operation_name}' (known: {', '.join(sorted(OPERATIONS))})")
+        try:
+            inspect.signature(fn).bind(self, device, **params)
+        except TypeError as e:
+            raise ValueError(f"{operation_name}: {e}") from None
+        if timeout is None:
+            timeout = JOB_TIMEOUTS.get(operation_name, JOB_TIMEOUTS["default"])
+        return self.jobs.submit(device, operation_name, lambda _cancel: fn(self, device, **params),
+                                priority=priority, timeout=timeout)
+
+
+class _Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], reader: asyncio.StreamReader) -> None:
+        url = urlsplit(target)
+        self.method = method
+        self.path = unquote(url.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self._reader = reader
+        self.remaining = int(headers.get("content-length") or 0)
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    async def json(self) -> Dict[str, Any]:
+        if self.remaining > AGENT_MAX_JSON:
+            raise HttpError(413, "Request body too large")
+        raw = await self._reader.readexactly(self.remaining)
+        self.remaining = 0
+        try:
+            data = json.loads(raw or b"{}")
+        except ValueError:
+            raise HttpError(400, "Body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        return data
+
+    async def save(self, path: str) -> str:
+        """Stream the body into `path`; returns its SHA-256."""
+        digest = hashlib.sha256()
+        with open(path, "wb") as f:
+            while self.remaining:
+                chunk = await self._reader.read(min(self.remaining, 1 << 16))
+                if not chunk:
+                    raise ConnectionError("Upload interrupted")
+                self.remaining -= len(chunk)
+                digest.update(chunk)
+                f.write(chunk)
+        return digest.hexdigest()
+
+    async def discard(self) -> None:
+        while self.remaining:
+            chunk = await self._reader.read(min(self.remaining, 1 << 16))
+            if not chunk:
+                raise ConnectionError("Connection closed mid-body")
+            self.remaining -= len(chunk)
+
+
+class AgentServer:
+    """
+    JSON API over HTTP/1.1 (keep-alive) plus a WebSocket event stream, on one asyncio loop.
+
+        GET    /api/health
+        GET    /api/devices                     device rows (state, model, FreeTV builds, last operation)
+        POST   /api/jobs                        {"operation", "devices" | "device", "params", "priority", "timeout"}
+        GET    /api/jobs                        recent jobs
+        GET    /api/jobs/<id>?wait=<seconds>    long-polls until the job finished (up to AGENT_LONG_POLL)
+        DELETE /api/jobs/<id>                   cancel
+        GET    /api/uploads/<sha256>/<name>     200 with the agent-side path if already uploaded, else 404
+        PUT    /api/uploads/<sha256>/<name>     raw body (an APK); the agent installs from its copy
+        GET    /api/events                      WebSocket: device / job / log events as JSON text frames
+
+    Blocking work never runs on the loop: operations are jobs on the service's scheduler,
+    and job completion reaches waiting requests through a loop callback. With `token` set,
+    requests need "Authorization: Bearer <token>".
+    """
+
+    def __init__(self, service: AgentService, host: str = AGENT_HOST, port: int = AGENT_PORT, *,
+                 token: Optional[str] = None, upload_dir: str = AGENT_UPLOAD_DIR) -> None:
+        self.service = service
+        self.host = host
+        self.port = port
+        self.token = token
+        self.upload_dir = upload_dir
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._waiters: Dict[int, Set[asyncio.Future]] = {}
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._routes: List[Tuple[str, re.Pattern, Callable[..., Awaitable[Tuple[int, Any]]]]] = [
+            ("GET", re.compile(r"/api/health"), self._health),
+            ("GET", re.compile(r"/api/devices"), self._devices),
+            ("GET", re.compile(r"/api/jobs"), self._list_jobs),
+            ("POST", re.compile(r"/api/jobs"), self._submit),
+            ("GET", re.compile(r"/api/jobs/(\d+)"), self._get_job),
+            ("DELETE", re.compile(r"/api/jobs/(\d+)"), self._cancel_job),
+            ("GET", re.compile(r"/api/uploads/([0-9a-f]{64})/([^/]+)"), self._upload_info),
+            ("PUT", re.compile(r"/api/uploads/([0-9a-f]{64})/([^/]+)"), self._upload),
+        ]
+
+    # ---------- Lifecycle ----------
+
+    async def serve(self, ready: Optional[threading.Event] = None) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self.service.publish = self.publish
+        self.service.start()
+        try:
+            server = await asyncio.start_server(self._connection, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]  # port 0 picks a free one
+            logger.info(f"Agent listening on http://{self.host}:{self.port}"
+                        + (" (token required)" if self.token else ""))
+            if ready is not None:
+                ready.set()
+            async with server:
+                await self._stopped.wait()
+                for writer in self._connections.values():  # let open connections end on their own
+                    writer.close()
+                if self._connections:
+                    await asyncio.wait(list(self._connections), timeout=2)
+        finally:
+            self.service.publish = lambda event: None
+            self.service.stop()
+
+    def run(self) -> None:
+        """Serve until Ctrl+C (agent mode entry point)."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logger.info("Agent stopped")
+
+    def start_in_thread(self) -> int:
+        """Serve on a daemon thread (tests / benchmarks on localhost); returns the bound port."""
+        ready = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(self.serve(ready)), name="agent", daemon=True).start()
+        if not ready.wait(10):
+            raise RuntimeError("Agent did not start")
+        return self.port
+
+    def stop(self) -> None:
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    # ---------- Events ----------
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Thread-safe: fan an event out to WebSocket clients and job waiters on the loop."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, event)
+        except RuntimeError:  # loop already closed
+            pass
+
+    def _fanout(self, event: Dict[str, Any]) -> None:
+        if event["type"] == "job" and event["job"]["state"] in FINISHED:
+            for waiter in self._waiters.pop(event["job"]["id"], ()):
+                if not waiter.done():
+                    waiter.set_result(None)
+        for queue in self._subscribers:
+            self._offer(queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Optional[Dict[str, Any]]) -> None:
+        if queue.full():  # slow client: drop its oldest event rather than grow without bound
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    # ---------- HTTP ----------
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), AGENT_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                if request.path == "/api/events" and request.headers.get("upgrade", "").lower() == "websocket":
+                    if self._authorized(request):
+                        await self._events(request, reader, writer)
+                    else:
+                        self._respond(writer, 401, {"error": "Missing or wrong token"}, keep_alive=False)
+                    break
+                status, payload = await self._dispatch(request)
+                await request.discard()
+                self._respond(writer, status, payload, keep_alive=request.keep_alive)
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[_Request]:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise HttpError(400, "Bad request line")
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+            if len(headers) > 100:
+                raise HttpError(431, "Too many headers")
+        if "transfer-encoding" in headers:
+            raise HttpError(411, "Send a Content-Length body")
+        return _Request(parts[0].upper(), parts[1], headers, reader)
+
+    def _authorized(self, request: _Request) -> bool:
+        if not self.token:
+            return True
+        return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {self.token}")
+
+    async def _dispatch(self, request: _Request) -> Tuple[int, Any]:
+        if not self._authorized(request):
+            return 401, {"error": "Missing or wrong token"}
+        path_matched = False
+        for method, pattern, handler in self._routes:
+            m = pattern.fullmatch(request.path)
+            if m is None:
+                continue
+            path_matched = True
+            if method != request.method:
+                continue
+            try:
+                return await handler(request, *m.groups())
+            except HttpError as e:
+                return e.status, {"error": str(e)}
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            except (ConnectionError, asyncio.IncompleteReadError):
+                raise
+            except Exception as e:
+                logger.exception(f"Agent request {request.method} {request.path} failed")
+                return 500, {"error": f"{type(e).__name__}: {e}"}
+        if path_matched:
+            return 405, {"error": f"{request.method} not allowed on {request.path}"}
+        return 404, {"error": f"No such endpoint: {request.path}"}
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, *, keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+        )
+
+    # ---------- Endpoints ----------
+
+    async def _health(self, request: _Request) -> Tuple[int, Any]:
+        return 200, {"ok": True, "jobs": self.service.jobs.summary(), "devices": len(self.service.device_rows()),
+                     "subscribers": len(self._subscribers)}
+
+    async def _devices(self, request: _Request) -> Tuple[int, Any]:
+        return 200, {"devices": self.service.device_rows()}
+
+    async def _list_jobs(self, request: _Request) -> Tuple[int, Any]:
+        limit = int(request.query.get("limit", 200))
+        return 200, {"jobs": [job_dict(j) for j in self.service.jobs.jobs()[-limit:]],
+                     "summary": self.service.jobs.summary()}
+
+    async def _submit(self, request: _Request) -> Tuple[int, Any]:
+        body = await request.json()
+        devices = body.get("devices")
+        if devices is None:
+            devices = [body.get("device")]
+        if not isinstance(devices, list) or not devices:
+            raise ValueError("'devices' must be a non-empty list")
+        priority = body.get("priority", PRIORITY_NORMAL)
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f"Unknown priority '{priority}' (known: {', '.join(PRIORITIES)})")
+            priority = PRIORITIES[priority]
+        params = body.get("params") or {}
+        if not isinstance(params, dict):
+            raise ValueError("'params' must be an object")
+        timeout = body.get("timeout")
+        jobs = [self.service.submit(str(body.get("operation")), d or None, params, priority=int(priority),
+                                    timeout=None if timeout is None else float(timeout))
+                for d in devices]
+        return 202, {"jobs": [job_dict(j) for j in jobs]}
+
+    async def _get_job(self, request: _Request, job_id: str) -> Tuple[int, Any]:
+        job = self.service.jobs.get(int(job_id))
+        if job is None:
+            raise HttpError(404, f"No job {job_id}")
+        wait = min(float(request.query.get("wait", 0)), AGENT_LONG_POLL)
+        if wait > 0 and job.state not in FINISHED:
+            waiter = self._loop.create_future()
+            waiters = self._waiters.setdefault(job.id, set())
+            waiters.add(waiter)
+            try:
+                if job.state not in FINISHED:  # it may have finished before the waiter was registered
+                    await asyncio.wait_for(waiter, wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters.discard(waiter)
+                if not waiters:
+                    self._waiters.pop(job.id, None)
+        return 200, job_dict(job)
+
+    async def _cancel_job(self, request: _Request, job_id: str) -> Tuple[int, Any]:
+        return 200, {"cancelled": self.service.jobs.cancel(int(job_id))}
+
+    def _upload_path(self, sha: str, name: str) -> str:
+        name = os.path.basename(name)
+        if not name.lower().endswith(".apk"):
+            raise HttpError(400, "Only .apk uploads are accepted")
+        return os.path.abspath(os.path.join(self.upload_dir, sha, name))
+
+    async def _upload_info(self, request: _Request, sha: str, name: str) -> Tuple[int, Any]:
+        path = self._upload_path(sha, name)
+        if not os.path.isfile(path):
+            raise HttpError(404, "Not uploaded")
+        return 200, {"path": path}
+
+    async def _upload(self, request: _Request, sha: str, name: str) -> Tuple[int, Any]:
+        path = self._upload_path(sha, name)
+        if os.path.isfile(path):
+            return 200, {"path": path}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.{id(request)}.part"
+        try:
+            digest = await request.save(partial)
+            if digest != sha:
+                raise HttpError(400, f"Upload checksum mismatch ({digest})")
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        logger.info(f"Agent stored upload {name} ({sha[:12]})")
+        return 201, {"path": path}
+
+    # ---------- WebSocket ----------
+
+    async def _events(self, request: _Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        key = request.headers.get("sec-websocket-key")
+        if not key:
+            self._respond(writer, 400, {"error": "Missing Sec-WebSocket-Key"}, keep_alive=False)
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n").encode())
+        # Snapshot, then live updates: no await in between, so nothing published is missed.
+        for row in self.service.device_rows():
+            writer.write(ws_frame(json.dumps({"type": "device", "serial": row["serial"], "fields": row}).encode()))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=AGENT_EVENT_BACKLOG)
+        self._subscribers.add(queue)
+        receiver = asyncio.create_task(self._ws_receive(reader, writer, queue))
+        try:
+            await writer.drain()
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                frames = [event]
+                while not queue.empty() and frames[-1] is not None:  # batch whatever piled up into one drain
+                    frames.append(queue.get_nowait())
+                for e in frames:
+                    if e is not None:
+                        writer.write(ws_frame(json.dumps(e, ensure_ascii=False).encode()))
+                await writer.drain()
+                if frames[-1] is None:
+                    break
+        finally:
+            self._subscribers.discard(queue)
+            receiver.cancel()
+
+    async def _ws_receive(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                          queue: asyncio.Queue) -> None:
+        """Answer pings and the close handshake; client text frames are ignored."""
+        try:
+            while True:
+                opcode, data = await _read_ws_frame(reader)
+                if opcode == WS_PING:
+                    writer.write(ws_frame(data, WS_PONG))
+                elif opcode == WS_CLOSE:
+                    writer.write(ws_frame(data[:2], WS_CLOSE))
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._offer(queue, None)
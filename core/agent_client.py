@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set
+from urllib.parse import quote, urlsplit
+
+from core.adb_exec import current_cancel
+from core.agent import WS_CLOSE, WS_PING, WS_PONG, WS_TEXT, ws_accept, ws_frame
+from core.constants import AGENT_HTTP_TIMEOUT, AGENT_LONG_POLL, AGENT_PORT, JOB_HISTORY
+from core.jobs import FINISHED
+from core.logger import logger
+
+
+class AgentError(RuntimeError):
+    """The agent rejected a request or could not be reached."""
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class AgentClient:
+    """
+    Client side of agent mode (see core.agent).
+
+    - One keep-alive HTTP connection per calling thread (jobs call in from several threads
+      at once); a connection the agent closed is reopened once.
+    - run() submits an operation as an agent job and long-polls until it finished; cancelling
+      the calling job (core.adb_exec.current_cancel) cancels the agent job as well.
+    - APKs are uploaded once per content hash; the agent installs from its copy.
+    - subscribe() streams events (device rows, job changes, log lines) over one WebSocket on a
+      background thread and reconnects with backoff.
+    """
+
+    def __init__(self, url: str, *, token: Optional[str] = None, timeout: float = AGENT_HTTP_TIMEOUT) -> None:
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or AGENT_PORT
+        self.url = f"http://{self.host}:{self.port}"
+        self.token = token
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conns: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._uploads: Dict[tuple, str] = {}   # (path, size, mtime) -> agent-side path
+        self.own_jobs: Set[int] = set()        # agent job ids submitted by this client (recent JOB_HISTORY)
+        self._own_order: Deque[int] = deque()
+        self._stop = threading.Event()
+        self._ws: Optional[socket.socket] = None
+        self._ws_thread: Optional[threading.Thread] = None
+
+    # ---------- Transport ----------
+
+    def _headers(self, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = dict(extra or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            conn.connect()
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            with self._lock:
+                if conn in self._conns:
+                    self._conns.remove(conn)
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, *,
+                upload: Optional[str] = None) -> Any:
+        """
+        One API call; returns the decoded JSON body or raises AgentError. `upload` sends a file as the body.
+
+        A failed call is sent once more only when that can't run it twice: GET / PUT / DELETE, a
+        request that was never written, or a kept-alive connection the agent had already closed
+        (RemoteDisconnected: no response at all). A POST that fails later raises, since the agent
+        may have queued its jobs.
+        """
+        headers = self._headers({"Content-Type": "application/json"} if body is not None else {})
+        idempotent = method in ("GET", "HEAD", "PUT", "DELETE")
+        for attempt in (1, 2):
+            sent = reused = False
+            try:
+                reused = getattr(self._local, "conn", None) is not None
+                conn = self._connection()
+                if upload is not None:
+                    with open(upload, "rb") as f:
+                        headers["Content-Length"] = str(os.fstat(f.fileno()).st_size)
+                        conn.request(method, path, f, headers)
+                else:
+                    conn.request(method, path, json.dumps(body).encode() if body is not None else None, headers)
+                sent = True
+                resp = conn.getresponse()
+                raw = resp.read()
+                if resp.will_close:
+                    self._drop_connection()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_connection()
+                stale = reused and isinstance(e, http.client.RemoteDisconnected)
+                if attempt == 2 or (sent and not idempotent and not stale):
+                    raise AgentError(f"Agent unreachable at {self.url}: {e}") from e
+        try:
+            data = json.loads(raw or b"null")
+        except ValueError:
+            raise AgentError(f"Bad response from agent: {raw[:200]!r}", resp.status)
+        if resp.status >= 400:
+            error = data.get("error") if isinstance(data, dict) else data
+            raise AgentError(f"Agent {method} {path}: {resp.status} {error}", resp.status)
+        return data
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._ws is not None:
+            try:
+                self._ws.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+    # ---------- API ----------
+
+    def health(self) -> Dict[str, Any]:
+        return self.request("GET", "/api/health")
+
+    def devices(self) -> List[Dict[str, Any]]:
+        return self.request("GET", "/api/devices")["devices"]
+
+    def submit(self, operation: str, devices: Sequence[Optional[str]], params: Optional[Dict[str, Any]] = None,
+               *, priority: Any = "normal", timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        body = {"operation": operation, "devices": list(devices) or [None], "params": params or {},
+                "priority": priority, "timeout": timeout}
+        jobs = self.request("POST", "/api/jobs", body)["jobs"]
+        with self._lock:
+            for job in jobs:
+                self.own_jobs.add(job["id"])
+                self._own_order.append(job["id"])
+            while len(self._own_order) > JOB_HISTORY:
+                self.own_jobs.discard(self._own_order.popleft())
+        return jobs
+
+    def job(self, job_id: int, wait: float = 0.0) -> Dict[str, Any]:
+        return self.request("GET", f"/api/jobs/{job_id}?wait={wait:g}")
+
+    def cancel(self, job_id: int) -> bool:
+        return self.request("DELETE", f"/api/jobs/{job_id}")["cancelled"]
+
+    def wait(self, job_id: int) -> Dict[str, Any]:
+        """Long-poll until the job finished (each poll is held by the agent for up to AGENT_LONG_POLL)."""
+        while True:
+            job = self.job(job_id, wait=AGENT_LONG_POLL)
+            if job["state"] in FINISHED:
+                return job
+
+    def run(self, operation: str, device: Optional[str], *, priority: Any = "normal",
+            timeout: Optional[float] = None, **params) -> Any:
+        """
+        Run one operation on the agent and return its result (blocking). Raises AgentError
+        if the agent job failed, timed out or was cancelled.
+        """
+        job_id = self.submit(operation, [device], params, priority=priority, timeout=timeout)[0]["id"]
+        cancel = current_cancel()
+        unregister = cancel.on_cancel(lambda: self.cancel(job_id)) if cancel is not None else None
+        try:
+            job = self.wait(job_id)
+        finally:
+            if unregister is not None:
+                unregister()
+        if job["state"] != "done":
+            raise AgentError(f"Agent job {operation} on {job['device']} {job['state']}"
+                             + (f": {job['error']}" if job["error"] else ""))
+        return job["result"]
+
+    def upload(self, path: str) -> str:
+        """Copy a local APK to the agent (skipped if the agent already has this content); returns its path there."""
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime)
+        if key in self._uploads:
+            return self._uploads[key]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        target = f"/api/uploads/{digest.hexdigest()}/{quote(os.path.basename(path))}"
+        try:
+            remote = self.request("GET", target)["path"]
+        except AgentError as e:
+            if e.status != 404:
+                raise
+            logger.info(f"Uploading {os.path.basename(path)} ({st.st_size / 1e6:.1f} MB) to agent {self.url}")
+            remote = self.request("PUT", target, upload=path)["path"]
+        self._uploads[key] = remote
+        return remote
+
+    # ---------- Events ----------
+
+    def subscribe(self, on_event: Callable[[Dict[str, Any]], None]) -> None:
+        """Call on_event(event) for every agent event, on a background thread, until close()."""
+        if self._ws_thread is not None and self._ws_thread.is_alive():
+            return
+        self._ws_thread = threading.Thread(target=self._event_loop, args=(on_event,), name="agent-events",
+                                           daemon=True)
+        self._ws_thread.start()
+
+    def _event_loop(self, on_event: Callable[[Dict[str, Any]], None]) -> None:
+        delay = 0.5
+        while not self._stop.is_set():
+            try:
+                self._ws_session(on_event)
+                delay = 0.5
+            except (OSError, ConnectionError, AgentError) as e:
+                if self._stop.is_set():
+                    break
+                logger.warning(f"Agent event stream lost ({e}); reconnecting in {delay:.1f}s")
+            self._stop.wait(delay)
+            delay = min(delay * 2, 10.0)
+
+    def _ws_session(self, on_event: Callable[[Dict[str, Any]], None]) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._ws = sock
+        try:
+            key = base64.b64encode(os.urandom(16)).decode()
+            head = "".join(f"{k}: {v}\r\n" for k, v in self._headers({
+                "Host": f"{self.host}:{self.port}", "Upgrade": "websocket", "Connection": "Upgrade",
+                "Sec-WebSocket-Key": key, "Sec-WebSocket-Version": "13",
+            }).items())
+            sock.sendall(f"GET /api/events HTTP/1.1\r\n{head}\r\n".encode())
+            stream = sock.makefile("rb")
+            status = stream.readline().decode("latin-1")
+            headers = {}
+            for line in iter(stream.readline, b"\r\n"):
+                if not line:
+                    raise ConnectionError("Agent closed the event stream handshake")
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if " 101 " not in status or headers.get("sec-websocket-accept") != ws_accept(key):
+                raise AgentError(f"Agent refused the event stream: {status.strip()}")
+            sock.settimeout(None)  # events can be minutes apart
+            logger.info(f"Subscribed to agent events at {self.url}")
+            while not self._stop.is_set():
+                opcode, data = self._read_frame(stream)
+                if opcode == WS_TEXT:
+                    try:
+                        on_event(json.loads(data))
+                    except Exception:
+                        logger.exception("Agent event handler failed")
+                elif opcode == WS_PING:
+                    sock.sendall(ws_frame(data, WS_PONG, mask=True))
+                elif opcode == WS_CLOSE:
+                    raise ConnectionError("Agent closed the event stream")
+        finally:
+            self._ws = None
+            try:
+                sock.sendall(ws_frame(b"", WS_CLOSE, mask=True))
+            except OSError:
+                pass
+            sock.close()
+
+    @staticmethod
+    def _read_frame(stream) -> tuple:
+        def _exactly(n: int) -> bytes:
+            data = stream.read(n)
+            if len(data) < n:
+                raise ConnectionError("Agent event stream ended")
+            return data
+
+        b0, b1 = _exactly(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", _exactly(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", _exactly(8))[0]
+        return b0 & 0x0F, _exactly(n)
+
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from core.constants import INSTALL_MAX_PARALLEL_WRITES
+from core.logger import logger
+
+_SESSION_ID = re.compile(r"\[(\d+)\]")
+
+# Minimum device SDK for each install path
+_SDK_SESSION_STDIN = 24     # pm install-write ... - (stdin)
+_SDK_STREAMING = 30         # adb install --streaming
+
+
+@dataclass
+class InstallResult:
+    ok: bool
+    message: str
+    mode: str                       # session / install / install-multiple
+    total_bytes: int = 0
+    duration: float = 0.0
+    split_times: Dict[str, float] = field(default_factory=dict)
+    stage: str = "commit"           # session mode: where it stopped (create / write / commit)
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return (self.total_bytes / 1e6) / self.duration if self.duration > 0 else 0.0
+
+    def summary(self) -> str:
+        status = "Success" if self.ok else "Failure"
+        return (
+            f"{status} via {self.mode}: {len(self.split_times) or 1} file(s), "
+            f"{self.total_bytes / 1e6:.1f} MB in {self.duration:.1f}s ({self.throughput_mb_s:.1f} MB/s)"
+            + ("" if self.ok else f" - {self.message}")
+        )
+
+
+class ApkInstaller:
+    """
+    Install engine for single and split APKs.
+
+    - session:          pm install-create / install-write / install-commit; each split is
+                        streamed from disk into the package manager by its own adb process
+                        (writes overlap), then committed once. Needs SDK 24+ and `adb exec-in`.
+    - install-multiple: `adb install-multiple` (App Bundle splits in one step), with
+                        --streaming on SDK 30+.
+    - install:          `adb install` for a single APK, with --streaming on SDK 30+.
+
+    mode="auto" tries session first and falls back to install / install-multiple.
+    """
+
+    def __init__(self, run: Callable[..., str], sdk_of: Callable[[Optional[str]], int]) -> None:
+        self._run = run
+        self._sdk_of = sdk_of
+
+    def install(self, paths: Sequence[str], device_ip: Optional[str] = None, *,
+                mode: str = "auto", flags: Sequence[str] = ("-r", "-d")) -> InstallResult:
+        paths = list(paths)
+        missing = [p for p in paths if not os.path.isfile(p)]
+        if not paths or missing:
+            return InstallResult(False, f"APK not found: {', '.join(missing) or '(none)'}", mode)
+
+        sdk = self._sdk_of(device_ip) or 0
+        if mode == "auto":
+            if sdk >= _SDK_SESSION_STDIN:
+                result = self.install_session(paths, device_ip, flags=flags)
+                if result.ok or result.stage == "commit":
+                    return result  # a commit failure is the package manager's verdict; don't retry
+                logger.warning(f"Session install failed ({result.message}); falling back to adb install.")
+            mode = "install-multiple" if len(paths) > 1 else "install"
+        if mode == "session":
+            return self.install_session(paths, device_ip, flags=flags)
+        return self._install_adb(paths, device_ip, mode, flags, streaming=sdk >= _SDK_STREAMING)
+
+    # ---------- adb install / install-multiple ----------
+
+    def _install_adb(self, paths: List[str], device_ip: Optional[str], mode: str,
+                     flags: Sequence[str], streaming: bool) -> InstallResult:
+        verb = "install-multiple" if mode == "install-multiple" or len(paths) > 1 else "install"
+        argv = ["adb", verb, *flags, *(["--streaming"] if streaming else []), *paths]
+        total = sum(os.path.getsize(p) for p in paths)
+        start = time.perf_counter()
+        out = self._run(argv, device_ip)
+        duration = time.perf_counter() - start
+        return InstallResult("Success" in out, out, verb, total, duration,
+                             {os.path.basename(p): duration for p in paths})
+
+    # ---------- pm install sessions ----------
+
+    def install_session(self, paths: List[str], device_ip: Optional[str],
+                        flags: Sequence[str] = ("-r", "-d")) -> InstallResult:
+        sizes = {p: os.path.getsize(p) for p in paths}
+        total = sum(sizes.values())
+        start = time.perf_counter()
+
+        out = self._run(["adb", "shell", "pm", "install-create", *flags, "-S", str(total)], device_ip)
+        m = _SESSION_ID.search(out)
+        if not m:
+            return InstallResult(False, f"install-create failed: {out}", "session", total, stage="create")
+        session = m.group(1)
+
+        def _write(item) -> tuple[str, float, str]:
+            index, path = item
+            name = f"{index}_{os.path.basename(path)}"
+            t0 = time.perf_counter()
+            res = self._run(
+                ["adb", "exec-in", "pm", "install-write", "-S", str(sizes[path]), session, name, "-"],
+                device_ip,
+                stdin_path=path,
+            )
+            return name, time.perf_counter() - t0, res
+
+        split_times: Dict[str, float] = {}
+        failures: List[str] = []
+        workers = max(1, min(INSTALL_MAX_PARALLEL_WRITES, len(paths)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, elapsed, res in pool.map(_write, enumerate(paths)):
+                split_times[name] = elapsed
+                if "Success" not in res:
+                    failures.append(f"{name}: {res or 'no output'}")
+
+        if failures:
+            self._run(["adb", "shell", "pm", "install-abandon", session], device_ip)
+            return InstallResult(False, "; ".join(failures), "session", total,
+                                 time.perf_counter() - start, split_times, stage="write")
+
+        out = self._run(["adb", "shell", "pm", "install-commit", session], device_ip)
+        duration = time.perf_counter() - start
+        return InstallResult("Success" in out, out, "session", total, duration, split_times)
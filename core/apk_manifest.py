@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import threading
+import zipfile
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+# --- Binary XML (AXML) chunk types ---
+_RES_STRING_POOL_TYPE = 0x0001
+_RES_XML_TYPE = 0x0003
+_RES_XML_START_ELEMENT_TYPE = 0x0102
+_RES_XML_END_ELEMENT_TYPE = 0x0103
+_RES_XML_RESOURCE_MAP_TYPE = 0x0180
+_UTF8_FLAG = 0x100
+
+# --- Typed value types ---
+_TYPE_REFERENCE = 0x01
+_TYPE_STRING = 0x03
+_TYPE_INT_DEC = 0x10
+_TYPE_INT_HEX = 0x11
+_TYPE_BOOLEAN = 0x12
+
+# android: attribute resource ids (used when attribute names are stripped/obfuscated)
+_ATTR_IDS = {
+    0x01010003: "name",
+    0x0101021B: "versionCode",
+    0x0101021C: "versionName",
+    0x0101020C: "minSdkVersion",
+    0x01010270: "targetSdkVersion",
+    0x01010202: "targetActivity",
+    0x01010010: "exported",
+    0x0101000E: "enabled",
+}
+
+_ACTION_MAIN = "android.intent.action.MAIN"
+_CATEGORY_LAUNCHER = "android.intent.category.LAUNCHER"
+_CATEGORY_LEANBACK = "android.intent.category.LEANBACK_LAUNCHER"
+
+
+class ApkParseError(ValueError):
+    """The file is not an APK or its AndroidManifest.xml could not be decoded."""
+
+
+@dataclass(frozen=True)
+class ApkInfo:
+    path: str
+    sha256: str
+    package: str
+    split: str = ""                   # name of a split APK ('' for the base APK)
+    version_code: int = 0
+    version_name: str = ""
+    min_sdk: int = 1
+    target_sdk: int = 0
+    launcher_activity: str = ""       # android.intent.category.LAUNCHER
+    leanback_activity: str = ""       # android.intent.category.LEANBACK_LAUNCHER (Android TV)
+    activities: Tuple[str, ...] = field(default=(), repr=False)
+
+    @property
+    def main_activity(self) -> str:
+        """Activity to launch on a TV: leanback launcher first, phone launcher as fallback."""
+        return self.leanback_activity or self.launcher_activity
+
+    @property
+    def launch_component(self) -> str:
+        """'package/activity' for `am start -n`, or '' if the APK has no launcher activity."""
+        return f"{self.package}/{self.main_activity}" if self.main_activity else ""
+
+    def summary(self) -> str:
+        return (
+            f"{self.package} {self.version_name or '?'} (versionCode {self.version_code}), "
+            f"minSdk {self.min_sdk}, targetSdk {self.target_sdk}, launch: {self.main_activity or 'n/a'}"
+        )
+
+
+# ---------- AXML decoding ----------
+
+def _decode_string_pool(data: bytes, offset: int) -> List[str]:
+    _, header_size, _ = struct.unpack_from("<HHI", data, offset)
+    count, _, flags, strings_start, _ = struct.unpack_from("<IIIII", data, offset + 8)
+    offsets = struct.unpack_from(f"<{count}I", data, offset + header_size)
+    base = offset + strings_start
+    utf8 = bool(flags & _UTF8_FLAG)
+    strings: List[str] = []
+    for rel in offsets:
+        pos = base + rel
+        if utf8:
+            # UTF-16 length (1 or 2 bytes), then UTF-8 byte length (1 or 2 bytes), then bytes
+            n = data[pos]
+            pos += 2 if n & 0x80 else 1
+            n = data[pos]
+            if n & 0x80:
+                n = ((n & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            strings.append(data[pos:pos + n].decode("utf-8", errors="replace"))
+        else:
+            n = struct.unpack_from("<H", data, pos)[0]
+            pos += 2
+            if n & 0x8000:
+                n = ((n & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos)[0]
+                pos += 2
+            strings.append(data[pos:pos + n * 2].decode("utf-16-le", errors="replace"))
+    return strings
+
+
+def _iter_elements(data: bytes):
+    """Yield ('start', tag, {attr: value}) / ('end', tag, None) from an AXML document."""
+    if len(data) < 8:
+        raise ApkParseError("AndroidManifest.xml is truncated")
+    doc_type, doc_header, doc_size = struct.unpack_from("<HHI", data, 0)
+    if doc_type != _RES_XML_TYPE:
+        raise ApkParseError("AndroidManifest.xml is not binary XML")
+
+    strings: List[str] = []
+    res_ids: List[int] = []
+    pos = doc_header
+    end = min(doc_size, len(data))
+    while pos + 8 <= end:
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, pos)
+        if chunk_size < 8:
+            raise ApkParseError("Corrupt AXML chunk")
+        if chunk_type == _RES_STRING_POOL_TYPE:
+            strings = _decode_string_pool(data, pos)
+        elif chunk_type == _RES_XML_RESOURCE_MAP_TYPE:
+            res_ids = list(struct.unpack_from(f"<{(chunk_size - header_size) // 4}I", data, pos + header_size))
+        elif chunk_type in (_RES_XML_START_ELEMENT_TYPE, _RES_XML_END_ELEMENT_TYPE):
+            ext = pos + header_size
+            _, name_idx = struct.unpack_from("<iI", data, ext)
+            tag = strings[name_idx] if name_idx < len(strings) else ""
+            if chunk_type == _RES_XML_END_ELEMENT_TYPE:
+                yield "end", tag, None
+            else:
+                attr_start, attr_size, attr_count = struct.unpack_from("<HHH", data, ext + 8)
+                attrs: Dict[str, object] = {}
+                for i in range(attr_count):
+                    a = ext + attr_start + i * attr_size
+                    _, a_name, a_raw, _, _, a_type, a_data = struct.unpack_from("<iIIHBBI", data, a)
+                    name = _ATTR_IDS.get(res_ids[a_name]) if a_name < len(res_ids) else None
+                    if not name:
+                        name = strings[a_name] if a_name < len(strings) else ""
+                    if a_type == _TYPE_STRING:
+                        value: object = strings[a_data] if a_data < len(strings) else ""
+                    elif a_type in (_TYPE_INT_DEC, _TYPE_INT_HEX):
+                        value = a_data
+                    elif a_type == _TYPE_BOOLEAN:
+                        value = a_data != 0
+                    elif a_type == _TYPE_REFERENCE:
+                        value = f"@0x{a_data:08x}"
+                    elif a_raw != 0xFFFFFFFF and a_raw < len(strings):
+                        value = strings[a_raw]
+                    else:
+                        value = a_data
+                    attrs[name] = value
+                yield "start", tag, attrs
+        pos += chunk_size
+
+
+def _qualify(package: str, name: str) -> str:
+    if name.startswith("."):
+        return package + name
+    if "." not in name:
+        return f"{package}.{name}"
+    return name
+
+
+def parse_manifest(data: bytes, *, path: str = "", sha256: str = "") -> ApkInfo:
+    package = version_name = split = ""
+    version_code, min_sdk, target_sdk = 0, 1, 0
+    activities: List[str] = []
+    launcher = leanback = ""
+
+    stack: List[str] = []
+    activity: Optional[str] = None
+    actions: List[str] = []
+    categories: List[str] = []
+
+    for kind, tag, attrs in _iter_elements(data):
+        if kind == "end":
+            if stack:
+                stack.pop()
+            if tag == "intent-filter" and activity:
+                if _ACTION_MAIN in actions:
+                    if _CATEGORY_LEANBACK in categories and not leanback:
+                        leanback = activity
+                    if _CATEGORY_LAUNCHER in categories and not launcher:
+                        launcher = activity
+            elif tag in ("activity", "activity-alias"):
+                activity = None
+            continue
+
+        stack.append(tag)
+        if tag == "manifest":
+            package = str(attrs.get("package", ""))
+            split = str(attrs.get("split", ""))
+            code = attrs.get("versionCode", 0)
+            version_code = int(code) if isinstance(code, int) or str(code).isdigit() else 0
+            version_name = str(attrs.get("versionName", ""))
+        elif tag == "uses-sdk":
+            if isinstance(attrs.get("minSdkVersion"), int):
+                min_sdk = int(attrs["minSdkVersion"])
+            if isinstance(attrs.get("targetSdkVersion"), int):
+                target_sdk = int(attrs["targetSdkVersion"])
+        elif tag in ("activity", "activity-alias") and len(stack) >= 2 and stack[-2] == "application":
+            activity = _qualify(package, str(attrs.get("name", "")))
+            activities.append(activity)
+        elif tag == "intent-filter":
+            actions, categories = [], []
+        elif tag == "action":
+            actions.append(str(attrs.get("name", "")))
+        elif tag == "category":
+            categories.append(str(attrs.get("name", "")))
+
+    if not package:
+        raise ApkParseError("Manifest has no package name")
+    return ApkInfo(
+        path=path,
+        sha256=sha256,
+        package=package,
+        split=split,
+        version_code=version_code,
+        version_name=version_name,
+        min_sdk=min_sdk,
+        target_sdk=target_sdk or min_sdk,
+        launcher_activity=launcher,
+        leanback_activity=leanback,
+        activities=tuple(activities),
+    )
+
+
+# ---------- APK access + memoization ----------
+
+_by_hash: Dict[str, ApkInfo] = {}
+_hash_by_stat: Dict[Tuple[str, int, int], str] = {}
+_cache_lock = threading.Lock()
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file; cached per (path, size, mtime) so re-selecting the same APK is free."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        cached = _hash_by_stat.get(key)
+    if cached:
+        return cached
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _cache_lock:
+        _hash_by_stat[key] = digest
+    return digest
+
+
+def read_apk_info(path: str) -> ApkInfo:
+    """
+    Parse package / version / SDK / launcher activity from an APK.
+
+    Only the zip central directory and the AndroidManifest.xml entry are read; the
+    result is memoized by file hash.
+    """
+    digest = file_sha256(path)
+    with _cache_lock:
+        cached = _by_hash.get(digest)
+    if cached is not None:
+        return cached if cached.path == path else replace(cached, path=path)
+    try:
+        with zipfile.ZipFile(path) as zf:
+            data = zf.read("AndroidManifest.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ApkParseError(f"Not a valid APK: {e}") from e
+    try:
+        info = parse_manifest(data, path=path, sha256=digest)
+    except (struct.error, IndexError) as e:
+        raise ApkParseError(f"Could not decode AndroidManifest.xml: {e}") from e
+    with _cache_lock:
+        _by_hash[digest] = info
+    return info
+
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import csv
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, List, Optional, Sequence
+
+from core.constants import APP_START_ITERATIONS, APP_START_SETTLE
+from core.logger import logger
+from core.stats import percentiles
+
+_AM_FIELD = re.compile(r"^(Status|LaunchState|Activity|TotalTime|WaitTime|ThisTime):\s*(\S+)", re.M)
+# "Displayed pkg/.Act: +1s200ms"; Android 12+ adds " for user 0" before the colon.
+_DISPLAYED = re.compile(r"Displayed (\S+?)(?: for user \d+)?: \+((?:\d+(?:ms|s|m|h))+)")
+_DURATION_PART = re.compile(r"(\d+)(ms|s|m|h)")
+_UNIT_MS = {"ms": 1, "s": 1000, "m": 60_000, "h": 3_600_000}
+
+MODES = ("cold", "warm")
+
+
+def parse_displayed_ms(text: str) -> int:
+    """'+1s234ms' style duration (as in logcat 'Displayed' lines) -> milliseconds."""
+    return sum(int(n) * _UNIT_MS[u] for n, u in _DURATION_PART.findall(text))
+
+
+def parse_am_start(output: str) -> Dict[str, str]:
+    """Fields of `am start -W` output (Status, LaunchState, TotalTime, WaitTime, ...)."""
+    return {k: v for k, v in _AM_FIELD.findall(output)}
+
+
+@dataclass
+class StartSample:
+    device: str
+    package: str
+    version_code: int
+    mode: str                 # cold / warm (what we asked for)
+    iteration: int
+    launch_state: str         # what the system reports (COLD / WARM / HOT), Android 10+
+    total_ms: Optional[int]   # am start -W TotalTime
+    wait_ms: Optional[int]    # am start -W WaitTime
+    displayed_ms: Optional[int]  # logcat 'Displayed' (if enabled)
+    status: str
+
+
+@dataclass
+class StartBenchmarkResult:
+    samples: List[StartSample]
+    duration: float = 0.0
+
+    def stats(self) -> Dict[tuple, Dict[str, Dict[str, float]]]:
+        """{(device, mode): {metric: percentiles}} plus ('all', mode) across devices."""
+        groups: Dict[tuple, List[StartSample]] = {}
+        for s in self.samples:
+            if s.status != "ok":
+                continue
+            groups.setdefault((s.device, s.mode), []).append(s)
+            groups.setdefault(("all", s.mode), []).append(s)
+        result = {}
+        for key, items in groups.items():
+            result[key] = {
+                metric: percentiles([getattr(s, metric) for s in items if getattr(s, metric) is not None])
+                for metric in ("total_ms", "wait_ms", "displayed_ms")
+                if any(getattr(s, metric) is not None for s in items)
+            }
+        return result
+
+    def summary(self) -> str:
+        lines = []
+        for (device, mode), metrics in sorted(self.stats().items()):
+            for metric, st in metrics.items():
+                lines.append(
+                    f"{device} {mode} {metric}: n={st['n']} median={st['median']:.0f} "
+                    f"p90={st['p90']:.0f} p99={st['p99']:.0f} min={st['min']:.0f} max={st['max']:.0f}"
+                )
+        failed = sum(1 for s in self.samples if s.status != "ok")
+        if failed:
+            lines.append(f"{failed} launch(es) failed")
+        return "\n".join(lines) or "no samples"
+
+    def write_csv(self, path: str) -> None:
+        """One row per launch; open in a spreadsheet or load several files to compare builds."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=[fld.name for fld in fields(StartSample)])
+            writer.writeheader()
+            for s in self.samples:
+                writer.writerow(asdict(s))
+
+
+class AppStartBenchmark:
+    """
+    Repeated cold/warm starts of one package on several devices (devices in parallel,
+    iterations on a device strictly sequential).
+
+    - cold: `am force-stop` (optionally `pm clear`) then `am start -W`.
+    - warm: HOME, then `am start -W` with the process still alive.
+    With use_logcat, the 'Displayed' line logged by the system for the same launch is
+    read in the same shell call (logcat -T since the launch).
+    """
+
+    def __init__(self, run: Callable[..., str]) -> None:
+        self._run = run
+
+    def _start(self, component: str, device: Optional[str], use_logcat: bool) -> tuple[Dict[str, str], Optional[int]]:
+        if use_logcat:
+            script = (
+                f"t=$(date +%s); am start -W -n {component}; "
+                f"logcat -d -v epoch -T \"$t.0\" -s ActivityTaskManager:I ActivityManager:I"
+            )
+            out = self._run(["adb", "shell", script], device)
+        else:
+            out = self._run(["adb", "shell", "am", "start", "-W", "-n", component], device)
+        fields_ = parse_am_start(out)
+        displayed = None
+        package = component.split("/", 1)[0]
+        for name, duration in _DISPLAYED.findall(out):
+            if name.split("/", 1)[0] == package:
+                displayed = parse_displayed_ms(duration)
+        return fields_, displayed
+
+    def run_device(self, device: Optional[str], component: str, *, iterations: int = APP_START_ITERATIONS,
+                   modes: Sequence[str] = MODES, clear_data: bool = False, use_logcat: bool = False,
+                   settle: float = APP_START_SETTLE, version_code: int = 0) -> List[StartSample]:
+        package = component.split("/", 1)[0]
+        samples: List[StartSample] = []
+        running = False
+        for i in range(1, iterations + 1):
+            for mode in modes:
+                if mode == "cold":
+                    self._run(["adb", "shell", "am", "force-stop", package], device)
+                    if clear_data:
+                        self._run(["adb", "shell", "pm", "clear", package], device)
+                else:
+                    # Warm start needs a live process: start it once if needed, then background it.
+                    if not running:
+                        self._start(component, device, False)
+                        time.sleep(settle)
+                    self._run(["adb", "shell", "input", "keyevent", "3"], device)
+                    time.sleep(0.5)
+                am, displayed = self._start(component, device, use_logcat)
+                running = am.get("Status") == "ok"
+
+                def _int(key: str) -> Optional[int]:
+                    return int(am[key]) if am.get(key, "").isdigit() else None
+
+                total = _int("TotalTime") if "TotalTime" in am else _int("ThisTime")
+                status = am.get("Status", "missing")
+                samples.append(StartSample(
+                    device=device or "default", package=package, version_code=version_code, mode=mode,
+                    iteration=i, launch_state=am.get("LaunchState", ""), total_ms=total,
+                    wait_ms=_int("WaitTime"), displayed_ms=displayed,
+                    status="ok" if status == "ok" and total is not None else status,
+                ))
+                logger.debug(
+                    f"app start {device or 'default'} {mode} #{i}: TotalTime={total} WaitTime={_int('WaitTime')}",
+                    extra={"device": device, "operation": f"app_start_{mode}",
+                           "duration_ms": total if total is not None else None},
+                )
+                time.sleep(settle)
+        return samples
+
+    def run(self, devices: Sequence[Optional[str]], component: str, *,
+            version_codes: Optional[Dict[Optional[str], int]] = None, **kwargs) -> StartBenchmarkResult:
+        devices = list(devices) or [None]
+        version_codes = version_codes or {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+            per_device = list(pool.map(
+                lambda d: self.run_device(d, component, version_code=version_codes.get(d, 0), **kwargs), devices
+            ))
+        result = StartBenchmarkResult([s for samples in per_device for s in samples],
+                                      time.perf_counter() - start)
+        logger.info(f"App start benchmark of {component} on {len(devices)} device(s) "
+                    f"took {result.duration:.1f}s", extra={"operation": "app_start_benchmark",
+                                                          "duration_ms": round(result.duration * 1000, 2)})
+        return result
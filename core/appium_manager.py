@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import http.client
 from time import sleep
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Tuple
 
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
@@ -18,18 +18,24 @@ from selenium.webdriver.support import expected_conditions as EC
 
 from PySide6.QtWidgets import QMessageBox
 
+from core.locator_cache import CachedElement, LocatorCache, ScreenKey, parse_bounds
 from core.logger import logger
+from core.uia2_client import Uia2Driver, Uia2Error
 
 
 class AppiumManager:
     """Handles Appium driver initialization and UI automation for Android TV."""
 
-    def __init__(self, log_func, parent=None, host: str = "127.0.0.1", port: int = 4723) -> None:
-        self.driver: Optional[webdriver.Remote] = None
+    def __init__(self, log_func, parent=None, host: str = "127.0.0.1", port: int = 4723,
+                 locators: Optional[LocatorCache] = None) -> None:
+        self.driver: Optional[webdriver.Remote | Uia2Driver] = None
         self.log = log_func
         self.parent = parent
         self.host = host
         self.port = port
+        # Resolved elements per (resolution, app version, screen); may be shared between managers.
+        self.locators = locators if locators is not None else LocatorCache()
+        self.screen_context: Tuple[str, str] = ("?", "?")  # (resolution, app version), set by the caller
 
     # ---------- Utility ----------
 
@@ -111,6 +117,23 @@ class AppiumManager:
             QMessageBox.critical(self.parent, "Appium Error", msg)
             self.driver = None
 
+    def init_direct(self, device_ip: Optional[str], run) -> None:
+        """
+        Attach straight to the device's UiAutomator2 server over an adb forward (no Appium
+        server hop). The rest of this class works the same on the resulting driver.
+        """
+        self.close_driver()
+        try:
+            self.driver = Uia2Driver.connect(device_ip, run)
+            self.log("Direct UiAutomator2 session initialized")
+            logger.info("Direct UiAutomator2 session initialized")
+        except Uia2Error as e:
+            msg = f"Failed to open a direct UiAutomator2 session: {e}"
+            self.log(msg)
+            logger.error(msg)
+            QMessageBox.critical(self.parent, "UiAutomator2 Error", msg)
+            self.driver = None
+
     # ---------- Quick Checks ----------
 
     def is_package_in_foreground(self, expected_package: str) -> bool:
@@ -125,6 +148,19 @@ class AppiumManager:
             self.log(f"Could not read current_package: {e}")
             return False
 
+    def is_session_alive(self) -> bool:
+        """True if the current driver session still answers (one cheap round trip)."""
+        if not self.driver:
+            return False
+        try:
+            if isinstance(self.driver, Uia2Driver):
+                return self.driver.client.status()
+            self.driver.current_package
+            return True
+        except WebDriverException as e:
+            self.log(f"Appium session is no longer valid: {e}")
+            return False
+
     def verify_login_screen_fast(self, texts_to_find: List[str], max_wait_ms: int = 1200) -> bool:
         """Quick check for login screen without long waiting."""
         driver = self.driver
@@ -152,14 +188,93 @@ class AppiumManager:
         self.log("Login screen not detected within short timeout.")
         return False
 
+    # ---------- Locator Cache ----------
+
+    def _screen(self, signature: str) -> ScreenKey:
+        return (*self.screen_context, signature)
+
+    def _session_id(self) -> Optional[str]:
+        return getattr(self.driver, "session_id", None)
+
+    def _locate(self, by: str, value: str, timeout: float = 0.0) -> Tuple[Any, Optional[Tuple[int, int, int, int]]]:
+        assert self.driver is not None, "Driver must be initialized"
+        if timeout > 0:
+            el = WebDriverWait(self.driver, timeout).until(EC.element_to_be_clickable((by, value)))
+        else:
+            el = self.driver.find_element(by, value)
+        return el, parse_bounds(el.get_attribute("bounds"))
+
+    def _remember(self, key: ScreenKey, by: str, value: str, el: Any, bounds) -> None:
+        if bounds is not None:
+            self.locators.put(key, CachedElement(
+                by, value, bounds, resource_id=value if by == AppiumBy.ID else "",
+                element=el, session=self._session_id()))
+
+    def _find(self, key: ScreenKey, by: str, value: str, timeout: float = 0.0) -> Any:
+        """Fresh lookup (waiting up to timeout for a clickable element); remembers the result."""
+        try:
+            el, bounds = self._locate(by, value, timeout)
+        except WebDriverException:
+            self.locators.invalidate(key)  # the screen no longer looks like what we cached
+            raise
+        self._remember(key, by, value, el, bounds)
+        return el
+
+    def _validate_screen(self, key: ScreenKey, timeout: float = 0.0) -> bool:
+        """
+        True if the screen was cached and its anchor element is still where it was (one lookup).
+        A moved or missing anchor drops the screen, so the callers fall back to fresh lookups.
+        """
+        anchor = self.locators.anchor(key)
+        if anchor is None:
+            return False
+        try:
+            el, bounds = self._locate(anchor.by, anchor.value, timeout)
+            if bounds == anchor.bounds:
+                self._remember(key, anchor.by, anchor.value, el, bounds)  # fresh handle for this session
+                return True
+        except WebDriverException:
+            pass
+        self.log(f"Cached layout of '{key[2]}' no longer matches; locating elements again.")
+        self.locators.invalidate(key)
+        return False
+
+    def _with_element(self, key: ScreenKey, by: str, value: str, use: Callable[[Any], Any],
+                      timeout: float = 0.0) -> Any:
+        """use(element) on the cached handle if it belongs to this session, else on a fresh lookup."""
+        entry = self.locators.get(key, by, value)
+        if entry is not None and entry.element is not None and entry.session == self._session_id():
+            try:
+                return use(entry.element)
+            except WebDriverException as e:
+                self.log(f"Cached element {value} failed ({type(e).__name__}); locating it again.")
+                self.locators.invalidate(key)
+        return use(self._find(key, by, value, timeout))
+
+    def _click(self, key: ScreenKey, by: str, value: str, timeout: float = 0.0) -> None:
+        """Click the cached handle (same session) or tap the cached center (earlier session), else look it up."""
+        assert self.driver is not None, "Driver must be initialized"
+        entry = self.locators.get(key, by, value)
+        if entry is not None:
+            try:
+                if entry.element is not None and entry.session == self._session_id():
+                    entry.element.click()
+                else:
+                    self.driver.tap([entry.center])
+                return
+            except WebDriverException as e:
+                self.log(f"Cached element {value} failed ({type(e).__name__}); locating it again.")
+                self.locators.invalidate(key)
+        self._find(key, by, value, timeout).click()
+
     # ---------- Focus Control & Info ----------
 
-    def _is_text_focused(self, text: str) -> bool:
+    def _is_text_focused(self, text: str, key: Optional[ScreenKey] = None) -> bool:
         assert self.driver is not None, "Driver must be initialized"
-        el = self.driver.find_element(
-            AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{text}")'
+        return self._with_element(
+            key or self._screen("login"), AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{text}")',
+            lambda el: str(el.get_attribute("focused")).lower() == "true",
         )
-        return str(el.get_attribute("focused")).lower() == "true"
 
     def get_focused_element_text(self) -> str:
         """
@@ -193,15 +308,18 @@ class AppiumManager:
             self.log("Driver not initialized; cannot move focus.")
             return False
 
+        # A cached login screen is validated with one anchor lookup instead of finding both buttons.
+        key = self._screen("login")
         try:
-            self.driver.find_element(AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{first_text}")')
-            self.driver.find_element(AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{second_text}")')
+            if not self._validate_screen(key):
+                self._find(key, AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{first_text}")')
+                self._find(key, AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{second_text}")')
         except (NoSuchElementException, WebDriverException) as e:
             self.log(f"Focus pre-check failed: {e}")
             return False
 
         try:
-            if self._is_text_focused(second_text):
+            if self._is_text_focused(second_text, key):
                 self.log("Second button already focused. Pressing OK.")
                 self._press(66)  # ENTER/OK
                 return True
@@ -209,10 +327,10 @@ class AppiumManager:
             pass
 
         try:
-            if self._is_text_focused(first_text):
+            if self._is_text_focused(first_text, key):
                 self.log("First button focused. Moving right to select second.")
                 self._press(21)  # LEFT
-                if self._is_text_focused(second_text):
+                if self._is_text_focused(second_text, key):
                     self._press(66)  # ENTER/OK
                     return True
         except (NoSuchElementException, WebDriverException):
@@ -236,14 +354,16 @@ class AppiumManager:
             )
             return
 
-        wait = WebDriverWait(self.driver, 1)
+        # Keypad buttons come from the locator cache once the keypad was seen with this
+        # resolution / app version; one anchor lookup checks the layout is unchanged.
+        key = self._screen("keypad")
+        self._validate_screen(key, timeout=1)
 
         for digit in number:
             button_id = f"tv.freetv.androidtv:id/keypadButton{KEYPAD_SUFFIX.get(digit, '')}"
             self.log(f"Clicking keypad digit '{digit}' (ID: {button_id})")
             try:
-                el = wait.until(EC.element_to_be_clickable((AppiumBy.ID, button_id)))
-                el.click()
+                self._click(key, AppiumBy.ID, button_id, timeout=1)
             except TimeoutException as e:
                 self.log(f"Failed to press digit {digit} (timeout): {e}")
                 logger.error(f"Failed to press digit {digit}: {e}")
@@ -261,6 +381,7 @@ class AppiumManager:
         except WebDriverException as e:
             self.log(f"Error during navigation: {e}")
 
+        logger.debug(self.locators.stats())
         self.log("Keeping Appium session open for further actions.")
 
     # ---------- Close Driver ----------
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from core.constants import (
+    APPIUM_CHROMEDRIVER_PORTS,
+    APPIUM_HOST,
+    APPIUM_MAX_RESTARTS,
+    APPIUM_PORT,
+    APPIUM_SERVER_PORTS,
+    APPIUM_START_TIMEOUT,
+    APPIUM_SYSTEM_PORTS,
+    APPIUM_WATCHDOG_INTERVAL,
+    LOG_DIR,
+)
+from core.logger import logger
+
+
+def appium_status(host: str, port: int, timeout: float = 1.0) -> bool:
+    """True if an Appium server answers GET /status with 200 on host:port."""
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request("GET", "/status")
+        return conn.getresponse().status == 200
+    except (http.client.HTTPException, OSError):
+        return False
+    finally:
+        conn.close()
+
+
+def _port_free(host: str, port: int) -> bool:
+    with socket.socket() as s:
+        try:
+            s.bind((host, port))
+            return True
+        except OSError:
+            return False
+
+
+@dataclass
+class AppiumServer:
+    device: Optional[str]              # adb serial the server is pinned to; None = unpinned default server
+    port: int
+    system_port: int                   # UiAutomator2 server port forwarded on this host
+    chromedriver_port: int
+    log_path: str
+    proc: Optional[subprocess.Popen] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    state: str = "stopped"             # starting / ready / crashed / failed / stopped / external
+    stopping: bool = False
+    history: List[float] = field(default_factory=list)   # crash timestamps
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.proc.pid if self.proc is not None else None
+
+    @property
+    def name(self) -> str:
+        return self.device or "default"
+
+    def capabilities(self) -> Dict[str, object]:
+        """Per-device capabilities; also passed to the server as --default-capabilities."""
+        caps: Dict[str, object] = {
+            "appium:systemPort": self.system_port,
+            "appium:chromedriverPort": self.chromedriver_port,
+        }
+        if self.device:
+            caps["appium:udid"] = self.device
+        return caps
+
+
+class AppiumServerPool:
+    """
+    One Appium server per device on allocated ports, supervised.
+
+    - Ports (server, UiAutomator2 systemPort, chromedriverPort) come from fixed ranges and
+      are only handed out if free on this host, so parallel sessions never collide.
+    - start() waits for GET /status with exponential backoff instead of a fixed sleep.
+    - A watchdog thread restarts servers that exit unexpectedly (with backoff, up to
+      APPIUM_MAX_RESTARTS) and marks them failed after that.
+    - stop()/stop_all() terminate only the processes this pool started (their whole
+      process group), never other Appium servers on the host.
+    - The unpinned default server uses APPIUM_PORT; if something already serves Appium
+      there it is used as-is ("external") and never stopped by us.
+    """
+
+    def __init__(self, log_func: Callable[..., None], *, host: str = APPIUM_HOST,
+                 appium_bin: Optional[str] = None,
+                 start_timeout: float = APPIUM_START_TIMEOUT,
+                 watchdog_interval: float = APPIUM_WATCHDOG_INTERVAL,
+                 max_restarts: int = APPIUM_MAX_RESTARTS) -> None:
+        self.log = log_func
+        self.host = host
+        self.appium_bin = appium_bin or os.environ.get("APPIUM_BIN", "appium")
+        self.start_timeout = start_timeout
+        self.watchdog_interval = watchdog_interval
+        self.max_restarts = max_restarts
+        self._servers: Dict[Optional[str], AppiumServer] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- Ports ----------
+
+    def _taken(self) -> Set[int]:
+        return {p for s in self._servers.values() for p in (s.port, s.system_port, s.chromedriver_port)}
+
+    def _allocate(self, port_range: Tuple[int, int], taken: Set[int]) -> int:
+        for port in range(*port_range):
+            if port not in taken and _port_free(self.host, port):
+                taken.add(port)
+                return port
+        raise RuntimeError(f"No free port in {port_range[0]}-{port_range[1] - 1}")
+
+    # ---------- Lifecycle ----------
+
+    def get(self, device: Optional[str] = None) -> Optional[AppiumServer]:
+        with self._lock:
+            return self._servers.get(device)
+
+    def start(self, device: Optional[str] = None) -> AppiumServer:
+        """Start (or return the running) server for a device; blocks until /status answers."""
+        with self._lock:
+            server = self._servers.get(device)
+            if server is not None and server.state in ("ready", "external", "starting"):
+                return server
+            if server is None:
+                taken = self._taken()
+                if device is None:
+                    port = APPIUM_PORT
+                    if appium_status(self.host, port):
+                        server = AppiumServer(None, port, 0, 0, "", state="external")
+                        self._servers[None] = server
+                        self.log(f"Appium already running on {self.host}:{port} (not managed by this tool)")
+                        return server
+                    taken.add(port)
+                else:
+                    port = self._allocate(APPIUM_SERVER_PORTS, taken)
+                server = AppiumServer(
+                    device, port,
+                    self._allocate(APPIUM_SYSTEM_PORTS, taken),
+                    self._allocate(APPIUM_CHROMEDRIVER_PORTS, taken),
+                    os.path.join(LOG_DIR, f"appium_{(device or 'default').replace(':', '_')}_{port}.log"),
+                )
+                self._servers[device] = server
+            server.stopping = False
+            self._spawn(server)
+        self._ensure_watchdog()
+        if not self._wait_ready(server):
+            with self._lock:
+                server.state = "failed"
+            self._terminate(server)
+            raise RuntimeError(f"Appium for {server.name} did not become ready on port {server.port}; "
+                               f"see {server.log_path}")
+        return server
+
+    def _spawn(self, server: AppiumServer) -> None:
+        if shutil.which(self.appium_bin) is None:
+            raise RuntimeError(f"'{self.appium_bin}' not found in PATH. Install Appium or set APPIUM_BIN.")
+        argv = [
+            shutil.which(self.appium_bin), "--address", self.host, "--port", str(server.port),
+            "--default-capabilities", json.dumps(server.capabilities()),
+        ]
+        os.makedirs(LOG_DIR, exist_ok=True)
+        with open(server.log_path, "ab") as log_file:
+            kwargs = ({"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt"
+                      else {"start_new_session": True})
+            server.proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=log_file,
+                                           stderr=subprocess.STDOUT, **kwargs)
+        server.started_at = time.monotonic()
+        server.state = "starting"
+        self.log(f"Starting Appium for {server.name} on port {server.port} "
+                 f"(systemPort {server.system_port}, chromedriverPort {server.chromedriver_port}, pid {server.pid})")
+
+    def _wait_ready(self, server: AppiumServer) -> bool:
+        deadline = time.monotonic() + self.start_timeout
+        delay = 0.1
+        while time.monotonic() < deadline:
+            if server.proc is None or server.proc.poll() is not None:
+                return False
+            if appium_status(self.host, server.port):
+                with self._lock:
+                    server.state = "ready"
+                elapsed = time.monotonic() - server.started_at
+                self.log(f"Appium for {server.name} ready on port {server.port} in {elapsed:.1f}s")
+                logger.info(f"Appium {server.name} ready", extra={
+                    "device": server.device, "operation": "appium_start", "duration_ms": round(elapsed * 1000, 2)})
+                return True
+            time.sleep(delay)
+            delay = min(delay * 1.5, 1.0)
+        return False
+
+    def _terminate(self, server: AppiumServer, grace: float = 5.0) -> None:
+        proc, server.proc = server.proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            if os.name == "nt":
+                subprocess.call(["taskkill", "/PID", str(proc.pid), "/T", "/F"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                os.killpg(proc.pid, signal.SIGTERM)  # appium is a node wrapper; take its children too
+            proc.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            if os.name == "nt":
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait(timeout=grace)
+        except (ProcessLookupError, OSError):
+            pass
+
+    def stop(self, device: Optional[str] = None) -> bool:
+        """Stop the server this pool started for a device; returns False if there was none."""
+        with self._lock:
+            server = self._servers.pop(device, None)
+        if server is None:
+            return False
+        if server.state == "external":
+            self.log(f"Appium on port {server.port} was not started by this tool; leaving it running")
+            return False
+        server.stopping = True
+        self._terminate(server)
+        server.state = "stopped"
+        self.log(f"Stopped Appium for {server.name} (port {server.port})")
+        return True
+
+    def stop_all(self) -> int:
+        with self._lock:
+            devices = list(self._servers)
+        stopped = sum(self.stop(d) for d in devices)
+        self._stop.set()
+        return stopped
+
+    # ---------- Watchdog ----------
+
+    def _ensure_watchdog(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="appium-watchdog", daemon=True)
+        self._thread.start()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.watchdog_interval):
+            with self._lock:
+                crashed = [s for s in self._servers.values()
+                           if s.state in ("ready", "crashed") and not s.stopping
+                           and (s.proc is None or s.proc.poll() is not None)]
+            for server in crashed:
+                self._restart(server)
+
+    def _restart(self, server: AppiumServer) -> None:
+        code = server.proc.returncode if server.proc is not None else None
+        server.history.append(time.time())
+        server.state = "crashed"
+        if server.restarts >= self.max_restarts:
+            server.state = "failed"
+            self.log(f"Appium for {server.name} exited (code {code}); gave up after "
+                     f"{server.restarts} restart(s), see {server.log_path}", "ERROR")
+            return
+        backoff = min(30.0, 2.0 ** server.restarts)
+        server.restarts += 1
+        self.log(f"Appium for {server.name} exited (code {code}); restarting in {backoff:.0f}s "
+                 f"({server.restarts}/{self.max_restarts})", "WARN")
+        if self._stop.wait(backoff) or server.stopping:
+            return
+        try:
+            with self._lock:
+                if not _port_free(self.host, server.port):
+                    raise RuntimeError(f"port {server.port} is now taken by another process")
+                self._spawn(server)
+            if not self._wait_ready(server):
+                server.state = "crashed"  # retried on the next watchdog pass
+                self._terminate(server)
+                self.log(f"Appium for {server.name} did not come back; see {server.log_path}", "ERROR")
+        except (OSError, RuntimeError) as e:
+            server.state = "failed"
+            self.log(f"Could not restart Appium for {server.name}: {e}", "ERROR")
+
+    # ---------- Reporting ----------
+
+    def servers(self) -> List[AppiumServer]:
+        with self._lock:
+            return list(self._servers.values())
+
+    def summary(self) -> str:
+        rows = [f"{s.name}: {s.state} port {s.port} pid {s.pid or '-'} restarts {s.restarts}"
+                for s in self.servers()]
+        return "Appium servers: " + ("; ".join(rows) if rows else "none")
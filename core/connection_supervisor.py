@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from core.constants import (
+    SUPERVISOR_BACKOFF_BASE,
+    SUPERVISOR_BACKOFF_MAX,
+    SUPERVISOR_PROBE_INTERVAL,
+    SUPERVISOR_READY_TIMEOUT,
+    SUPERVISOR_REBOOT_GRACE,
+)
+from core.logger import logger
+
+
+def parse_adb_devices(output: str) -> Dict[str, str]:
+    """`adb devices` output -> {serial: state} (state: device / offline / unauthorized / ...)."""
+    states: Dict[str, str] = {}
+    for line in output.splitlines():
+        if not line.strip() or line.startswith("List of devices") or line.startswith("*"):
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            states[parts[0]] = parts[1]
+    return states
+
+
+@dataclass
+class _Tracked:
+    serial: str
+    ready: threading.Event = field(default_factory=threading.Event)
+    state: str = "unknown"
+    attempts: int = 0
+    next_attempt: float = 0.0
+    hold_until: float = 0.0     # ignore "device" state until then (reboot in progress)
+
+
+class ConnectionSupervisor:
+    """
+    Keeps wireless-ADB devices we connected to alive.
+
+    - One `adb devices` call per interval probes every tracked device at once.
+    - Offline/missing devices are reconnected with exponential backoff + full jitter.
+    - After reboot_device the device is held "not ready" for a grace period, then reconnected.
+    - wait_ready() lets callers block until a device is back instead of failing on a timeout.
+    """
+
+    def __init__(
+        self,
+        run: Callable[..., str],
+        log_func: Callable[..., None],
+        *,
+        on_reconnect: Optional[Callable[[str], None]] = None,
+        interval: float = SUPERVISOR_PROBE_INTERVAL,
+        backoff_base: float = SUPERVISOR_BACKOFF_BASE,
+        backoff_max: float = SUPERVISOR_BACKOFF_MAX,
+    ) -> None:
+        self._run = run
+        self.log = log_func
+        self._on_reconnect = on_reconnect
+        self.interval = interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._devices: Dict[str, _Tracked] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- Tracking ----------
+
+    def track(self, serial: str) -> None:
+        """Start supervising a device we just connected (marks it ready)."""
+        with self._lock:
+            dev = self._devices.setdefault(serial, _Tracked(serial))
+            dev.state = "device"
+            dev.attempts = 0
+            dev.ready.set()
+        self._ensure_running()
+
+    def untrack(self, serial: str) -> None:
+        with self._lock:
+            dev = self._devices.pop(serial, None)
+        if dev:
+            dev.ready.set()  # release any waiters; the device is simply no longer supervised
+
+    def untrack_all(self) -> None:
+        with self._lock:
+            devices = list(self._devices.values())
+            self._devices.clear()
+        for dev in devices:
+            dev.ready.set()
+
+    def is_tracked(self, serial: str) -> bool:
+        with self._lock:
+            return serial in self._devices
+
+    def mark_rebooting(self, serial: str, grace: float = SUPERVISOR_REBOOT_GRACE) -> None:
+        """Called right after `adb reboot`: hold the device not-ready, reconnect once it comes back."""
+        with self._lock:
+            dev = self._devices.get(serial)
+            if dev is None:
+                return
+            now = time.monotonic()
+            dev.ready.clear()
+            dev.state = "rebooting"
+            dev.attempts = 0
+            dev.hold_until = now + grace
+            dev.next_attempt = now + grace
+        self._wake.set()
+
+    # ---------- Readiness ----------
+
+    def is_ready(self, serial: str) -> bool:
+        with self._lock:
+            dev = self._devices.get(serial)
+        return dev is None or dev.ready.is_set()
+
+    def wait_ready(self, serial: str, timeout: float = SUPERVISOR_READY_TIMEOUT) -> bool:
+        """Block until a supervised device is online. Unsupervised devices are always 'ready'."""
+        with self._lock:
+            dev = self._devices.get(serial)
+        if dev is None or dev.ready.is_set():
+            return True
+        self._wake.set()
+        return dev.ready.wait(timeout)
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {serial: dev.state for serial, dev in self._devices.items()}
+
+    # ---------- Loop ----------
+
+    def _ensure_running(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="adb-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _backoff(self, attempts: int) -> float:
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempts))
+        return random.uniform(self.backoff_base / 2, cap)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            delay = self.interval
+            try:
+                delay = self.poll_once()
+            except Exception:
+                logger.exception("Connection supervisor poll failed")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def poll_once(self) -> float:
+        """Probe all tracked devices once; returns how long to sleep before the next probe."""
+        with self._lock:
+            if not self._devices:
+                return self.interval
+        states = parse_adb_devices(self._run(["adb", "devices"]))
+        now = time.monotonic()
+
+        with self._lock:
+            devices = list(self._devices.values())
+
+        for dev in devices:
+            state = states.get(dev.serial, "missing")
+            if state == "device" and now >= dev.hold_until:
+                if not dev.ready.is_set():
+                    self.log(f"Device {dev.serial} is back online (after {dev.attempts} reconnect attempt(s)).")
+                    dev.attempts = 0
+                    dev.ready.set()
+                    if self._on_reconnect:
+                        self._on_reconnect(dev.serial)
+                dev.state = "device"
+                continue
+
+            if dev.ready.is_set():
+                self.log(f"Device {dev.serial} went {state}; reconnecting in background.", "WARN")
+                dev.ready.clear()
+                dev.next_attempt = now
+            if dev.state != "rebooting" or now >= dev.hold_until:
+                dev.state = state
+            if now >= dev.next_attempt:
+                self._reconnect(dev, state)
+                dev.attempts += 1
+                dev.next_attempt = time.monotonic() + self._backoff(dev.attempts)
+
+        # Poll faster while something is down so readiness flips soon after a reconnect succeeds.
+        pending = [d.next_attempt for d in devices if not d.ready.is_set()]
+        if not pending:
+            return self.interval
+        return min(self.interval, max(0.5, min(pending) - time.monotonic()))
+
+    def _reconnect(self, dev: _Tracked, state: str) -> None:
+        if state == "offline":
+            # A stale transport blocks a fresh connect; drop it first.
+            self._run(["adb", "disconnect", dev.serial])
+        out = self._run(["adb", "connect", dev.serial])
+        logger.info(f"Reconnect attempt {dev.attempts + 1} for {dev.serial}: {out}")
@@ -1,6 +1,8 @@
 # --- Packages ---
 FREETV_UAT_PACKAGE = "tv.freetv.androidtv.uat"
 FREETV_PROD_PACKAGE = "tv.freetv.androidtv"
+# Fallback launch activity when no APK metadata is available (same class in PROD and UAT)
+FREETV_MAIN_ACTIVITY = "pl.atende.mobile.tv.ui.gui.main.activity.MainActivity"
 
 # --- Dial keypad mapping (for login) ---
 KEYPAD_SUFFIX = {
@@ -74,6 +76,154 @@ APPIUM_PORT = 4723
 LOG_DIR = "logs"
 LOG_FILE = "android_manager.log"
 LOG_PATH = f"{LOG_DIR}/{LOG_FILE}"
+LOG_MAX_BYTES = 5 * 1024 * 1024   # rotate the active log at 5 MB
+LOG_BACKUP_COUNT = 7              # keep android_manager.log.1.gz .. .7.gz
+LOG_FORMAT = "text"               # "text" or "jsonl" (override: ANDROID_MANAGER_LOG_FORMAT)
+
+# ---- Wireless ADB / discovery ----
+ADB_PORT = 5555
+DISCOVERY_CONCURRENCY = 1024      # simultaneous TCP probes (clamped to the open-files limit)
+DISCOVERY_TIMEOUT = 0.5           # per-probe connect timeout, seconds
+
+# ---- adb command deadlines per command class (seconds), see core.adb_exec.classify ----
+ADB_DEADLINES = {
+    "key": 5.0,          # input keyevent / tap
+    "query": 15.0,       # read-only: getprop, dumpsys, pm list, devices ...
+    "shell": 30.0,       # other shell commands (am start, pm clear, force-stop ...)
+    "connect": 10.0,
+    "reboot": 30.0,
+    "install": 600.0,
+    "transfer": 900.0,   # push / pull / exec-out / bugreport
+    "default": 60.0,
+}
+ADB_HEDGE_DELAY = 1.0             # start a hedged copy of a read-only command after this long
+ADB_HEDGE_MIN_SAMPLES = 20        # ...or after the class's observed p95 once we have enough samples
+
+# ---- Connection supervisor (seconds) ----
+SUPERVISOR_PROBE_INTERVAL = 3.0   # one `adb devices` per interval for all tracked devices
+SUPERVISOR_BACKOFF_BASE = 1.0     # reconnect backoff: base * 2^attempt, full jitter
+SUPERVISOR_BACKOFF_MAX = 30.0
+SUPERVISOR_READY_TIMEOUT = 20.0   # how long a command waits for its device to come back
+SUPERVISOR_REBOOT_GRACE = 5.0     # ignore "device" state right after `adb reboot`
+
+# ---- APK install ----
+INSTALL_MAX_PARALLEL_WRITES = 4   # split APKs streamed into one pm session concurrently
+
+# ---- Fleet inventory ----
+INVENTORY_MAX_WORKERS = 16        # devices queried in parallel
+
+# ---- File transfer (adb sync protocol via the local adb server) ----
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = 5037
+SYNC_CHUNK_SIZE = 64 * 1024       # max DATA payload in the sync protocol
+TRANSFER_WORKERS = 4              # concurrent sync streams per device
+TRANSFER_MAX_DEVICES = 8          # devices transferring at once
+
+# ---- Diagnostics bundle ----
+DIAGNOSTICS_MAX_WORKERS = 16      # adb commands in flight across all devices
+DIAGNOSTICS_PER_DEVICE = 4        # ...and per device (adbd / dumpsys contend beyond this)
+
+# ---- App start benchmark ----
+APP_START_ITERATIONS = 10
+APP_START_SETTLE = 2.0            # seconds between launches so startup work can finish
+
+# ---- Frame / jank sampling ----
+JANK_SAMPLE_INTERVAL = 1.0        # seconds between framestats polls (keep < FRAMESTATS_BUFFER frames)
+FRAMESTATS_BUFFER = 120           # frames kept by `dumpsys gfxinfo <pkg> framestats`
+
+# ---- CPU / memory sampler ----
+RESOURCE_SAMPLE_HZ = 10.0
+RESOURCE_SAMPLE_CAPACITY = 36_000 # samples kept per channel (1 h at 10 Hz)
+
+# ---- Appium server pool (one server per device, see core.appium_servers) ----
+APPIUM_SERVER_PORTS = (4724, 4800)          # [start, stop) for per-device servers; APPIUM_PORT stays the default
+APPIUM_SYSTEM_PORTS = (8200, 8300)          # UiAutomator2 systemPort (the documented range)
+APPIUM_CHROMEDRIVER_PORTS = (9515, 9615)
+APPIUM_START_TIMEOUT = 60.0                 # seconds to wait for GET /status after spawning
+APPIUM_WATCHDOG_INTERVAL = 5.0
+APPIUM_MAX_RESTARTS = 5
+
+# ---- Direct UiAutomator2 client (no Appium hop), see core.uia2_client ----
+UIA2_DEVICE_PORT = 6790           # port the io.appium.uiautomator2.server listens on, on the device
+UIA2_SERVER_INSTRUMENTATION = "io.appium.uiautomator2.server.test/androidx.test.runner.AndroidJUnitRunner"
+UIA2_START_TIMEOUT = 30.0
+UIA2_HTTP_TIMEOUT = 10.0
+
+# ---- Fleet device table, see core.fleet and ui.sections.device_table ----
+FLEET_POLL_INTERVAL = 3.0         # seconds between `adb devices -l` polls
+FLEET_UI_FLUSH_MS = 250           # queued row updates are applied to the table at most this often
+
+# ---- Job scheduler (one serial queue per device), see core.jobs ----
+JOB_MAX_CONCURRENT = 16           # jobs running at once across all devices
+JOB_HISTORY = 500                 # finished jobs kept for the queue view
+JOB_TIMEOUTS = {                  # per-job deadline in seconds; adb commands are killed when it passes
+    "install_apk": 900.0,
+    "reboot": 120.0,
+    "push": None,                 # bulk transfers: no job deadline (each command has ADB_DEADLINES["transfer"]);
+    "pull": None,                 # cancel them from the queue view
+    "default": 300.0,
+}
+
+# ---- Agent mode: one host owns adb, GUIs drive it over HTTP / WebSocket, see core.agent ----
+AGENT_HOST = "127.0.0.1"          # bind address; serve other machines only with a token (--token)
+AGENT_PORT = 8765
+AGENT_UPLOAD_DIR = "agent_uploads"  # APKs uploaded by clients, one folder per SHA-256
+AGENT_IDLE_TIMEOUT = 60.0         # keep-alive connections idle longer than this are closed
+AGENT_LONG_POLL = 25.0            # longest a GET /api/jobs/<id>?wait=N request is held open
+AGENT_EVENT_BACKLOG = 1000        # events buffered per WebSocket client; the oldest are dropped beyond
+AGENT_MAX_JSON = 1024 * 1024      # request bodies other than uploads
+AGENT_HTTP_TIMEOUT = 30.0         # client socket timeout (long polls stay below it)
+
+# ---- Log browser (search over the active and rotated logs), see core.log_search ----
+LOG_INDEX_DIR = f"{LOG_DIR}/.index"  # decompressed rotated logs + their record index, reused across runs
+LOG_SEARCH_BLOCK = 1024 * 1024    # bytes scanned per step when searching newest-first
+LOG_SEARCH_PAGE = 200             # rows fetched into the browser per page
+
+# ---- Visual regression (screenshot sweeps compared with baselines), see core.visual_diff ----
+VISUAL_DIR = "visual"             # sweep files: which screens to capture and how to reach them
+VISUAL_RUNS_DIR = f"{VISUAL_DIR}/runs"  # one folder per run: <device>/<screen>.png, diffs, report.html
+VISUAL_MAX_DEVICES = 16           # devices capturing at once
+VISUAL_WORKERS = 0                # compare processes; 0 = one per CPU core
+VISUAL_SETTLE = 1.0               # seconds between navigating to a screen and capturing it
+VISUAL_CAPTURE_TIMEOUT = 20.0     # `adb exec-out screencap -p`
+VISUAL_PIXEL_THRESHOLD = 24       # per-channel difference (0-255) up to which a pixel counts as unchanged
+VISUAL_SSIM_BLOCK = 8             # window (pixels) of the SSIM-like score
+VISUAL_MIN_SCORE = 0.97           # a screen is "changed" below this score...
+VISUAL_MAX_CHANGED_PCT = 0.5      # ...or above this share (%) of unmasked pixels changed
+VISUAL_BASELINE_CACHE = 4         # decoded baselines kept per compare process (~6 MB each at 1080p)
+
+# ---- Key-to-screen latency probe, see core.input_latency ----
+INPUT_LATENCY_KEYS = "DOWN, UP, RIGHT, LEFT"
+INPUT_LATENCY_ITERATIONS = 20     # presses per key and device
+INPUT_LATENCY_GAP = 1.0           # seconds after a key before its frames are read (the response must finish)
+
+# ---- Key injection backend, see core.monkey_input ----
+KEY_BACKEND = "input"             # "input": `adb shell input keyevent` per key; "monkey": persistent `monkey --port`
+MONKEY_DEVICE_PORT = 1080         # port monkey listens on, on the device (forwarded with `adb forward tcp:0`)
+MONKEY_START_TIMEOUT = 10.0       # seconds to wait for a spawned monkey to answer
+MONKEY_TIMEOUT = 5.0              # per-command reply deadline (same as the "key" class in ADB_DEADLINES)
+MONKEY_RETRY_AFTER = 30.0         # after a failed start, keys fall back to `input` this long before trying again
+
+# ---- Element locator cache, see core.locator_cache ----
+LOCATOR_CACHE_SCREENS = 32        # (resolution, app version, screen) entries kept, least recently used evicted
+
+# ---- Scenario engine ----
+SCENARIO_DIR = "scenarios"
+SCENARIO_MAX_DEVICES = 8          # devices running a scenario at once
+SCENARIO_STEP_WORKERS = 4         # independent steps in flight per device
+SCENARIO_POLL_INTERVAL = 0.5      # seconds between UI dumps while waiting for a screen
+
+# ---- Precondition cache: how long a verified fact is trusted (seconds), see core.preconditions ----
+PRECONDITION_TTLS = {
+    "device_online": 15.0,
+    "appium_up": 30.0,
+    "session_healthy": 20.0,
+    "foreground": 5.0,            # short: the user can switch apps with the real remote
+}
+
+# ---- Device property cache (seconds) ----
+DEVICE_PROPS_TTL = 300.0          # model / OS / build facts
+DEVICE_PROPS_VOLATILE_TTL = 30.0  # values that can change while connected (IP)
 
 # ---- Login screen verification texts (Hebrew) ----
 LOGIN_FIRST_TEXT  = "להצטרפות וקבלת חודש ניסיון בחינם"
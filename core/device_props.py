@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from core.constants import DEVICE_PROPS_TTL
+from core.logger import logger
+
+# Sections of the batched snapshot script, in order. One `adb shell` fork collects all of them.
+_SEP = "__AAM_SECTION__"
+_SECTIONS = ("getprop", "ip", "wm_size", "wm_density", "boot_id", "device_name")
+_SNAPSHOT_SCRIPT = f"; echo {_SEP}; ".join([
+    "getprop",
+    "ip -f inet addr show wlan0",
+    "wm size",
+    "wm density",
+    "cat /proc/sys/kernel/random/boot_id",
+    "settings get global device_name",
+])
+
+_GETPROP_LINE = re.compile(r"^\[(?P<key>[^\]]+)\]: \[(?P<value>.*)\]$")
+_WM_VALUE = re.compile(r"(\d+)x(\d+)")
+
+
+@dataclass(frozen=True)
+class DeviceProps:
+    """Typed snapshot of one device's properties, taken in a single shell round trip."""
+
+    serial: str
+    model: str = ""
+    manufacturer: str = ""
+    brand: str = ""
+    device: str = ""
+    device_name: str = ""
+    android_version: str = ""
+    sdk: int = 0
+    build_id: str = ""
+    fingerprint: str = ""
+    ip: str = ""
+    screen_size: Optional[tuple[int, int]] = None
+    density: int = 0
+    boot_id: str = ""
+    fetched_at: float = field(default_factory=time.monotonic)
+    raw: Dict[str, str] = field(default_factory=dict, repr=False, compare=False)
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def prop(self, key: str, default: str = "") -> str:
+        """Any getprop key from the snapshot (e.g. 'ro.product.cpu.abi')."""
+        return self.raw.get(key, default)
+
+    def summary(self) -> str:
+        size = f"{self.screen_size[0]}x{self.screen_size[1]}" if self.screen_size else "?"
+        return (
+            f"{self.manufacturer} {self.model} ({self.device}) | Android {self.android_version} "
+            f"(SDK {self.sdk}) | build {self.build_id} | IP {self.ip or '?'} | {size} @ {self.density}dpi"
+        )
+
+
+def parse_getprop(output: str) -> Dict[str, str]:
+    props: Dict[str, str] = {}
+    for line in output.splitlines():
+        m = _GETPROP_LINE.match(line.strip())
+        if m:
+            props[m.group("key")] = m.group("value")
+    return props
+
+
+def parse_wlan_ip(output: str) -> str:
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("inet "):
+            return line.split()[1].split("/")[0]
+    return ""
+
+
+def _parse_override(output: str) -> str:
+    """`wm size`/`wm density` print 'Physical …' and optionally 'Override …'; the override wins."""
+    value = ""
+    for line in output.splitlines():
+        if ":" in line:
+            value = line.split(":", 1)[1].strip()
+    return value
+
+
+def parse_snapshot(serial: str, output: str) -> DeviceProps:
+    chunks: List[str] = output.split(_SEP)
+    sections = {name: (chunks[i] if i < len(chunks) else "") for i, name in enumerate(_SECTIONS)}
+    props = parse_getprop(sections["getprop"])
+
+    size = None
+    m = _WM_VALUE.search(_parse_override(sections["wm_size"]))
+    if m:
+        size = (int(m.group(1)), int(m.group(2)))
+    density = _parse_override(sections["wm_density"])
+    sdk = props.get("ro.build.version.sdk", "")
+    device_name = sections["device_name"].strip()
+
+    return DeviceProps(
+        serial=serial,
+        model=props.get("ro.product.model", ""),
+        manufacturer=props.get("ro.product.manufacturer", ""),
+        brand=props.get("ro.product.brand", ""),
+        device=props.get("ro.product.device", ""),
+        device_name="" if device_name == "null" else device_name,
+        android_version=props.get("ro.build.version.release", ""),
+        sdk=int(sdk) if sdk.isdigit() else 0,
+        build_id=props.get("ro.build.id", ""),
+        fingerprint=props.get("ro.build.fingerprint", ""),
+        ip=parse_wlan_ip(sections["ip"]),
+        screen_size=size,
+        density=int(density) if density.isdigit() else 0,
+        boot_id=sections["boot_id"].strip(),
+        raw=props,
+    )
+
+
+class DevicePropsCache:
+    """
+    Per-device property snapshots with TTLs.
+
+    - One batched `adb shell` call fetches getprop + wlan0 IP + wm size/density + boot id.
+    - Callers pass `max_age` to say how fresh they need the data: static facts (model, SDK)
+      can live for DEVICE_PROPS_TTL, volatile ones (IP) use DEVICE_PROPS_VOLATILE_TTL.
+    - invalidate() is called on connect / disconnect / reboot / reconnect events.
+    """
+
+    def __init__(self, run: Callable[..., str], ttl: float = DEVICE_PROPS_TTL) -> None:
+        self._run = run
+        self._ttl = ttl
+        self._entries: Dict[str, DeviceProps] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(device_ip: Optional[str]) -> str:
+        return device_ip or "default"
+
+    def get(self, device_ip: Optional[str] = None, *, max_age: Optional[float] = None,
+            refresh: bool = False) -> Optional[DeviceProps]:
+        """Return a cached snapshot no older than max_age (default: the cache TTL), fetching if needed."""
+        key = self._key(device_ip)
+        limit = self._ttl if max_age is None else max_age
+        if not refresh:
+            with self._lock:
+                cached = self._entries.get(key)
+            if cached is not None and cached.age() <= limit:
+                return cached
+        return self._fetch(device_ip)
+
+    def peek(self, device_ip: Optional[str] = None) -> Optional[DeviceProps]:
+        """Cached snapshot regardless of age, without touching the device."""
+        with self._lock:
+            return self._entries.get(self._key(device_ip))
+
+    def invalidate(self, device_ip: Optional[str] = None) -> None:
+        """Drop one device's snapshot, or every snapshot when device_ip is None."""
+        with self._lock:
+            if device_ip is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(device_ip), None)
+                # The default device may be the same box; don't let it serve stale data.
+                self._entries.pop(self._key(None), None)
+
+    def _fetch(self, device_ip: Optional[str]) -> Optional[DeviceProps]:
+        output = self._run(["adb", "shell", _SNAPSHOT_SCRIPT], device_ip)
+        if _SEP not in output:
+            logger.warning(f"Device properties unavailable for {device_ip or 'default'}: {output}")
+            return None
+        snapshot = parse_snapshot(self._key(device_ip), output)
+        key = self._key(device_ip)
+        with self._lock:
+            previous = self._entries.get(key)
+            self._entries[key] = snapshot
+        if previous is not None and previous.boot_id and previous.boot_id != snapshot.boot_id:
+            logger.info(f"Device {key} rebooted since last snapshot (boot id changed).")
+        return snapshot
+
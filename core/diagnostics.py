@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from core.adb_exec import CancelToken, ExecResult
+from core.constants import DIAGNOSTICS_MAX_WORKERS, DIAGNOSTICS_PER_DEVICE
+from core.inventory import TRACKED_PACKAGES
+from core.logger import logger
+
+
+@dataclass(frozen=True)
+class DiagnosticCommand:
+    name: str                     # file name inside the archive (without extension)
+    argv: Sequence[str]           # adb command line
+    timeout: float = 60.0
+    ext: str = "txt"
+
+
+def default_commands(packages: Iterable[str] = TRACKED_PACKAGES,
+                     include_bugreport: bool = False) -> List[DiagnosticCommand]:
+    """The standard snapshot: system state, per-package state, logcat, and optionally a bugreport."""
+    commands = [
+        DiagnosticCommand("getprop", ["adb", "shell", "getprop"], 15.0),
+        DiagnosticCommand("meminfo", ["adb", "shell", "dumpsys", "meminfo"], 60.0),
+        DiagnosticCommand("cpuinfo", ["adb", "shell", "dumpsys", "cpuinfo"], 30.0),
+        DiagnosticCommand("gfxinfo", ["adb", "shell", "dumpsys", "gfxinfo"], 60.0),
+        DiagnosticCommand("activity", ["adb", "shell", "dumpsys", "activity", "activities"], 30.0),
+        DiagnosticCommand("window", ["adb", "shell", "dumpsys", "window", "windows"], 30.0),
+        DiagnosticCommand("top", ["adb", "shell", "top", "-b", "-n", "1"], 30.0),
+        DiagnosticCommand("df", ["adb", "shell", "df", "-h"], 15.0),
+        DiagnosticCommand("logcat", ["adb", "logcat", "-d", "-v", "threadtime", "-b", "all"], 120.0),
+    ]
+    for pkg in packages:
+        commands.append(DiagnosticCommand(f"package_{pkg}", ["adb", "shell", "dumpsys", "package", pkg], 30.0))
+        commands.append(DiagnosticCommand(f"meminfo_{pkg}", ["adb", "shell", "dumpsys", "meminfo", pkg], 30.0))
+    if include_bugreport:
+        # `bugreportz -s` streams the bugreport zip on stdout, so nothing is staged on the device.
+        commands.append(DiagnosticCommand("bugreport", ["adb", "exec-out", "bugreportz", "-s"], 900.0, "zip"))
+    return commands
+
+
+@dataclass
+class CommandTiming:
+    device: str
+    name: str
+    outcome: str
+    duration: float
+    bytes: int
+
+
+@dataclass
+class DiagnosticsReport:
+    archive: str
+    duration: float = 0.0
+    timings: List[CommandTiming] = field(default_factory=list)
+
+    @property
+    def failed(self) -> List[CommandTiming]:
+        return [t for t in self.timings if t.outcome != "ok"]
+
+    def summary(self) -> str:
+        total = sum(t.bytes for t in self.timings)
+        slowest = max(self.timings, key=lambda t: t.duration, default=None)
+        text = (
+            f"Diagnostics: {len(self.timings)} command(s) on "
+            f"{len({t.device for t in self.timings})} device(s), {total / 1e6:.1f} MB "
+            f"in {self.duration:.1f}s -> {self.archive}"
+        )
+        if slowest is not None:
+            text += f" (slowest: {slowest.device}/{slowest.name} {slowest.duration:.1f}s)"
+        if self.failed:
+            text += f", {len(self.failed)} failed: " + ", ".join(f"{t.device}/{t.name}" for t in self.failed)
+        return text
+
+
+class DiagnosticsCollector:
+    """
+    Runs a set of adb commands concurrently on one or more devices and writes all
+    outputs into one zip archive (<device>/<name>.txt plus timings.csv).
+
+    Command output goes from adb straight to a temporary file on disk, never into
+    Python memory; finished files are then deflated into the archive one at a time
+    (a zip can only be written sequentially).
+    """
+
+    def __init__(self, execute: Callable[..., ExecResult], *,
+                 max_workers: int = DIAGNOSTICS_MAX_WORKERS,
+                 per_device: int = DIAGNOSTICS_PER_DEVICE) -> None:
+        self._execute = execute
+        self.max_workers = max_workers
+        self.per_device = per_device
+
+    def collect(self, devices: Sequence[Optional[str]], out_dir: str,
+                commands: Optional[Sequence[DiagnosticCommand]] = None,
+                cancel: Optional[CancelToken] = None) -> DiagnosticsReport:
+        commands = list(commands or default_commands())
+        devices = list(devices) or [None]
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report = DiagnosticsReport(os.path.join(out_dir, f"diagnostics_{stamp}.zip"))
+        zip_lock = threading.Lock()
+        slots: Dict[Optional[str], threading.Semaphore] = {
+            d: threading.Semaphore(self.per_device) for d in devices
+        }
+        start = time.perf_counter()
+
+        with zipfile.ZipFile(report.archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+
+            def _run(device: Optional[str], cmd: DiagnosticCommand) -> CommandTiming:
+                folder = (device or "default").replace(":", "_")
+                with tempfile.TemporaryFile() as tmp:
+                    with slots[device]:
+                        result = self._execute(list(cmd.argv), device, timeout=cmd.timeout,
+                                               cancel=cancel, stdout_file=tmp)
+                    tmp.seek(0, os.SEEK_END)  # the child wrote through its own descriptor
+                    if result.stderr.strip() or result.outcome not in ("ok", "error"):
+                        tmp.write(f"\n--- {result.outcome}: {result.stderr.strip() or result.output}\n".encode())
+                    size = tmp.tell()
+                    tmp.seek(0)
+                    # zip members are already-compressed for bugreports; don't deflate twice.
+                    compress = zipfile.ZIP_STORED if cmd.ext == "zip" else zipfile.ZIP_DEFLATED
+                    info = zipfile.ZipInfo(f"{folder}/{cmd.name}.{cmd.ext}", time.localtime()[:6])
+                    info.compress_type = compress
+                    with zip_lock, zf.open(info, "w", force_zip64=True) as dst:
+                        shutil.copyfileobj(tmp, dst, 1024 * 1024)
+                timing = CommandTiming(device or "default", cmd.name, result.outcome,
+                                       round(result.duration, 3), size)
+                logger.debug(
+                    f"diagnostics {timing.device}/{cmd.name}: {timing.outcome} in {timing.duration:.2f}s",
+                    extra={"device": device, "operation": f"diag_{cmd.name}",
+                           "duration_ms": round(result.duration * 1000, 2)},
+                )
+                return timing
+
+            jobs = [(d, c) for d in devices for c in commands]
+            # Longest commands first so they don't end up as the tail of the run.
+            jobs.sort(key=lambda job: -job[1].timeout)
+            workers = max(1, min(self.max_workers, len(jobs)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                report.timings = list(pool.map(lambda job: _run(*job), jobs))
+            report.duration = time.perf_counter() - start
+
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(["device", "command", "outcome", "duration_s", "bytes"])
+            for t in sorted(report.timings, key=lambda t: (t.device, t.name)):
+                writer.writerow([t.device, t.name, t.outcome, f"{t.duration:.3f}", t.bytes])
+            zf.writestr("timings.csv", buf.getvalue())
+
+        logger.info(report.summary(), extra={"operation": "diagnostics",
+                                             "duration_ms": round(report.duration * 1000, 2)})
+        return report
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+from core.constants import ADB_PORT, DISCOVERY_CONCURRENCY, DISCOVERY_TIMEOUT
+from core.logger import logger
+
+# --- ADB wire protocol (just enough for a CNXN handshake) ---
+_A_CNXN = 0x4E584E43
+_A_AUTH = 0x48545541
+_A_STLS = 0x534C5453
+_A_VERSION = 0x01000001
+_MAX_PAYLOAD = 256 * 1024
+_CNXN_PAYLOAD = b"host::\x00"
+_HEADER = struct.Struct("<6I")
+
+
+@dataclass(frozen=True)
+class DiscoveredDevice:
+    host: str
+    port: int = ADB_PORT
+    source: str = "scan"        # "scan" or "mdns"
+    verified: bool = False      # answered the ADB handshake
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+def _cnxn_packet() -> bytes:
+    checksum = sum(_CNXN_PAYLOAD) & 0xFFFFFFFF
+    header = _HEADER.pack(_A_CNXN, _A_VERSION, _MAX_PAYLOAD, len(_CNXN_PAYLOAD), checksum, _A_CNXN ^ 0xFFFFFFFF)
+    return header + _CNXN_PAYLOAD
+
+
+def is_adb_reply(header: bytes) -> bool:
+    """True if `header` is a well-formed ADB CNXN/AUTH/STLS packet header."""
+    if len(header) < _HEADER.size:
+        return False
+    command, _, _, _, _, magic = _HEADER.unpack(header[:_HEADER.size])
+    return command in (_A_CNXN, _A_AUTH, _A_STLS) and magic == command ^ 0xFFFFFFFF
+
+
+def _fd_safe_limit(requested: int) -> int:
+    """Clamp concurrency below the open-files limit (macOS defaults to 256)."""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(requested, soft - 64))
+    except (ImportError, ValueError, OSError):
+        pass
+    return requested
+
+
+def expand_targets(cidrs: Iterable[str]) -> List[str]:
+    """Expand CIDR ranges / single addresses into a de-duplicated host list."""
+    hosts: List[str] = []
+    seen = set()
+    for item in cidrs:
+        item = item.strip()
+        if not item:
+            continue
+        net = ipaddress.ip_network(item, strict=False)
+        candidates = [net.network_address] if net.num_addresses == 1 else net.hosts()
+        for addr in candidates:
+            text = str(addr)
+            if text not in seen:
+                seen.add(text)
+                hosts.append(text)
+    return hosts
+
+
+def local_subnet_guess() -> str:
+    """Best guess at this machine's LAN as a /24 (no packets are sent)."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("10.255.255.255", 1))
+            ip = s.getsockname()[0]
+    except OSError:
+        ip = "192.168.1.1"
+    return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+
+
+def parse_mdns_services(output: str) -> List[DiscoveredDevice]:
+    """Parse `adb mdns services` lines: '<name>\\t_adb._tcp.\\t<ip>:<port>'."""
+    found: List[DiscoveredDevice] = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 3 or "_adb" not in parts[1] or ":" not in parts[-1]:
+            continue
+        if "_adb-tls-pairing" in parts[1]:
+            continue
+        host, _, port = parts[-1].rpartition(":")
+        if port.isdigit():
+            found.append(DiscoveredDevice(host=host, port=int(port), source="mdns"))
+    return found
+
+
+class SubnetScanner:
+    """
+    Async TCP sweep for wireless-ADB devices.
+
+    - Probes every host in the given CIDR ranges on the ADB port with bounded concurrency
+      and a short connect timeout.
+    - Optionally confirms each open port speaks ADB (CNXN handshake) so random services
+      on 5555 are not reported.
+    """
+
+    def __init__(
+        self,
+        port: int = ADB_PORT,
+        *,
+        concurrency: int = DISCOVERY_CONCURRENCY,
+        timeout: float = DISCOVERY_TIMEOUT,
+        verify: bool = True,
+    ) -> None:
+        self.port = port
+        self.concurrency = _fd_safe_limit(concurrency)
+        self.timeout = timeout
+        self.verify = verify
+
+    async def _probe(self, host: str, sem: asyncio.Semaphore) -> Optional[DiscoveredDevice]:
+        async with sem:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, self.port), timeout=self.timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                return None
+            verified = False
+            try:
+                if self.verify:
+                    writer.write(_cnxn_packet())
+                    await writer.drain()
+                    header = await asyncio.wait_for(reader.readexactly(_HEADER.size), timeout=self.timeout * 3)
+                    verified = is_adb_reply(header)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                verified = False
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+            if self.verify and not verified:
+                return None
+            return DiscoveredDevice(host=host, port=self.port, source="scan", verified=verified)
+
+    async def scan_async(self, hosts: Iterable[str]) -> List[DiscoveredDevice]:
+        sem = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._probe(h, sem) for h in hosts))
+        return [r for r in results if r is not None]
+
+    def scan(self, cidrs: Iterable[str]) -> List[DiscoveredDevice]:
+        hosts = expand_targets(cidrs)
+        start = time.perf_counter()
+        found = asyncio.run(self.scan_async(hosts))
+        logger.info(
+            f"Scanned {len(hosts)} hosts on port {self.port} in {time.perf_counter() - start:.2f}s: "
+            f"{len(found)} device(s)",
+            extra={"operation": "discovery_scan", "duration_ms": round((time.perf_counter() - start) * 1000, 2)},
+        )
+        return found
+
+
+def discover_devices(
+    cidrs: Iterable[str],
+    *,
+    run: Optional[Callable[..., str]] = None,
+    use_mdns: bool = False,
+    port: int = ADB_PORT,
+    concurrency: int = DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT,
+    verify: bool = True,
+) -> List[DiscoveredDevice]:
+    """Scan the ranges (and optionally `adb mdns services` through `run`) and merge the hits."""
+    found = SubnetScanner(port, concurrency=concurrency, timeout=timeout, verify=verify).scan(cidrs)
+    if use_mdns and run is not None:
+        known = {d.address for d in found}
+        for dev in parse_mdns_services(run(["adb", "mdns", "services"])):
+            if dev.address not in known:
+                known.add(dev.address)
+                found.append(dev)
+    return found
+
+
+def connect_all(connect: Callable[[str, int], str], devices: Iterable[DiscoveredDevice],
+                max_workers: int = 16) -> dict[str, str]:
+    """Run `adb connect` for every device in parallel; returns {address: adb output}."""
+    devices = list(devices)
+    if not devices:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(devices))) as pool:
+        outputs = pool.map(lambda d: connect(d.host, d.port), devices)
+        return {d.address: out for d, out in zip(devices, outputs)}
@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import glob
+import os
+import posixpath
+import shlex
+import socket
+import stat as stat_mod
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from core.adb_exec import CancelToken
+from core.constants import ADB_DEADLINES, ADB_SERVER_HOST, ADB_SERVER_PORT, SYNC_CHUNK_SIZE, TRANSFER_WORKERS
+from core.logger import logger
+
+# Temporary suffix for partially transferred files; a leftover one means "resume me".
+# The part's name carries the source's size and mtime (see _part_name), so a part is only
+# resumed for the same version of the source.
+PARTIAL_SUFFIX = ".aampart"
+_DONE_MARK = "__aam_done__"
+
+_U32 = struct.Struct("<I")
+_STAT = struct.Struct("<III")
+_DENT = struct.Struct("<IIII")
+
+
+class SyncError(OSError):
+    """The adb server or device refused a sync request."""
+
+
+@dataclass(frozen=True)
+class RemoteStat:
+    mode: int
+    size: int
+    mtime: int
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.mode or self.size or self.mtime)
+
+    @property
+    def is_dir(self) -> bool:
+        return stat_mod.S_ISDIR(self.mode)
+
+
+class AdbSyncConnection:
+    """
+    One `sync:` session with adbd, through the local adb server (no adb client process).
+
+    Speaks the sync protocol directly: STAT / LIST / RECV / SEND with 64 KB DATA chunks.
+    Not thread-safe; use one connection per worker.
+    """
+
+    def __init__(self, serial: Optional[str], *, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT,
+                 timeout: float = 30.0) -> None:
+        self.serial = serial
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            self._host_request(f"host:transport:{serial}" if serial else "host:transport-any")
+            self._host_request("sync:")
+        except Exception:
+            self._sock.close()
+            raise
+
+    # ---------- low level ----------
+
+    def _recv_exact(self, n: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self._sock.recv(n - len(buf))
+            if not chunk:
+                raise SyncError("adb connection closed")
+            buf += chunk
+        return bytes(buf)
+
+    def _host_request(self, request: str) -> None:
+        data = request.encode()
+        self._sock.sendall(f"{len(data):04x}".encode() + data)
+        status = self._recv_exact(4)
+        if status != b"OKAY":
+            length = int(self._recv_exact(4), 16)
+            raise SyncError(f"{request}: {self._recv_exact(length).decode(errors='replace')}")
+
+    def _send_request(self, cmd: bytes, payload: bytes) -> None:
+        self._sock.sendall(cmd + _U32.pack(len(payload)) + payload)
+
+    def _read_fail(self) -> str:
+        length = _U32.unpack(self._recv_exact(4))[0]
+        return self._recv_exact(length).decode(errors="replace")
+
+    # ---------- requests ----------
+
+    def stat(self, path: str) -> RemoteStat:
+        self._send_request(b"STAT", path.encode())
+        if self._recv_exact(4) != b"STAT":
+            raise SyncError(f"Bad STAT reply for {path}")
+        return RemoteStat(*_STAT.unpack(self._recv_exact(_STAT.size)))
+
+    def listdir(self, path: str) -> List[Tuple[str, RemoteStat]]:
+        self._send_request(b"LIST", path.encode())
+        entries: List[Tuple[str, RemoteStat]] = []
+        while True:
+            tag = self._recv_exact(4)
+            mode, size, mtime, namelen = _DENT.unpack(self._recv_exact(_DENT.size))
+            if tag == b"DONE":
+                return entries
+            if tag != b"DENT":
+                raise SyncError(f"Bad LIST reply for {path}")
+            name = self._recv_exact(namelen).decode(errors="replace")
+            if name not in (".", ".."):
+                entries.append((name, RemoteStat(mode, size, mtime)))
+
+    def recv(self, path: str, out: BinaryIO, cancel: Optional[CancelToken] = None) -> int:
+        """Stream a remote file into `out`; returns bytes written."""
+        self._send_request(b"RECV", path.encode())
+        total = 0
+        while True:
+            tag = self._recv_exact(4)
+            if tag == b"DATA":
+                length = _U32.unpack(self._recv_exact(4))[0]
+                out.write(self._recv_exact(length))
+                total += length
+                if cancel is not None and cancel.cancelled:
+                    # The stream can't be aborted mid-file; drop the connection instead.
+                    self.close()
+                    raise SyncError("cancelled")
+            elif tag == b"DONE":
+                self._recv_exact(4)
+                return total
+            elif tag == b"FAIL":
+                raise SyncError(f"pull {path}: {self._read_fail()}")
+            else:
+                raise SyncError(f"Bad RECV reply for {path}")
+
+    def send(self, local: BinaryIO, path: str, mode: int, mtime: int,
+             cancel: Optional[CancelToken] = None) -> int:
+        """Stream `local` to a remote file (parent dirs are created by adbd); returns bytes sent."""
+        self._send_request(b"SEND", f"{path},{mode & 0o7777 | stat_mod.S_IFREG}".encode())
+        total = 0
+        while True:
+            chunk = local.read(SYNC_CHUNK_SIZE)
+            if not chunk:
+                break
+            if cancel is not None and cancel.cancelled:
+                self.close()
+                raise SyncError("cancelled")
+            self._sock.sendall(b"DATA" + _U32.pack(len(chunk)) + chunk)
+            total += len(chunk)
+        self._sock.sendall(b"DONE" + _U32.pack(mtime))
+        tag = self._recv_exact(4)
+        if tag == b"OKAY":
+            self._recv_exact(4)
+            return total
+        if tag == b"FAIL":
+            raise SyncError(f"push {path}: {self._read_fail()}")
+        raise SyncError(f"Bad SEND reply for {path}")
+
+    def close(self) -> None:
+        try:
+            self._sock.sendall(b"QUIT" + _U32.pack(0))
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self) -> "AdbSyncConnection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@dataclass
+class TransferReport:
+    direction: str
+    device: str
+    files: int = 0
+    skipped: int = 0
+    resumed: int = 0
+    bytes: int = 0
+    duration: float = 0.0
+    failures: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return (self.bytes / 1e6) / self.duration if self.duration > 0 else 0.0
+
+    def add(self, *, nbytes: int = 0, skipped: bool = False, resumed: bool = False,
+            failure: Optional[str] = None) -> None:
+        with self._lock:
+            if failure:
+                self.failures.append(failure)
+                return
+            if skipped:
+                self.skipped += 1
+                return
+            self.files += 1
+            self.bytes += nbytes
+            self.resumed += int(resumed)
+
+    def summary(self) -> str:
+        text = (
+            f"{self.direction} {self.device}: {self.files} file(s), {self.skipped} unchanged, "
+            f"{self.resumed} resumed, {self.bytes / 1e6:.1f} MB in {self.duration:.1f}s "
+            f"({self.throughput_mb_s:.1f} MB/s)"
+        )
+        if self.failures:
+            text += f", {len(self.failures)} failed: " + "; ".join(self.failures[:5])
+        return text
+
+
+def _part_name(dest: str, size: int, mtime: int) -> str:
+    return f"{dest}.{size}-{mtime}{PARTIAL_SUFFIX}"
+
+
+def _iso_utc(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FileTransfer:
+    """
+    Parallel push/pull of files and directory trees for one device.
+
+    - Uses several sync connections at once (one per worker).
+    - Skips files whose size and mtime already match (mtime is carried over on transfer).
+    - Data lands in '<name>.<size>-<mtime>.aampart' first and is renamed when complete; a
+      leftover part is resumed from its current size on the next run if the source still has
+      that size and mtime. Parts of other versions are deleted instead of joined to a new tail. Pull resume is reliable
+      (the local part survives); push resume is best-effort: adbd deletes the target when a
+      SEND fails, so only parts left by a killed tool or a dropped connection remain.
+    - The remote rename is verified (stat of the destination), so a failed `mv` is a failure.
+    """
+
+    def __init__(self, serial: Optional[str], *, run: Optional[Callable[..., str]] = None,
+                 workers: int = TRANSFER_WORKERS,
+                 connect: Optional[Callable[[], AdbSyncConnection]] = None) -> None:
+        self.serial = serial
+        self.workers = max(1, workers)
+        self._run = run
+        self._connect = connect or (lambda: AdbSyncConnection(serial))
+        self._local = threading.local()
+        self._conns: List[AdbSyncConnection] = []
+        self._conns_lock = threading.Lock()
+
+    # ---------- helpers ----------
+
+    def _conn(self) -> AdbSyncConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _drop_conn(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _adb(self, *args: str, stdin: Optional[BinaryIO] = None) -> subprocess.CompletedProcess:
+        """Raw adb call without a binary stream; text commands go through `run`."""
+        target = ["-s", self.serial] if self.serial else []
+        return subprocess.run(["adb", *target, *args], stdin=stdin, capture_output=True)
+
+    def _adb_stream(self, *args: str, stdin: Optional[BinaryIO] = None, stdout: Optional[BinaryIO] = None,
+                    cancel: Optional[CancelToken] = None) -> None:
+        """
+        Raw adb call streaming a file into stdin or stdout (resume paths); nothing is buffered
+        in Python. Killed on cancel or after the "transfer" deadline; raises SyncError on failure.
+        """
+        target = ["-s", self.serial] if self.serial else []
+        proc = subprocess.Popen(["adb", *target, *args], stdin=stdin if stdin is not None else subprocess.DEVNULL,
+                                stdout=stdout if stdout is not None else subprocess.DEVNULL, stderr=subprocess.PIPE)
+        unregister = cancel.on_cancel(proc.kill) if cancel is not None else (lambda: None)
+        try:
+            _, err = proc.communicate(timeout=ADB_DEADLINES["transfer"])
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise SyncError(f"adb {args[0]} timed out after {ADB_DEADLINES['transfer']:.0f}s")
+        finally:
+            unregister()
+        if cancel is not None and cancel.cancelled:
+            raise SyncError("cancelled")
+        if proc.returncode != 0:
+            raise SyncError(err.decode(errors="replace").strip() or f"adb {args[0]} exited with {proc.returncode}")
+
+    def _shell(self, command: str) -> str:
+        if self._run is not None:
+            return self._run(["adb", "shell", command], self.serial)
+        return self._adb("shell", command, stdin=subprocess.DEVNULL).stdout.decode(errors="replace").strip()
+
+    def _run_parallel(self, jobs: List[Callable[[], None]]) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(jobs)))) as pool:
+                for f in [pool.submit(j) for j in jobs]:
+                    f.result()
+        finally:
+            with self._conns_lock:
+                conns, self._conns = self._conns, []
+            for conn in conns:
+                conn.close()
+
+    # ---------- pull ----------
+
+    def _walk_remote(self, conn: AdbSyncConnection, root: str) -> Iterator[Tuple[str, RemoteStat]]:
+        st = conn.stat(root)
+        if not st.exists:
+            raise SyncError(f"Remote path not found: {root}")
+        if not st.is_dir:
+            yield root, st
+            return
+        for name, entry in conn.listdir(root):
+            path = posixpath.join(root, name)
+            if entry.is_dir:
+                yield from self._walk_remote(conn, path)
+            elif stat_mod.S_ISREG(entry.mode):
+                yield path, entry
+
+    def pull(self, remote: str, local_dir: str, cancel: Optional[CancelToken] = None) -> TransferReport:
+        """Copy a remote file or directory tree into local_dir (keeping the remote base name)."""
+        report = TransferReport("pull", self.serial or "default")
+        start = time.perf_counter()
+        remote = remote.rstrip("/") or "/"
+        base = posixpath.dirname(remote) if remote != "/" else "/"
+        try:
+            with self._connect() as lister:
+                files = list(self._walk_remote(lister, remote))
+        except (OSError, SyncError) as e:
+            report.add(failure=f"{remote}: {e}")
+            return report
+
+        def job(path: str, st: RemoteStat) -> Callable[[], None]:
+            def _run() -> None:
+                if cancel is not None and cancel.cancelled:
+                    return
+                rel = posixpath.relpath(path, base)
+                dest = os.path.join(local_dir, *rel.split("/"))
+                try:
+                    self._pull_one(path, st, dest, report, cancel)
+                except (OSError, SyncError) as e:
+                    self._drop_conn()
+                    report.add(failure=f"{path}: {e}")
+            return _run
+
+        self._run_parallel([job(p, st) for p, st in files])
+        report.duration = time.perf_counter() - start
+        logger.info(report.summary(), extra={"device": self.serial, "operation": "pull",
+                                             "duration_ms": round(report.duration * 1000, 2)})
+        return report
+
+    def _pull_one(self, path: str, st: RemoteStat, dest: str, report: TransferReport,
+                  cancel: Optional[CancelToken]) -> None:
+        if os.path.isfile(dest):
+            local = os.stat(dest)
+            if local.st_size == st.size and int(local.st_mtime) == st.mtime:
+                report.add(skipped=True)
+                return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        part = _part_name(dest, st.size, st.mtime)
+        for stale in glob.glob(glob.escape(dest) + ".*" + PARTIAL_SUFFIX) + [dest + PARTIAL_SUFFIX]:
+            if stale != part and os.path.isfile(stale):
+                os.remove(stale)  # left by another version of the source
+        offset = os.path.getsize(part) if os.path.isfile(part) else 0
+        if 0 < offset < st.size:
+            # Resume: stream only the missing tail. exec-out has no separate stderr, so tail's
+            # errors are discarded on the device and a bad tail is cut off again locally.
+            with open(part, "ab") as out:
+                try:
+                    self._adb_stream("exec-out", f"tail -c +{offset + 1} {shlex.quote(path)} 2>/dev/null",
+                                     stdout=out, cancel=cancel)
+                    out.flush()
+                    if os.path.getsize(part) != st.size:
+                        raise SyncError(f"size mismatch after resume ({os.path.getsize(part)} != {st.size})")
+                except BaseException:
+                    out.truncate(offset)
+                    raise
+            nbytes, resumed = st.size - offset, True
+        else:
+            with open(part, "wb") as out:
+                nbytes, resumed = self._conn().recv(path, out, cancel), False
+        if os.path.getsize(part) != st.size:
+            raise SyncError(f"size mismatch ({os.path.getsize(part)} != {st.size})")
+        os.replace(part, dest)
+        os.utime(dest, (st.mtime, st.mtime))
+        report.add(nbytes=nbytes, resumed=resumed)
+
+    # ---------- push ----------
+
+    def push(self, local: str, remote_dir: str, cancel: Optional[CancelToken] = None) -> TransferReport:
+        """Copy a local file or directory tree into remote_dir (keeping the local base name)."""
+        report = TransferReport("push", self.serial or "default")
+        start = time.perf_counter()
+        local = os.path.abspath(local)
+        base = os.path.dirname(local)
+        if os.path.isdir(local):
+            files = [os.path.join(d, f) for d, _, names in os.walk(local) for f in names]
+        else:
+            files = [local]
+
+        def job(path: str) -> Callable[[], None]:
+            def _run() -> None:
+                if cancel is not None and cancel.cancelled:
+                    return
+                rel = os.path.relpath(path, base).replace(os.sep, "/")
+                dest = posixpath.join(remote_dir, rel)
+                try:
+                    self._push_one(path, dest, report, cancel)
+                except (OSError, SyncError) as e:
+                    self._drop_conn()
+                    report.add(failure=f"{path}: {e}")
+            return _run
+
+        self._run_parallel([job(p) for p in files])
+        report.duration = time.perf_counter() - start
+        logger.info(report.summary(), extra={"device": self.serial, "operation": "push",
+                                             "duration_ms": round(report.duration * 1000, 2)})
+        return report
+
+    def _push_one(self, path: str, dest: str, report: TransferReport, cancel: Optional[CancelToken]) -> None:
+        local = os.stat(path)
+        mtime = int(local.st_mtime)
+        conn = self._conn()
+        remote = conn.stat(dest)
+        if remote.exists and remote.size == local.st_size and remote.mtime == mtime:
+            report.add(skipped=True)
+            return
+        part = _part_name(dest, local.st_size, mtime)
+        partial = conn.stat(part)
+        if partial.exists and 0 < partial.size < local.st_size:
+            # Resume: append the missing tail, then finalize name and mtime with one shell call.
+            with open(path, "rb") as f:
+                f.seek(partial.size)
+                self._adb_stream("exec-in", f"cat >> {shlex.quote(part)}", stdin=f, cancel=cancel)
+            self._finalize(conn, part, dest, local.st_size,
+                           f" && touch -m -d {_iso_utc(mtime)} {shlex.quote(dest)}")
+            nbytes, resumed = local.st_size - partial.size, True
+        else:
+            with open(path, "rb") as f:
+                nbytes = conn.send(f, part, local.st_mode, mtime, cancel)
+            self._finalize(conn, part, dest, local.st_size)
+            resumed = False
+        report.add(nbytes=nbytes, resumed=resumed)
+
+    def _finalize(self, conn: AdbSyncConnection, part: str, dest: str, size: int, then: str = "") -> None:
+        """
+        Rename the remote part into place and check the result (a failed `mv` must not count as
+        pushed). Parts left by other versions of the file are removed in the same shell call.
+        """
+        stale = f"{shlex.quote(dest)}.*{PARTIAL_SUFFIX} {shlex.quote(dest + PARTIAL_SUFFIX)}"
+        out = self._shell(f"mv {shlex.quote(part)} {shlex.quote(dest)}{then} && rm -f {stale} && echo {_DONE_MARK}")
+        if _DONE_MARK not in out:
+            raise SyncError(f"rename to {dest} failed: {out or 'no output'}")
+        st = conn.stat(dest)
+        if not st.exists or st.size != size:
+            raise SyncError(f"{dest} missing or incomplete after rename ({st.size} != {size})")
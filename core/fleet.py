@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core.constants import FLEET_POLL_INTERVAL, FREETV_PROD_PACKAGE, FREETV_UAT_PACKAGE, INVENTORY_MAX_WORKERS
+from core.inventory import PackageInventory
+from core.logger import logger
+
+# (serial, {field: value}); fields are DeviceRow attribute names.
+UpdateFunc = Callable[[str, Dict[str, object]], None]
+
+
+@dataclass
+class DeviceRow:
+    serial: str
+    state: str = ""
+    model: str = ""
+    prod_version: str = ""
+    uat_version: str = ""
+    last_operation: str = ""
+    last_duration_ms: Optional[float] = None
+    updated_at: float = 0.0
+
+
+# Device states adb prints in `adb devices`; anything else on a line is not a device row.
+_ADB_STATES = frozenset({"device", "offline", "unauthorized", "authorizing", "connecting", "recovery",
+                         "rescue", "sideload", "bootloader", "host", "unknown", "no permissions"})
+
+
+def parse_adb_devices_long(output: str) -> Optional[Dict[str, Tuple[str, str]]]:
+    """
+    `adb devices -l` output -> {serial: (state, model)}; None when the output has no
+    "List of devices attached" header (adb failed, the server could not start...).
+    """
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("List of devices"):
+            break
+    else:
+        return None
+    devices: Dict[str, Tuple[str, str]] = {}
+    for line in lines[i + 1:]:
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        state, rest = parts[1], parts[2:]
+        if state == "no" and rest[:1] == ["permissions"]:
+            state, rest = "no permissions", rest[1:]
+        if state not in _ADB_STATES:
+            continue
+        fields = dict(p.split(":", 1) for p in rest if ":" in p)
+        devices[parts[0]] = (state, fields.get("model", "").replace("_", " "))
+    return devices
+
+
+def _version(inventory: PackageInventory, serial: str, package: str) -> str:
+    inv = inventory.get(serial)
+    info = inv.version_of(package) if inv is not None else None
+    if info is None:
+        return "-" if inv is not None else ""
+    return f"{info.version_name or '?'} ({info.version_code})"
+
+
+class OperationLogHandler(logging.Handler):
+    """
+    Turns structured log records (extra={"device", "operation", "duration_ms"}) into
+    "last operation" updates. Runs on the logging caller's thread, so it only hands the
+    fields to `update` (which must be cheap and thread-safe).
+    """
+
+    def __init__(self, update: UpdateFunc, normalize: Callable[[str], str], level: int = logging.INFO) -> None:
+        super().__init__(level)
+        self._update = update
+        self._normalize = normalize
+
+    def emit(self, record: logging.LogRecord) -> None:
+        device = getattr(record, "device", None)
+        operation = getattr(record, "operation", None)
+        if not device or not operation:
+            return
+        failed = record.levelno >= logging.WARNING
+        self._update(self._normalize(str(device)), {
+            "last_operation": f"{operation} (failed)" if failed else operation,
+            "last_duration_ms": getattr(record, "duration_ms", None),
+        })
+
+
+class FleetMonitor:
+    """
+    Feeds the fleet device table.
+
+    - One `adb devices -l` call per interval gives state and model for every device;
+      only changed fields are reported.
+    - Devices seen for the first time get their package inventory collected (in parallel,
+      off the poll thread); afterwards the inventory's own updates (after installs and
+      uninstalls) refresh the FreeTV version columns.
+    - Structured operation logs (see OperationLogHandler) fill the last operation columns.
+    """
+
+    def __init__(self, run: Callable[..., str], inventory: PackageInventory, normalize: Callable[[str], str],
+                 *, interval: float = FLEET_POLL_INTERVAL) -> None:
+        self._run = run
+        self.inventory = inventory
+        self.interval = interval
+        self._update: Optional[UpdateFunc] = None
+        self._handler = OperationLogHandler(self._publish, normalize)
+        self._known: Dict[str, Tuple[str, str]] = {}
+        self._adb_failed = False
+        self._collecting: Set[str] = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, update: UpdateFunc) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._update = update
+        self._known.clear()
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=INVENTORY_MAX_WORKERS, thread_name_prefix="fleet-inventory")
+        self.inventory.on_change = self._on_inventory
+        logger.addHandler(self._handler)
+        self._thread = threading.Thread(target=self._loop, name="fleet-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        logger.removeHandler(self._handler)
+        self.inventory.on_change = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _publish(self, serial: str, fields: Dict[str, object]) -> None:
+        if self._update is not None:
+            self._update(serial, dict(fields, updated_at=time.time()))
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Fleet monitor poll failed")
+            self._stop.wait(self.interval)
+
+    def poll_once(self) -> None:
+        output = self._run(["adb", "devices", "-l"])
+        devices = parse_adb_devices_long(output)
+        if devices is None:
+            # adb itself failed: keep the table as it is rather than marking every device missing.
+            if not self._adb_failed:
+                logger.warning(f"adb devices failed: {output.strip()[:200]}")
+            self._adb_failed = True
+            return
+        self._adb_failed = False
+        for serial, (state, model) in devices.items():
+            previous = self._known.get(serial)
+            if previous == (state, model):
+                continue
+            fields: Dict[str, object] = {"state": state}
+            if model:
+                fields["model"] = model
+            self._publish(serial, fields)
+            if state == "device" and (previous is None or previous[0] != "device"):
+                self._collect(serial)
+        for serial in set(self._known) - set(devices):
+            self._publish(serial, {"state": "missing"})
+        self._known = devices
+
+    def _collect(self, serial: str) -> None:
+        if self._pool is None or serial in self._collecting:
+            return
+        self._collecting.add(serial)
+
+        def _job() -> None:
+            try:
+                self.inventory.collect_device(serial)  # reports back through on_change
+            finally:
+                self._collecting.discard(serial)
+
+        self._pool.submit(_job)
+
+    def _on_inventory(self, serial: Optional[str]) -> None:
+        serials = [serial] if serial is not None else list(self._known)
+        for s in serials:
+            self._publish(s, {"prod_version": _version(self.inventory, s, FREETV_PROD_PACKAGE),
+                              "uat_version": _version(self.inventory, s, FREETV_UAT_PACKAGE)})
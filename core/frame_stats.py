@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import csv
+import re
+import threading
+import time
+from array import array
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from core.constants import FRAMESTATS_BUFFER, JANK_SAMPLE_INTERVAL
+from core.logger import logger
+from core.stats import np, percentiles
+
+_PROFILE_MARK = "---PROFILEDATA---"
+_REFRESH = re.compile(r"(?:mRefreshRate=|fps=)(\d+(?:\.\d+)?)")
+_SF_ACTIVE_MODE = re.compile(r"mActiveSfDisplayMode=DisplayMode\{[^}]*?refreshRate=(\d+(?:\.\d+)?)")
+_ACTIVE_MODE_ID = re.compile(r"(?:mActiveModeId=|\bmodeId )(\d+)")
+_MODE = re.compile(r"\{id=(\d+), [^}]*?fps=(\d+(?:\.\d+)?)")
+_DEFAULT_REFRESH_HZ = 60.0
+
+
+class UnsupportedFramestats(ValueError):
+    """The framestats header lacks a column the parser needs (format differs by Android version)."""
+
+
+def _framestats_rows(output: str, columns: Sequence[str]) -> Iterator[Tuple[int, ...]]:
+    """(Flags, *columns) as ints for every row of `dumpsys gfxinfo <pkg> framestats` output (all windows)."""
+    in_profile = False
+    index: List[int] = []
+    for line in output.splitlines():
+        line = line.strip()
+        if line == _PROFILE_MARK:
+            in_profile = not in_profile
+            continue
+        if not in_profile or not line:
+            continue
+        if line.startswith("Flags,"):
+            cols = line.split(",")
+            missing = [c for c in columns if c not in cols]
+            if missing:
+                raise UnsupportedFramestats(f"framestats has no {', '.join(missing)} column")
+            index = [0] + [cols.index(c) for c in columns]
+            continue
+        parts = line.split(",")
+        if not index or len(parts) <= max(index):
+            continue
+        try:
+            yield tuple(int(parts[i]) for i in index)
+        except ValueError:
+            continue
+
+
+def parse_refresh_hz(output: str) -> Optional[float]:
+    """
+    Refresh rate of the active display mode in `dumpsys display` output. The first fps= is
+    only the first supported mode, which is wrong on 50 / 24 Hz TVs, so: SurfaceFlinger's
+    active mode (Android 12+), else the active mode id looked up in the supported modes,
+    else the first rate found (old builds with a single mode).
+    """
+    m = _SF_ACTIVE_MODE.search(output)
+    if m and float(m.group(1)) > 0:
+        return float(m.group(1))
+    modes = {int(mode_id): float(fps) for mode_id, fps in _MODE.findall(output)}
+    m = _ACTIVE_MODE_ID.search(output)
+    if m and modes.get(int(m.group(1)), 0) > 0:
+        return modes[int(m.group(1))]
+    m = _REFRESH.search(output)
+    return float(m.group(1)) if m and float(m.group(1)) > 0 else None
+
+
+def parse_framestats(output: str) -> List[Tuple[int, int]]:
+    """
+    (IntendedVsync, FrameCompleted) in ns for every valid frame in
+    `dumpsys gfxinfo <pkg> framestats` output (all windows), oldest first.
+    Frames with non-zero Flags are skipped, as the gfxinfo docs recommend.
+    """
+    frames = [(vsync, done) for flags, vsync, done in _framestats_rows(output, ("IntendedVsync", "FrameCompleted"))
+              if flags == 0]
+    frames.sort()
+    return frames
+
+
+def input_event_column(output: str) -> Optional[str]:
+    """
+    Which column stamps a frame's input in this framestats output: "OldestInputEvent" (the
+    event time, before Android 12), "HandleInputStart" (Android 12+ replaced the event time
+    with InputEventId, an id; only the frame's own input handling start is left), or None
+    when there is no header (app not drawing). Raises UnsupportedFramestats otherwise.
+    """
+    for line in output.splitlines():
+        line = line.strip()
+        if not line.startswith("Flags,"):
+            continue
+        cols = line.split(",")
+        if "OldestInputEvent" in cols:
+            return "OldestInputEvent"
+        if "InputEventId" in cols and "HandleInputStart" in cols:
+            return "HandleInputStart"
+        raise UnsupportedFramestats("framestats has neither OldestInputEvent nor InputEventId/HandleInputStart")
+    return None
+
+
+def parse_input_frames(output: str) -> List[Tuple[int, int, int]]:
+    """
+    (input time, IntendedVsync, FrameCompleted) in ns for frames that handled input, oldest
+    first. The input time is taken from input_event_column(): the key event's time on older
+    Android, HandleInputStart on 12+ (after the vsync, so dispatch and the vsync wait are not
+    included). All Flags are kept: a key press often changes the layout.
+    """
+    column = input_event_column(output)
+    if column is None:
+        return []
+    if column == "OldestInputEvent":
+        frames = [(event, vsync, done) for _flags, event, vsync, done
+                  in _framestats_rows(output, ("OldestInputEvent", "IntendedVsync", "FrameCompleted")) if event > 0]
+    else:
+        frames = [(start, vsync, done) for _flags, event_id, start, vsync, done
+                  in _framestats_rows(output, ("InputEventId", "HandleInputStart", "IntendedVsync", "FrameCompleted"))
+                  if event_id != 0]
+    frames.sort(key=lambda f: f[1])
+    return frames
+
+
+def frame_times_ms(frames: Sequence[Tuple[int, int]]):
+    """Frame durations (FrameCompleted - IntendedVsync) in ms; a NumPy array when available."""
+    if np is not None:
+        arr = np.asarray(frames, dtype=np.int64).reshape(-1, 2)
+        return (arr[:, 1] - arr[:, 0]) / 1e6
+    return array("d", ((done - vsync) / 1e6 for vsync, done in frames))
+
+
+def jank_counts(durations, budget_ms: float) -> Tuple[int, int]:
+    """(janky frames, missed vsyncs): a frame is janky if it took longer than one refresh period."""
+    if np is not None:
+        d = np.asarray(durations, dtype=float)
+        over = d > budget_ms
+        return int(over.sum()), int(np.floor(d[over] / budget_ms).sum())
+    janky = [d for d in durations if d > budget_ms]
+    return len(janky), sum(int(d // budget_ms) for d in janky)
+
+
+@dataclass
+class FrameSample:
+    timestamp: float
+    frames: int
+    janky: int
+    jank_pct: float
+    missed_vsyncs: int
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    overflow: bool = False    # more frames were rendered than framestats keeps; some were not seen
+
+
+def summarize(durations, budget_ms: float, timestamp: Optional[float] = None) -> FrameSample:
+    stats = percentiles(durations, (50, 90, 99))
+    janky, missed = jank_counts(durations, budget_ms)
+    n = stats["n"]
+    return FrameSample(
+        timestamp=timestamp if timestamp is not None else time.time(),
+        frames=n,
+        janky=janky,
+        jank_pct=round(100.0 * janky / n, 2) if n else 0.0,
+        missed_vsyncs=missed,
+        p50_ms=round(stats.get("median", 0.0), 2),
+        p90_ms=round(stats.get("p90", 0.0), 2),
+        p99_ms=round(stats.get("p99", 0.0), 2),
+        max_ms=round(stats.get("max", 0.0), 2),
+    )
+
+
+class JankSampler:
+    """
+    Polls `dumpsys gfxinfo <package> framestats` and reports only frames that are new
+    since the previous poll (tracked by IntendedVsync), as one FrameSample per poll.
+
+    - start()/stop() poll on a background thread every `interval` seconds; each sample
+      goes to `on_sample` and, if csv_path is set, is appended to the CSV immediately.
+    - measure(action) runs a scripted action (e.g. an RCU scroll) while sampling and
+      returns one FrameSample over all frames it produced - a repeatable jank score.
+    """
+
+    def __init__(self, run: Callable[..., str], package: str, device_ip: Optional[str] = None, *,
+                 interval: float = JANK_SAMPLE_INTERVAL, refresh_hz: Optional[float] = None,
+                 csv_path: Optional[str] = None,
+                 on_sample: Optional[Callable[[FrameSample], None]] = None) -> None:
+        self._run = run
+        self.package = package
+        self.device_ip = device_ip
+        self.interval = interval
+        self.refresh_hz = refresh_hz
+        self.csv_path = csv_path
+        self.on_sample = on_sample
+        self._last_vsync = 0
+        self._session = array("d")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._csv = None
+        self._writer = None
+
+    @property
+    def budget_ms(self) -> float:
+        return 1000.0 / (self.refresh_hz or _DEFAULT_REFRESH_HZ)
+
+    def detect_refresh_hz(self) -> float:
+        out = self._run(["adb", "shell", "dumpsys", "display"], self.device_ip)
+        self.refresh_hz = parse_refresh_hz(out) or _DEFAULT_REFRESH_HZ
+        return self.refresh_hz
+
+    # ---------- Sampling ----------
+
+    def poll(self, emit: bool = True) -> Optional[FrameSample]:
+        """
+        Fetch framestats once; returns a sample of the new frames (None if there were none).
+        emit=False only advances the "seen" marker (no session/CSV/callback).
+        """
+        out = self._run(["adb", "shell", "dumpsys", "gfxinfo", self.package, "framestats"], self.device_ip,
+                        hedge=False)
+        frames = parse_framestats(out)
+        with self._lock:
+            new = [f for f in frames if f[0] > self._last_vsync]
+            overflow = bool(self._last_vsync) and len(new) >= FRAMESTATS_BUFFER
+            if frames:
+                self._last_vsync = max(self._last_vsync, frames[-1][0])
+            if not new or not emit:
+                return None
+            durations = frame_times_ms(new)
+            self._session.extend(durations)
+            sample = summarize(durations, self.budget_ms)
+            sample.overflow = overflow
+            if self._writer is not None:
+                self._writer.writerow(asdict(sample))
+                self._csv.flush()
+        if self.on_sample is not None:
+            self.on_sample(sample)
+        return sample
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Jank sampler poll failed")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.refresh_hz is None:
+            self.detect_refresh_hz()
+        self.poll(emit=False)  # frames rendered before start() don't count
+        if self.csv_path:
+            self._csv = open(self.csv_path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._csv, fieldnames=[f.name for f in fields(FrameSample)])
+            self._writer.writeheader()
+        with self._lock:
+            self._session = array("d")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="jank-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> FrameSample:
+        """Stop sampling; returns the summary over every frame seen since start()."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.poll()
+        with self._lock:
+            if self._csv is not None:
+                self._csv.close()
+                self._csv = self._writer = None
+            return summarize(self._session, self.budget_ms)
+
+    def measure(self, action: Callable[[], None], settle: float = 1.0) -> FrameSample:
+        """Run `action` while sampling; the result covers only frames rendered during it."""
+        self.start()
+        try:
+            action()
+            time.sleep(settle)  # let the last scroll animation finish
+        finally:
+            result = self.stop()
+        logger.info(
+            f"Jank score {self.package} on {self.device_ip or 'default'}: {result.jank_pct:.1f}% janky "
+            f"({result.janky}/{result.frames}), p90 {result.p90_ms:.1f}ms, p99 {result.p99_ms:.1f}ms",
+            extra={"device": self.device_ip, "operation": "jank_measure"},
+        )
+        return result
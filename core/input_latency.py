@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence
+
+from core.constants import INPUT_LATENCY_GAP, INPUT_LATENCY_ITERATIONS
+from core.frame_stats import UnsupportedFramestats, input_event_column, parse_input_frames
+from core.logger import logger
+from core.rcu_manager import KeyName, RcuManager
+from core.stats import percentiles
+
+METRICS = ("latency_ms", "queue_ms", "frame_ms", "inject_ms")
+
+
+@dataclass
+class LatencySample:
+    device: str
+    key: str
+    iteration: int
+    inject_ms: float              # host: RcuManager.press round trip (adb + `input` start-up, or one monkey
+                                  # socket round trip) = tool overhead
+    latency_ms: Optional[float]   # device: key event -> first frame that handled it finished rendering
+    queue_ms: Optional[float]     # device: key event -> that frame's vsync (dispatch + app handling + vsync wait)
+    frame_ms: Optional[float]     # device: that frame's vsync -> rendered
+    frames: int                   # frames drawn in response, until the next key
+    status: str                   # ok / no_frame (nothing redrawn, e.g. end of a list) / failed / unsupported
+    input_column: str = "OldestInputEvent"  # where latency starts; "HandleInputStart" on Android 12+ (see
+                                  # core.frame_stats.input_event_column): no dispatch / vsync wait, no queue_ms
+
+
+@dataclass
+class LatencyResult:
+    package: str
+    samples: List[LatencySample]
+    duration: float = 0.0
+
+    def stats(self) -> Dict[tuple, Dict[str, Dict[str, float]]]:
+        """{(device, key): {metric: percentiles}} plus (device, 'all') and ('all', key) across devices."""
+        groups: Dict[tuple, List[LatencySample]] = {}
+        for s in self.samples:
+            if s.status != "ok":
+                continue
+            for key in ((s.device, s.key), (s.device, "all"), ("all", s.key)):
+                groups.setdefault(key, []).append(s)
+        return {
+            key: {metric: percentiles([getattr(s, metric) for s in items if getattr(s, metric) is not None])
+                  for metric in METRICS}
+            for key, items in groups.items()
+        }
+
+    def summary(self) -> str:
+        lines = []
+        for (device, key), metrics in sorted(self.stats().items()):
+            lat, inj, queue = metrics["latency_ms"], metrics["inject_ms"], metrics["queue_ms"]
+            split = f"queue {queue['median']:.0f} + " if queue["n"] else "from input handling, "
+            lines.append(
+                f"{device} {key}: n={lat['n']} key->frame median={lat['median']:.0f} p90={lat['p90']:.0f} "
+                f"p99={lat['p99']:.0f} max={lat['max']:.0f} ms ({split}"
+                f"render {metrics['frame_ms']['median']:.0f}); injection overhead median={inj['median']:.0f} ms"
+            )
+        late = sorted({s.device for s in self.samples if s.status == "ok" and s.input_column != "OldestInputEvent"})
+        if late:
+            lines.append(f"{', '.join(late)}: Android 12+ framestats have no input event time; latency is "
+                         f"measured from the frame's input handling (dispatch and vsync wait not included)")
+        for status in ("no_frame", "failed", "unsupported"):
+            n = sum(1 for s in self.samples if s.status == status)
+            if n:
+                lines.append(f"{n} press(es) {status}")
+        return "\n".join(lines) or "no samples"
+
+    def write_csv(self, path: str) -> None:
+        """One row per key press; load several files to compare builds."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=[fld.name for fld in fields(LatencySample)])
+            writer.writeheader()
+            for s in self.samples:
+                writer.writerow(asdict(s))
+
+
+class InputLatencyProbe:
+    """
+    Key-to-screen latency of an app: keys go through RcuManager (the same injection path as
+    the RCU dialog and scenarios) and the response is read back from the app's own frames.
+
+    - `dumpsys gfxinfo <pkg> framestats` stamps every frame that handled input with the
+      input event's time, and records the frame's vsync and when it finished rendering. All
+      three are on the device clock, so adb and host scheduling don't blur the app's number.
+      The display shows the frame at the next refresh after FrameCompleted. Android 12+ only
+      records an input event id, so latency starts at the frame's HandleInputStart there.
+    - A device whose framestats can't be read (unknown format, adb errors) gets one
+      "unsupported" / "failed" sample; the other devices carry on.
+    - Each injection is timed on the host as well (inject_ms): the adb round trip and the
+      start-up of `input` are tool overhead, reported apart from the app's latency. `backend`
+      selects the injection path (see core.monkey_input) so both can be compared.
+    - Keys are pressed one at a time, `gap` seconds apart, so each frame belongs to exactly
+      one key; the first frame stamped with a newer event than the previous key's is that
+      key's response. Devices run in parallel.
+    """
+
+    def __init__(self, adb, package: str, *, gap: float = INPUT_LATENCY_GAP, backend: Optional[str] = None) -> None:
+        self.adb = adb
+        self.package = package
+        self.gap = gap
+        self.rcu = RcuManager(adb, lambda *_: None, backend=backend)  # per-key output would flood the log
+
+    def _frames(self, device_ip: Optional[str]):
+        """(input column or None, input frames) from one framestats dump."""
+        out = self.adb.run(["adb", "shell", "dumpsys", "gfxinfo", self.package, "framestats"], device_ip, hedge=False)
+        return input_event_column(out), parse_input_frames(out)
+
+    def run_device(self, device_ip: Optional[str], keys: Sequence[KeyName], *,
+                   iterations: int = INPUT_LATENCY_ITERATIONS) -> List[LatencySample]:
+        device = device_ip or "default"
+        samples: List[LatencySample] = []
+        try:
+            self._probe(device_ip, keys, iterations, samples)
+        except UnsupportedFramestats as e:
+            logger.warning(f"Latency probe: {device} not supported: {e}")
+            samples.append(LatencySample(device, "all", 0, 0.0, None, None, None, 0, "unsupported"))
+        except Exception:
+            logger.exception(f"Latency probe on {device} failed")
+            samples.append(LatencySample(device, "all", 0, 0.0, None, None, None, 0, "failed"))
+        return samples
+
+    def _probe(self, device_ip: Optional[str], keys: Sequence[KeyName], iterations: int,
+               samples: List[LatencySample]) -> None:
+        device = device_ip or "default"
+        column, frames = self._frames(device_ip)
+        last_event = frames[-1][0] if frames else 0   # responses to earlier input don't count
+        last_vsync = frames[-1][1] if frames else 0
+        for i in range(1, iterations + 1):
+            for key in keys:
+                start = time.perf_counter()
+                try:
+                    self.rcu.press(key, device_ip=device_ip)
+                except (ValueError, RuntimeError) as e:
+                    logger.warning(f"Latency probe: {key} on {device} failed: {e}")
+                    samples.append(LatencySample(device, str(key), i, 0.0, None, None, None, 0, "failed"))
+                    continue
+                inject_ms = round((time.perf_counter() - start) * 1000, 2)
+                time.sleep(self.gap)
+                found, frames = self._frames(device_ip)
+                column = found or column
+                drawn = sum(1 for f in frames if f[1] > last_vsync)
+                response = next((f for f in frames if f[0] > last_event), None)
+                if frames:
+                    last_vsync = max(last_vsync, frames[-1][1])
+                    last_event = max(last_event, max(f[0] for f in frames))
+                if response is None:
+                    samples.append(LatencySample(device, str(key), i, inject_ms, None, None, None, drawn, "no_frame"))
+                    continue
+                event, vsync, done = response
+                has_event = column != "HandleInputStart"  # on 12+ `event` is after the vsync: no queue time
+                sample = LatencySample(device, str(key), i, inject_ms, round((done - event) / 1e6, 2),
+                                       round((vsync - event) / 1e6, 2) if has_event else None,
+                                       round((done - vsync) / 1e6, 2), drawn, "ok", column or "OldestInputEvent")
+                samples.append(sample)
+                logger.debug(
+                    f"key latency {device} {key} #{i}: {sample.latency_ms:.1f}ms (injection {inject_ms:.0f}ms)",
+                    extra={"device": device_ip, "operation": "key_latency", "duration_ms": sample.latency_ms},
+                )
+
+    def run(self, devices: Sequence[Optional[str]], keys: Sequence[KeyName], *,
+            iterations: int = INPUT_LATENCY_ITERATIONS) -> LatencyResult:
+        devices = list(devices) or [None]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+            per_device = list(pool.map(lambda d: self.run_device(d, keys, iterations=iterations), devices))
+        result = LatencyResult(self.package, [s for samples in per_device for s in samples],
+                               round(time.perf_counter() - start, 3))
+        logger.info(f"Key latency probe of {self.package} on {len(devices)} device(s) took {result.duration:.1f}s",
+                    extra={"operation": "key_latency_probe", "duration_ms": round(result.duration * 1000, 2)})
+        return result
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, List, Optional
+
+from core.connection_supervisor import parse_adb_devices
+from core.constants import FREETV_PROD_PACKAGE, FREETV_UAT_PACKAGE, INVENTORY_MAX_WORKERS
+from core.logger import logger
+
+TRACKED_PACKAGES = (FREETV_PROD_PACKAGE, FREETV_UAT_PACKAGE)
+
+_SEP = "__AAM_INVENTORY__"
+_PKG_MARK = "@@"
+_LIST_LINE = re.compile(r"^package:(?P<pkg>\S+)(?:\s+versionCode:(?P<code>\d+))?")
+_DUMPSYS_FIELDS = re.compile(r"(versionCode|versionName|minSdk|targetSdk)=(\S+)")
+_DUMPSYS_TIMES = re.compile(r"(firstInstallTime|lastUpdateTime)=(\S+ \S+)")
+_LABELS = {FREETV_PROD_PACKAGE: "PROD", FREETV_UAT_PACKAGE: "UAT"}
+
+
+@dataclass(frozen=True)
+class PackageInfo:
+    package: str
+    version_code: int = 0
+    version_name: str = ""
+    min_sdk: int = 0
+    target_sdk: int = 0
+    first_install: str = ""
+    last_update: str = ""
+
+
+@dataclass
+class DeviceInventory:
+    serial: str
+    packages: Dict[str, int] = field(default_factory=dict)       # every package -> versionCode
+    details: Dict[str, PackageInfo] = field(default_factory=dict)  # tracked packages only
+    collected_at: float = field(default_factory=time.time)
+
+    def version_of(self, package: str) -> Optional[PackageInfo]:
+        if package in self.details:
+            return self.details[package]
+        if package in self.packages:
+            return PackageInfo(package, self.packages[package])
+        return None
+
+
+def _details_script(packages: Iterable[str]) -> str:
+    return "; ".join(
+        f"echo {_PKG_MARK}{p}; dumpsys package {p} | grep -E "
+        f"'versionCode=|versionName=|firstInstallTime=|lastUpdateTime='"
+        for p in packages
+    )
+
+
+def parse_package_list(output: str) -> Dict[str, int]:
+    packages: Dict[str, int] = {}
+    for line in output.splitlines():
+        m = _LIST_LINE.match(line.strip())
+        if m:
+            packages[m.group("pkg")] = int(m.group("code") or 0)
+    return packages
+
+
+def parse_package_details(output: str) -> Dict[str, PackageInfo]:
+    """Parse the `@@pkg` + grep'd `dumpsys package` blocks; first occurrence of each field wins."""
+    details: Dict[str, PackageInfo] = {}
+    current: Optional[str] = None
+    fields: Dict[str, str] = {}
+
+    def _flush() -> None:
+        if current and "versionCode" in fields:
+            details[current] = PackageInfo(
+                package=current,
+                version_code=int(fields["versionCode"]) if fields["versionCode"].isdigit() else 0,
+                version_name=fields.get("versionName", ""),
+                min_sdk=int(fields["minSdk"]) if fields.get("minSdk", "").isdigit() else 0,
+                target_sdk=int(fields["targetSdk"]) if fields.get("targetSdk", "").isdigit() else 0,
+                first_install=fields.get("firstInstallTime", ""),
+                last_update=fields.get("lastUpdateTime", ""),
+            )
+
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith(_PKG_MARK):
+            _flush()
+            current, fields = line[len(_PKG_MARK):], {}
+            continue
+        for key, value in _DUMPSYS_FIELDS.findall(line) + _DUMPSYS_TIMES.findall(line):
+            fields.setdefault(key, value)
+    _flush()
+    return details
+
+
+class PackageInventory:
+    """
+    Fleet-wide "what is installed where" cache.
+
+    - collect() queries every connected device in parallel: one shell call per device for
+      `pm list packages --show-versioncode` plus grep'd `dumpsys package` of tracked packages.
+    - AdbManager keeps it current after installs/uninstalls (refresh_packages / forget_package),
+      so a re-audit only needs to hit devices that changed.
+    """
+
+    def __init__(self, run: Callable[..., str], tracked: Iterable[str] = TRACKED_PACKAGES) -> None:
+        self._run = run
+        self.tracked = tuple(tracked)
+        self._devices: Dict[str, DeviceInventory] = {}
+        self._lock = threading.Lock()
+        self.on_change: Optional[Callable[[Optional[str]], None]] = None  # serial, or None for "all"
+
+    # ---------- Collection ----------
+
+    def connected_serials(self) -> List[str]:
+        states = parse_adb_devices(self._run(["adb", "devices"]))
+        return [serial for serial, state in states.items() if state == "device"]
+
+    def collect_device(self, serial: str) -> Optional[DeviceInventory]:
+        script = f"pm list packages --show-versioncode; echo {_SEP}; {_details_script(self.tracked)}"
+        # Read-only, but classify() treats any ";" as a possible write and would not hedge it.
+        output = self._run(["adb", "shell", script], serial, hedge=True)
+        if _SEP not in output:
+            logger.warning(f"Inventory failed for {serial}: {output}")
+            return None
+        listing, details = output.split(_SEP, 1)
+        inv = DeviceInventory(serial, parse_package_list(listing), parse_package_details(details))
+        with self._lock:
+            self._devices[serial] = inv
+        self._changed(serial)
+        return inv
+
+    def collect(self, serials: Optional[Iterable[str]] = None,
+                max_workers: int = INVENTORY_MAX_WORKERS) -> Dict[str, DeviceInventory]:
+        """Collect inventories for the given (default: all connected) devices in parallel."""
+        serials = list(serials) if serials is not None else self.connected_serials()
+        if not serials:
+            return {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(serials))) as pool:
+            results = dict(zip(serials, pool.map(self.collect_device, serials)))
+        logger.info(
+            f"Inventory of {len(serials)} device(s) took {time.perf_counter() - start:.2f}s",
+            extra={"operation": "inventory", "duration_ms": round((time.perf_counter() - start) * 1000, 2)},
+        )
+        return {s: inv for s, inv in results.items() if inv is not None}
+
+    # ---------- Incremental updates ----------
+
+    def refresh_packages(self, serial: str, packages: Optional[Iterable[str]] = None) -> None:
+        """Re-read only the given packages (default: tracked ones) on a device we already know."""
+        packages = tuple(packages or self.tracked)
+        with self._lock:
+            known = serial in self._devices
+        if not known:
+            return
+        script = "; ".join(f"pm list packages --show-versioncode {p}" for p in packages)
+        output = self._run(["adb", "shell", f"{script}; echo {_SEP}; {_details_script(packages)}"], serial,
+                           hedge=True)
+        if _SEP not in output:
+            self.forget_device(serial)
+            return
+        listing, details_out = output.split(_SEP, 1)
+        # `pm list packages X` is a substring filter; keep exact matches only.
+        listed = {p: v for p, v in parse_package_list(listing).items() if p in packages}
+        details = parse_package_details(details_out)
+        with self._lock:
+            inv = self._devices.get(serial)
+            if inv is None:
+                return
+            for p in packages:
+                inv.packages.pop(p, None)
+                inv.details.pop(p, None)
+            inv.packages.update(listed)
+            inv.details.update({p: d for p, d in details.items() if p in listed})
+            inv.collected_at = time.time()
+        self._changed(serial)
+
+    def forget_package(self, serial: str, package: str) -> None:
+        with self._lock:
+            inv = self._devices.get(serial)
+            if inv is not None:
+                inv.packages.pop(package, None)
+                inv.details.pop(package, None)
+        self._changed(serial)
+
+    def forget_device(self, serial: Optional[str] = None) -> None:
+        with self._lock:
+            if serial is None:
+                self._devices.clear()
+            else:
+                self._devices.pop(serial, None)
+        self._changed(serial)
+
+    def _changed(self, serial: Optional[str]) -> None:
+        if self.on_change is not None:
+            self.on_change(serial)
+
+    def get(self, serial: str) -> Optional[DeviceInventory]:
+        """Copy of one device's inventory, or None if it was never collected."""
+        with self._lock:
+            inv = self._devices.get(serial)
+            if inv is None:
+                return None
+            return replace(inv, packages=dict(inv.packages), details=dict(inv.details))
+
+    def snapshot(self) -> Dict[str, DeviceInventory]:
+        with self._lock:
+            return {s: replace(inv, packages=dict(inv.packages), details=dict(inv.details))
+                    for s, inv in self._devices.items()}
+
+    # ---------- Reporting ----------
+
+    def default_target(self) -> Dict[str, int]:
+        """Newest versionCode of each tracked package seen anywhere in the fleet."""
+        target: Dict[str, int] = {}
+        for inv in self.snapshot().values():
+            for p in self.tracked:
+                info = inv.version_of(p)
+                if info and info.version_code > target.get(p, 0):
+                    target[p] = info.version_code
+        return target
+
+    def diff(self, target: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, str]]:
+        """{serial: {package: status}} with status ok / outdated / newer / missing."""
+        target = target or self.default_target()
+        result: Dict[str, Dict[str, str]] = {}
+        for serial, inv in sorted(self.snapshot().items()):
+            row: Dict[str, str] = {}
+            for p in self.tracked:
+                info = inv.version_of(p)
+                want = target.get(p)
+                if info is None:
+                    row[p] = "missing"
+                elif want is None or info.version_code == want:
+                    row[p] = "ok"
+                else:
+                    row[p] = "outdated" if info.version_code < want else "newer"
+            result[serial] = row
+        return result
+
+    def fleet_table(self, target: Optional[Dict[str, int]] = None) -> str:
+        """Plain-text fleet table: one row per device, one column per tracked package."""
+        target = target or self.default_target()
+        diff = self.diff(target)
+        snap = self.snapshot()
+        headers = ["Device"] + [_LABELS.get(p, p) for p in self.tracked]
+        rows = [headers]
+        for serial, statuses in diff.items():
+            cells = [serial]
+            for p in self.tracked:
+                info = snap[serial].version_of(p)
+                if info is None:
+                    cells.append("-")
+                    continue
+                version = f"{info.version_name or '?'} ({info.version_code})"
+                status = statuses[p]
+                cells.append(version if status == "ok" else f"{version} [{status}]")
+            rows.append(cells)
+        widths = [max(len(r[i]) for r in rows) for i in range(len(headers))]
+        lines = ["  ".join(c.ljust(w) for c, w in zip(r, widths)) for r in rows]
+        if target:
+            lines.append("Target: " + ", ".join(f"{p}={v}" for p, v in target.items()))
+        return "\n".join(lines)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from core.adb_exec import CancelToken, cancel_scope
+from core.constants import JOB_HISTORY, JOB_MAX_CONCURRENT
+from core.logger import logger
+
+# Lower runs first among a device's pending jobs.
+PRIORITY_KEY = 0          # RCU keys: jump ahead of everything queued
+PRIORITY_NORMAL = 10
+PRIORITY_BULK = 20        # installs, transfers, benchmarks
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED, TIMEOUT = "pending", "running", "done", "failed", "cancelled", "timeout"
+FINISHED = (DONE, FAILED, CANCELLED, TIMEOUT)
+
+_current = threading.local()
+
+
+def current_job() -> Optional["Job"]:
+    """The job running on this thread (None outside a scheduler worker)."""
+    return getattr(_current, "job", None)
+
+
+@dataclass
+class Job:
+    id: int
+    device: str                      # adb serial (normalized, see JobScheduler), "default" for adb's default device
+    name: str
+    fn: Callable[[CancelToken], Any] = field(repr=False)
+    priority: int = PRIORITY_NORMAL
+    timeout: Optional[float] = None
+    state: str = PENDING
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = field(default=None, repr=False)
+    error: str = ""
+    cancel: CancelToken = field(default_factory=CancelToken, repr=False)
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def waited(self) -> float:
+        """Time spent queued (until it started, was cancelled, or now)."""
+        return (self.started_at or self.finished_at or time.time()) - self.submitted_at
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+class JobScheduler:
+    """
+    Runs device operations as jobs.
+
+    - One serial queue per device: a device never runs two jobs at once, so clicks
+      targeting the same box queue up instead of interleaving.
+    - At most max_concurrent jobs run at a time across all devices; a free worker takes
+      the best pending job of any idle device (priority, then submission order).
+    - Each job gets a CancelToken that is also the default for every adb command it runs
+      (core.adb_exec.cancel_scope), so cancel() and per-job timeouts kill the adb process.
+    - Finished jobs are kept (up to JOB_HISTORY) for the queue view.
+    - `normalize` maps a target to its queue key (e.g. AdbManager.serial), so '10.0.0.5'
+      and '10.0.0.5:5555' share one queue.
+    """
+
+    def __init__(self, max_concurrent: int = JOB_MAX_CONCURRENT, history: int = JOB_HISTORY, *,
+                 normalize: Optional[Callable[[str], str]] = None) -> None:
+        self.max_concurrent = max_concurrent
+        self._normalize = normalize or (lambda device: device)
+        self._queues: Dict[str, List[Tuple[int, int, Job]]] = {}   # device -> heap
+        self._busy: Set[str] = set()
+        self._jobs: Dict[int, Job] = {}
+        self._finished: Deque[int] = deque()
+        self._history = history
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+        self.on_change: Optional[Callable[[Job], None]] = None
+
+    # ---------- Submit / cancel ----------
+
+    def submit(self, device: Optional[str], name: str, fn: Callable[[CancelToken], Any], *,
+               priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> Job:
+        with self._cond:
+            job = Job(next(self._ids), self._key(device), name, fn, priority, timeout)
+            self._jobs[job.id] = job
+            heapq.heappush(self._queues.setdefault(job.device, []), (priority, job.id, job))
+            self._ensure_workers()
+            self._cond.notify()
+        logger.debug(f"Job {job.id} queued: {name} on {job.device} (priority {priority})")
+        self._changed(job)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Drop a pending job, or signal a running one; False if it already finished."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return False
+            if job.state == PENDING:
+                queue = self._queues.get(job.device, [])
+                queue[:] = [entry for entry in queue if entry[2] is not job]
+                heapq.heapify(queue)
+                self._finish(job, CANCELLED)
+        if job.state == RUNNING:
+            job.cancel.cancel()
+        self._changed(job)
+        return True
+
+    def cancel_device(self, device: Optional[str]) -> int:
+        key = self._key(device)
+        ids = [j.id for j in self.jobs() if j.device == key and j.state not in FINISHED]
+        return sum(self.cancel(i) for i in ids)
+
+    def _key(self, device: Optional[str]) -> str:
+        return self._normalize(device) if device else "default"
+
+    # ---------- Workers ----------
+
+    def _ensure_workers(self) -> None:
+        self._workers = [t for t in self._workers if t.is_alive()]
+        while len(self._workers) < self.max_concurrent:
+            t = threading.Thread(target=self._work, name=f"job-worker-{len(self._workers)}", daemon=True)
+            self._workers.append(t)
+            t.start()
+
+    def _next(self) -> Optional[Job]:
+        best: Optional[Tuple[int, int, Job]] = None
+        for device, queue in self._queues.items():
+            if queue and device not in self._busy and (best is None or queue[0][:2] < best[:2]):
+                best = queue[0]
+        if best is None:
+            return None
+        heapq.heappop(self._queues[best[2].device])
+        return best[2]
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next()
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._next()
+                if job is None:
+                    return
+                self._busy.add(job.device)
+                job.state, job.started_at = RUNNING, time.time()
+            self._changed(job)
+            self._run(job)
+            with self._cond:
+                self._busy.discard(job.device)
+                self._cond.notify_all()
+            self._changed(job)
+
+    def _run(self, job: Job) -> None:
+        timer = None
+        if job.timeout:
+            timer = threading.Timer(job.timeout, self._expire, args=(job,))
+            timer.daemon = True
+            timer.start()
+        state = DONE
+        _current.job = job
+        try:
+            with cancel_scope(job.cancel):
+                job.result = job.fn(job.cancel)
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.name} on {job.device}) failed")
+            state = FAILED
+            if job.error != TIMEOUT:
+                job.error = str(e)
+        finally:
+            _current.job = None
+            if timer is not None:
+                timer.cancel()
+        if job.error == TIMEOUT:
+            state = TIMEOUT
+        elif job.cancel.cancelled:
+            state = CANCELLED
+        with self._cond:
+            self._finish(job, state)
+        logger.log(
+            logging.INFO if state == DONE else logging.WARNING,
+            f"Job {job.name} on {job.device} {state} in {job.duration:.2f}s (waited {job.waited:.2f}s)",
+            extra={"device": None if job.device == "default" else job.device, "operation": job.name,
+                   "duration_ms": round(job.duration * 1000, 2)},
+        )
+
+    def _expire(self, job: Job) -> None:
+        job.error = TIMEOUT
+        job.cancel.cancel()
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state, job.finished_at = state, time.time()
+        job.done.set()
+        self._finished.append(job.id)
+        while len(self._finished) > self._history:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _changed(self, job: Job) -> None:
+        if self.on_change is not None:
+            try:
+                self.on_change(job)
+            except Exception:
+                logger.exception("Job change callback failed")
+
+    def shutdown(self) -> None:
+        """Cancel everything and let the workers exit."""
+        for job in self.jobs():
+            self.cancel(job.id)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    # ---------- Reporting ----------
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._cond:
+            return sorted(self._jobs.values(), key=lambda j: j.id)
+
+    def summary(self) -> str:
+        counts: Dict[str, int] = {}
+        for job in self.jobs():
+            counts[job.state] = counts.get(job.state, 0) + 1
+        order = (PENDING, RUNNING, DONE, FAILED, CANCELLED, TIMEOUT)
+        return "Jobs: " + ", ".join(f"{counts[s]} {s}" for s in order if s in counts) if counts else "Jobs: none"
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from core.constants import LOCATOR_CACHE_SCREENS
+from core.logger import logger
+
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+ScreenKey = Tuple[str, str, str]   # (device resolution, app version, screen signature)
+Bounds = Tuple[int, int, int, int]
+
+
+def parse_bounds(value: Optional[str]) -> Optional[Bounds]:
+    """UiAutomator2 "bounds" attribute ("[x1,y1][x2,y2]") -> (x1, y1, x2, y2)."""
+    m = _BOUNDS.search(value or "")
+    return tuple(int(v) for v in m.groups()) if m else None
+
+
+@dataclass
+class CachedElement:
+    by: str
+    value: str
+    bounds: Bounds
+    resource_id: str = ""
+    element: Any = None            # live element handle, only valid within `session`
+    session: Optional[str] = None
+    hits: int = 0
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+
+@dataclass
+class _Screen:
+    elements: Dict[Tuple[str, str], CachedElement] = field(default_factory=dict)
+    anchor: Optional[Tuple[str, str]] = None   # first element stored; re-checked to validate the screen
+
+
+class LocatorCache:
+    """
+    Resolved element locations per (resolution, app version, screen signature).
+
+    - The first element stored for a screen is its anchor: validate by looking up only the
+      anchor and comparing its bounds, instead of re-resolving every element.
+    - Entries keep the live element handle for the session that found it and the bounds,
+      so callers can click the handle (same session) or tap the center (any session).
+    - Least recently used screens are evicted beyond max_screens; callers invalidate a
+      screen when a cached element fails or its anchor moved.
+    """
+
+    def __init__(self, max_screens: int = LOCATOR_CACHE_SCREENS) -> None:
+        self.max_screens = max_screens
+        self._screens: "OrderedDict[ScreenKey, _Screen]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: ScreenKey, by: str, value: str) -> Optional[CachedElement]:
+        with self._lock:
+            screen = self._screens.get(key)
+            entry = screen.elements.get((by, value)) if screen is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._screens.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry
+
+    def put(self, key: ScreenKey, entry: CachedElement) -> None:
+        with self._lock:
+            screen = self._screens.get(key)
+            if screen is None:
+                screen = self._screens[key] = _Screen()
+                while len(self._screens) > self.max_screens:
+                    evicted, _ = self._screens.popitem(last=False)
+                    logger.debug(f"Locator cache evicted screen {evicted}")
+            screen.elements[(entry.by, entry.value)] = entry
+            if screen.anchor is None:
+                screen.anchor = (entry.by, entry.value)
+            self._screens.move_to_end(key)
+
+    def anchor(self, key: ScreenKey) -> Optional[CachedElement]:
+        with self._lock:
+            screen = self._screens.get(key)
+            if screen is None or screen.anchor is None:
+                return None
+            return screen.elements.get(screen.anchor)
+
+    def invalidate(self, key: Optional[ScreenKey] = None) -> None:
+        """Drop one screen, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._screens.clear()
+            elif self._screens.pop(key, None) is not None:
+                logger.debug(f"Locator cache invalidated screen {key}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._screens)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        return f"Locator cache: {self.hits}/{total} lookups served from cache, {len(self)} screen(s)"
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import glob
+import gzip
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterator, List, Optional, Pattern, Tuple
+
+from core.constants import LOG_DIR, LOG_FILE, LOG_INDEX_DIR, LOG_SEARCH_BLOCK
+from core.logger import logger
+
+# Start of a record in either file format: "[2025-01-31 12:00:00] [INFO] ..." or {"ts": "...", "level": "..."}.
+# Lines that do not match (tracebacks, multi-line messages) belong to the record above them.
+_RECORD = re.compile(
+    rb'^(?:\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] \[([A-Z]+)\]|\{"ts": "(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)", "level": "([A-Z]+)")',
+    re.M,
+)
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+_LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+_INDEX_HEADER = struct.Struct("<QQ")  # record count, bytes indexed
+
+
+@dataclass(frozen=True)
+class LogQuery:
+    pattern: str = ""                                 # regex; empty matches everything
+    levels: FrozenSet[str] = frozenset()              # empty = all levels
+    since: Optional[float] = None                     # epoch seconds, inclusive
+    until: Optional[float] = None
+    ignore_case: bool = True
+
+    def regex(self) -> Optional[Pattern[bytes]]:
+        """Compiled pattern (raises re.error on bad input); searched on raw UTF-8 bytes."""
+        if not self.pattern:
+            return None
+        return re.compile(self.pattern.encode("utf-8"), re.M | (re.I if self.ignore_case else 0))
+
+
+@dataclass
+class LogHit:
+    source: str        # file name (android_manager.log, android_manager.log.1.gz, ...)
+    ts: float
+    level: str
+    text: str          # whole record, continuation lines included
+
+    @property
+    def first_line(self) -> str:
+        return self.text.split("\n", 1)[0]
+
+
+@dataclass
+class _FileIndex:
+    """Start offset, timestamp and level of every record in one plain-text file."""
+    path: str                                   # what gets mapped (the log itself, or a decompressed copy)
+    source: str
+    offsets: array = field(default_factory=lambda: array("Q"))
+    times: array = field(default_factory=lambda: array("d"))
+    levels: array = field(default_factory=lambda: array("B"))
+    indexed: int = 0                            # bytes covered so far (always ends on a line break)
+    inode: int = 0
+
+    def update(self) -> int:
+        """Index what was appended since the last call; returns the number of new records."""
+        st = os.stat(self.path)
+        size = st.st_size
+        if size < self.indexed or st.st_ino != self.inode:  # truncated ("Clear QA Tool Log") or rotated
+            self.offsets, self.times, self.levels, self.indexed = array("Q"), array("d"), array("B"), 0
+            self.inode = st.st_ino
+        if size == self.indexed:
+            return 0
+        before = len(self.offsets)
+        last_text, last_ts = b"", 0.0
+        with _mapped(self.path) as mm:
+            end = mm.rfind(b"\n", self.indexed, size) + 1  # only complete lines; the rest on the next call
+            if end <= self.indexed:
+                return 0
+            for m in _RECORD.finditer(mm, self.indexed, end):
+                text = m.group(1) or m.group(3)
+                if text != last_text:  # records come in bursts within one second
+                    last_text = text
+                    last_ts = time.mktime((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                           int(text[11:13]), int(text[14:16]), int(text[17:19]), 0, 0, -1))
+                self.offsets.append(m.start())
+                self.times.append(last_ts)
+                self.levels.append(LEVELS.get((m.group(2) or m.group(4)).decode(), 0))
+        self.indexed = end
+        return len(self.offsets) - before
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(len(self.offsets), self.indexed))
+            for arr in (self.offsets, self.times, self.levels):
+                arr.tofile(f)
+
+    def load(self, path: str) -> bool:
+        try:
+            with open(path, "rb") as f:
+                count, indexed = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+                offsets, times, levels = array("Q"), array("d"), array("B")
+                for arr in (offsets, times, levels):
+                    arr.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            return False
+        self.offsets, self.times, self.levels, self.indexed = offsets, times, levels, indexed
+        self.inode = os.stat(self.path).st_ino
+        return True
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[mmap.mmap]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""  # mmap cannot map an empty file
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+class LogSearch:
+    """
+    Search and tail over the active log and its rotated .gz siblings without loading them.
+
+    - Files are memory-mapped; rotated .gz files are decompressed once into LOG_INDEX_DIR
+      (keyed by size + mtime, which survive the .1 -> .2 renames) and mapped from there.
+    - Each file has a record index (start offset, timestamp, level) that is extended
+      incrementally as the active log grows and persisted for the rotated ones.
+    - search() is a lazy generator, newest record first: a time range is two bisects on
+      the index, the regex runs over the mapped bytes block by block, and only the hits
+      the caller actually pulls are decoded.
+    - Maps are held per block, never across yields, so rotation is not blocked while a
+      result list stays open.
+    """
+
+    def __init__(self, log_dir: str = LOG_DIR, log_file: str = LOG_FILE, index_dir: str = LOG_INDEX_DIR) -> None:
+        self.log_dir = log_dir
+        self.log_file = log_file
+        self.index_dir = index_dir
+        self._indexes: Dict[str, _FileIndex] = {}   # source path -> index
+        self._lock = threading.Lock()
+
+    # ---------- Index ----------
+
+    def files(self) -> List[str]:
+        """Active log first, then rotated ones from newest (.1.gz) to oldest."""
+        active = os.path.join(self.log_dir, self.log_file)
+        rotated = glob.glob(f"{active}.*.gz")
+        rotated.sort(key=lambda p: int(p.rsplit(".", 2)[-2]) if p.rsplit(".", 2)[-2].isdigit() else 0)
+        return ([active] if os.path.exists(active) else []) + rotated
+
+    def refresh(self) -> int:
+        """Bring every file's index up to date (blocking; run off the GUI thread). Returns new records."""
+        with self._lock:
+            start = time.perf_counter()
+            added = 0
+            files = self.files()
+            for path in files:
+                index = self._indexes.get(path)
+                if path.endswith(".gz"):
+                    copy = self._plain_copy(path)
+                    if index is None or index.path != copy:  # first time, or the file was rotated
+                        index = self._indexes[path] = self._rotated_index(path, copy)
+                        added += len(index.offsets)
+                elif index is None:
+                    index = self._indexes[path] = _FileIndex(path, os.path.basename(path))
+                added += index.update()
+            for path in set(self._indexes) - set(files):
+                del self._indexes[path]
+            self._prune_cache()
+            logger.debug(f"Log index refreshed: {added} new record(s) in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return added
+
+    def _plain_copy(self, gz_path: str) -> str:
+        st = os.stat(gz_path)
+        copy = os.path.join(self.index_dir, f"{st.st_size}-{st.st_mtime_ns}.log")
+        if not os.path.exists(copy):
+            os.makedirs(self.index_dir, exist_ok=True)
+            partial = copy + ".part"
+            with gzip.open(gz_path, "rb") as src, open(partial, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(partial, copy)
+        return copy
+
+    def _rotated_index(self, gz_path: str, copy: str) -> _FileIndex:
+        index = _FileIndex(copy, os.path.basename(gz_path))
+        saved = copy[:-len(".log")] + ".idx"
+        if not index.load(saved) or index.indexed != os.path.getsize(copy):
+            index.indexed = 0
+            index.update()
+            index.save(saved)
+        return index
+
+    def _prune_cache(self) -> None:
+        """Drop decompressed copies of files that rotated out of the backup count."""
+        keep = {os.path.basename(i.path)[:-len(".log")] for i in self._indexes.values()
+                if i.path.startswith(self.index_dir)}
+        for path in glob.glob(os.path.join(self.index_dir, "*")):
+            if os.path.basename(path).split(".", 1)[0] not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Tuple[int, int, int]:
+        """(files, records, bytes) currently indexed."""
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return len(indexes), sum(len(i.offsets) for i in indexes), sum(i.indexed for i in indexes)
+
+    # ---------- Search ----------
+
+    def search(self, query: LogQuery) -> Iterator[LogHit]:
+        """Matching records, newest first, across all files (call refresh() first to see new lines)."""
+        regex = query.regex()
+        levels = {LEVELS[name] for name in query.levels if name in LEVELS}
+        with self._lock:
+            indexes = [self._indexes[p] for p in self.files() if p in self._indexes]
+        for index in indexes:
+            yield from self._search_file(index, regex, levels, query.since, query.until)
+
+    def tail(self, count: int) -> List[LogHit]:
+        hits = []
+        for hit in self.search(LogQuery()):
+            hits.append(hit)
+            if len(hits) >= count:
+                break
+        return hits[::-1]
+
+    def _search_file(self, index: _FileIndex, regex: Optional[Pattern[bytes]], levels: set,
+                     since: Optional[float], until: Optional[float]) -> Iterator[LogHit]:
+        # Snapshot: a concurrent refresh may append (or reset the arrays after a truncate).
+        offsets, times, lvls, indexed = index.offsets, index.times, index.levels, index.indexed
+        lo = bisect_left(times, since) if since is not None else 0
+        hi = bisect_right(times, until) if until is not None else len(offsets)
+        hi = min(hi, len(offsets), len(times), len(lvls))
+
+        def _end(i: int) -> int:
+            return offsets[i + 1] if i + 1 < len(offsets) else indexed
+
+        while hi > lo:
+            # One block: records [first, hi) spanning about LOG_SEARCH_BLOCK bytes, scanned forward.
+            block_end = _end(hi - 1)
+            first = max(lo, min(hi - 1, bisect_right(offsets, block_end - LOG_SEARCH_BLOCK, lo, hi) - 1))
+            found: List[Tuple[int, str]] = []
+            with _mapped(index.path) as mm:
+                if len(mm) < block_end:  # truncated since the snapshot
+                    return
+                if regex is None:
+                    rows = [i for i in range(first, hi) if not levels or lvls[i] in levels]
+                else:
+                    rows, pos = [], offsets[first]
+                    while True:
+                        m = regex.search(mm, pos, block_end)
+                        if m is None:
+                            break
+                        i = bisect_right(offsets, m.start(), first, hi) - 1
+                        if i < first:  # match before the first record (file started mid-record)
+                            i = first
+                        if not levels or lvls[i] in levels:
+                            rows.append(i)
+                        pos = _end(i)  # one hit per record: continue after it
+                        if pos >= block_end:
+                            break
+                for i in rows:
+                    found.append((i, mm[offsets[i]:_end(i)].decode("utf-8", "replace").rstrip("\n")))
+            for i, text in reversed(found):
+                yield LogHit(index.source, times[i], _LEVEL_NAMES.get(lvls[i], "?"), text)
+            hi = first
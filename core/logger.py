@@ -1,24 +1,115 @@
+import atexit
+import gzip
+import json
 import logging
-from logging.handlers import TimedRotatingFileHandler
 import os
+import queue
+import shutil
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-# === Constants ===
-LOG_DIR = "logs"
-LOG_FILE = "android_manager.log"
+from core.constants import LOG_DIR, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_FORMAT
 
 # Ensure log folder exists
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Structured fields that callers may pass via `extra={...}`
+STRUCTURED_FIELDS = ("device", "operation", "duration_ms")
+
+
+# === Formatters ===
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line; includes device/operation/duration_ms when present."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# === File handler (size rotation + gzip of rotated files) ===
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that gzips rotated files (android_manager.log.1.gz, ...).
+    Runs on the listener thread only, so compression never blocks callers.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._gzip_rotator
+
+    @staticmethod
+    def _gzip_rotator(source: str, dest: str) -> None:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def truncate(self) -> None:
+        """Empty the active log file in place (rotated files are kept)."""
+        self.acquire()
+        try:
+            if self.stream:
+                self.stream.close()
+            self.stream = self._open()
+            self.stream.truncate(0)
+        finally:
+            self.release()
+
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """
+    QueueHandler that does the bare minimum on the caller thread: merge args into msg
+    (they may be mutated after the call) and enqueue. Formatting happens on the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class _LogListener(QueueListener):
+    """QueueListener that also understands control records (e.g. truncate the file)."""
+
+    def __init__(self, q, file_handler: CompressingRotatingFileHandler, *handlers) -> None:
+        super().__init__(q, file_handler, *handlers, respect_handler_level=True)
+        self._file_handler = file_handler
+
+    def handle(self, record: logging.LogRecord) -> None:
+        if getattr(record, "control", None) == "truncate":
+            self._file_handler.truncate()
+            return
+        super().handle(record)
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
 # === Logger setup ===
 logger = logging.getLogger("AndroidManager")
 logger.setLevel(logging.DEBUG)
 
-# === File handler (daily rotation) ===
-file_handler = TimedRotatingFileHandler(
+file_handler = CompressingRotatingFileHandler(
     filename=os.path.join(LOG_DIR, LOG_FILE),
-    when="midnight",
-    backupCount=7,
-    encoding="utf-8"
+    maxBytes=LOG_MAX_BYTES,
+    backupCount=LOG_BACKUP_COUNT,
+    encoding="utf-8",
 )
 file_handler.setLevel(logging.DEBUG)
 
@@ -32,10 +123,50 @@ formatter = logging.Formatter(
     datefmt="%Y-%m-%d %H:%M:%S"
 )
 
-file_handler.setFormatter(formatter)
+if os.environ.get("ANDROID_MANAGER_LOG_FORMAT", LOG_FORMAT).lower() == "jsonl":
+    file_handler.setFormatter(JsonLinesFormatter(datefmt="%Y-%m-%d %H:%M:%S"))
+else:
+    file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
+# === Queue pipeline: callers only enqueue, disk/console I/O runs on the listener thread ===
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+queue_handler = _DeferredFormatQueueHandler(log_queue)
+listener = _LogListener(log_queue, file_handler, console_handler)
+
 # === Attach handlers only once ===
 if not logger.handlers:
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(queue_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def clear_log_file() -> None:
+    """Ask the listener thread to truncate the active log file (non-blocking)."""
+    record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "truncate", None, None)
+    record.control = "truncate"
+    log_queue.put_nowait(record)
+
+
+@contextmanager
+def timed_operation(operation: str, device: str | None = None, level: int = logging.INFO):
+    """
+    Log `operation` with its duration as structured fields once the block finishes.
+
+        with timed_operation("install_apk", device="192.168.1.25"):
+            ...
+    """
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.log(
+            logging.ERROR if failed else level,
+            f"{operation} on {device or 'default'} {'failed' if failed else 'done'} in {duration_ms} ms",
+            extra={"device": device, "operation": operation, "duration_ms": duration_ms},
+        )
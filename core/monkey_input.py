@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import select
+import socket
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from core.constants import MONKEY_DEVICE_PORT, MONKEY_RETRY_AFTER, MONKEY_START_TIMEOUT, MONKEY_TIMEOUT
+from core.logger import logger
+
+BACKENDS = ("input", "monkey")
+
+
+class MonkeyError(RuntimeError):
+    """The monkey server could not be started, reached, or rejected a command."""
+
+
+class MonkeyNoReply(MonkeyError):
+    """The command was written but no reply came back: monkey may or may not have run it."""
+
+
+class _MonkeySession:
+    """One device: the `adb shell monkey --port` process, its forward and the persistent socket."""
+
+    def __init__(self, device_ip: Optional[str], run: Callable[..., str], serial: Callable[[str], str]) -> None:
+        self.device_ip = device_ip
+        self._run = run
+        self._serial = serial
+        self.lock = threading.Lock()
+        self.port: Optional[int] = None
+        self.proc: Optional[subprocess.Popen] = None
+        self.sock: Optional[socket.socket] = None
+        self._rfile = None
+        self.starts = 0
+        self.failed_until = 0.0
+
+    # ---------- Transport ----------
+
+    def _forward(self) -> int:
+        if self.port is None:
+            out = self._run(["adb", "forward", "tcp:0", f"tcp:{MONKEY_DEVICE_PORT}"], self.device_ip)
+            if not out.strip().isdigit():
+                raise MonkeyError(f"adb forward failed: {out}")
+            self.port = int(out.strip())
+        return self.port
+
+    def _unforward(self) -> None:
+        if self.port is not None:
+            self._run(["adb", "forward", "--remove", f"tcp:{self.port}"], self.device_ip)
+            self.port = None
+
+    def _connect(self) -> bool:
+        """Open the socket and check that monkey answers (adb accepts the local side even when nothing listens)."""
+        try:
+            sock = socket.create_connection(("127.0.0.1", self._forward()), timeout=MONKEY_TIMEOUT)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock, self._rfile = sock, sock.makefile("rb")
+            self._exchange("getvar build.version.sdk")
+            return True
+        except (OSError, MonkeyError):
+            self._drop_socket()
+            return False
+
+    def _drop_socket(self) -> None:
+        for f in (self._rfile, self.sock):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self.sock = self._rfile = None
+
+    def _exchange(self, line: str) -> str:
+        self._send(line)
+        return self._reply(line)
+
+    def _send(self, line: str) -> None:
+        self.sock.sendall(line.encode() + b"\n")
+
+    def _reply(self, line: str) -> str:
+        reply = self._rfile.readline()
+        if not reply:
+            raise ConnectionError("monkey closed the connection")
+        reply = reply.decode(errors="replace").strip()
+        if reply.startswith("ERROR"):
+            raise MonkeyError(f"monkey rejected '{line}': {reply}")
+        return reply.partition(":")[2]
+
+    # ---------- Server ----------
+
+    def _stale(self) -> bool:
+        """
+        The idle socket is readable: EOF (adb dropped the forward on a device reconnect, or
+        monkey exited) or bytes nobody asked for. Either way a line written now would be lost.
+        """
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if not readable:
+                return False
+            self.sock.recv(1, socket.MSG_PEEK)
+            return True
+        except (OSError, ValueError):
+            return True
+
+    def alive(self) -> bool:
+        """Checked before every write; covers a reused monkey (proc is None) through the socket alone."""
+        return (self.sock is not None and (self.proc is None or self.proc.poll() is None)
+                and not self._stale())
+
+    def start(self) -> None:
+        """Reuse a monkey already listening on the device port, otherwise spawn one and wait for it."""
+        self.stop()
+        if time.monotonic() < self.failed_until:
+            raise MonkeyError(f"monkey unavailable, retrying in {self.failed_until - time.monotonic():.0f}s")
+        if self._connect():
+            return
+        argv = ["adb"] + (["-s", self._serial(self.device_ip)] if self.device_ip else []) + [
+            "shell", "monkey", "--port", str(MONKEY_DEVICE_PORT)]
+        self.proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL)
+        self.starts += 1
+        deadline, delay = time.monotonic() + MONKEY_START_TIMEOUT, 0.1
+        while time.monotonic() < deadline:
+            if self._connect():
+                logger.info(f"monkey key server ready on {self.device_ip or 'default'} (local port {self.port})",
+                            extra={"device": self.device_ip, "operation": "monkey_start"})
+                return
+            if self.proc.poll() is not None:
+                break
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.5)
+        self.stop()
+        self.failed_until = time.monotonic() + MONKEY_RETRY_AFTER
+        raise MonkeyError(f"monkey --port did not start on {self.device_ip or 'default'}")
+
+    def stop(self, *, quit: bool = False) -> None:
+        if quit and self.sock is not None:
+            try:
+                self._exchange("quit")
+            except (OSError, MonkeyError):
+                pass
+        self._drop_socket()
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.kill()
+                self.proc.wait()
+            self.proc = None
+
+    def close(self) -> None:
+        """Stop monkey on the device and remove the forward."""
+        with self.lock:
+            self.stop(quit=True)
+            self._unforward()
+
+    def command(self, line: str) -> str:
+        with self.lock:
+            for attempt in (1, 2):
+                try:
+                    if not self.alive():
+                        # Nothing written yet: reconnect (and re-forward) before sending.
+                        self._unforward()
+                        self.start()
+                    self._send(line)
+                    break
+                except OSError as e:
+                    # Monkey died or the device reconnected (the forward goes with it): start over once.
+                    # Nothing was written, so sending the line again can't run it twice.
+                    self.stop()
+                    self._unforward()
+                    if attempt == 2:
+                        raise MonkeyError(f"monkey unreachable on {self.device_ip or 'default'}: {e}") from e
+            try:
+                return self._reply(line)
+            except OSError as e:
+                # The line is out: a slow device may already have pressed the key. Reconnect on the
+                # next command, but leave resending this one to the caller.
+                self.stop()
+                self._unforward()
+                raise MonkeyNoReply(f"no reply from monkey on {self.device_ip or 'default'} to '{line}': {e}") from e
+
+
+class MonkeyInput:
+    """
+    Key and tap injection through the monkey network protocol (`monkey --port`), one
+    persistent server per device.
+
+    - `adb shell input keyevent` starts a new adb shell and a new app_process (the `input`
+      command) for every key, a few hundred ms on a TV box. Here monkey is started once per
+      device, its port forwarded with `adb forward tcp:0 ...`, and each key is one line over a
+      kept-open TCP socket: "press 20" -> "OK".
+    - Before each write the idle socket is checked for EOF: if monkey exited (or the device
+      reconnected and adb dropped the forward) it is restarted first, and a command that
+      could not be written is sent again once. A command that was written
+      but got no reply raises MonkeyNoReply and is not resent (the key may have been pressed).
+      A start that fails blocks retries for MONKEY_RETRY_AFTER seconds so callers can fall
+      back to `input` without waiting each key.
+    - While running, monkey registers as the activity controller: ANR / crash dialogs of apps
+      are reported to it instead of shown; close() (or `quit`) ends that.
+    """
+
+    def __init__(self, run: Callable[..., str], serial: Callable[[str], str]) -> None:
+        self._run = run
+        self._serial = serial
+        self._sessions: Dict[Optional[str], _MonkeySession] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, device_ip: Optional[str]) -> _MonkeySession:
+        with self._lock:
+            session = self._sessions.get(device_ip)
+            if session is None:
+                session = self._sessions[device_ip] = _MonkeySession(device_ip, self._run, self._serial)
+            return session
+
+    # ---------- Operations ----------
+
+    def press(self, keycode: int, device_ip: Optional[str] = None) -> str:
+        """Key down + up, like `input keyevent`."""
+        self._session(device_ip).command(f"press {int(keycode)}")
+        return "OK"
+
+    def key_down(self, keycode: int, device_ip: Optional[str] = None) -> str:
+        self._session(device_ip).command(f"key down {int(keycode)}")
+        return "OK"
+
+    def key_up(self, keycode: int, device_ip: Optional[str] = None) -> str:
+        self._session(device_ip).command(f"key up {int(keycode)}")
+        return "OK"
+
+    def tap(self, x: int, y: int, device_ip: Optional[str] = None) -> str:
+        self._session(device_ip).command(f"tap {int(x)} {int(y)}")
+        return "OK"
+
+    def restarts(self, device_ip: Optional[str] = None) -> int:
+        """Times monkey was spawned for the device (1 = never restarted)."""
+        session = self._sessions.get(device_ip)
+        return session.starts if session else 0
+
+    def close(self, device_ip: Optional[str] = None) -> None:
+        with self._lock:
+            session = self._sessions.pop(device_ip, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                logger.exception("Closing monkey key server failed")
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from core.constants import PRECONDITION_TTLS
+from core.logger import logger
+
+# Facts the controller flows verify before acting.
+DEVICE_ONLINE = "device_online"      # per device
+APPIUM_UP = "appium_up"              # per Appium host:port (device=None)
+SESSION_HEALTHY = "session_healthy"  # per device
+FOREGROUND = "foreground"            # per device + package
+DEVICE_FACTS = (DEVICE_ONLINE, SESSION_HEALTHY, FOREGROUND)
+
+_Key = Tuple[str, Optional[str], str]   # (fact, device or None for host-level facts, subject)
+
+
+class PreconditionCache:
+    """
+    Remembers recently verified facts so repeated flows skip redundant round trips.
+
+    - Only positive results are cached, each for its fact's TTL (PRECONDITION_TTLS); a
+      failed check is re-probed next time.
+    - invalidate() is called on the events that can make a fact false before its TTL
+      runs out: disconnect / reboot / reconnect, kill / clear data / launch / keys,
+      Appium start / stop.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None) -> None:
+        self.ttls = dict(PRECONDITION_TTLS, **(ttls or {}))
+        self._verified: Dict[_Key, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(fact: str, device: Optional[str], subject: str, host_level: bool) -> _Key:
+        return fact, None if host_level else (device or "default"), subject
+
+    def check(self, fact: str, probe: Callable[[], bool], *, device: Optional[str] = None,
+              subject: str = "", max_age: Optional[float] = None) -> bool:
+        """True if `fact` was verified within max_age (default: its TTL); otherwise runs probe()."""
+        key = self._key(fact, device, subject, fact == APPIUM_UP)
+        limit = self.ttls.get(fact, 0.0) if max_age is None else max_age
+        with self._lock:
+            verified_at = self._verified.get(key)
+            if verified_at is not None and time.monotonic() - verified_at <= limit:
+                self.hits += 1
+                logger.debug(f"Precondition {fact} {key[1] or ''} {subject} cached")
+                return True
+            self.misses += 1
+        ok = bool(probe())
+        if ok:
+            self.record(fact, device=device, subject=subject)
+        return ok
+
+    def record(self, fact: str, *, device: Optional[str] = None, subject: str = "") -> None:
+        """Mark a fact as verified now (e.g. right after the action that establishes it)."""
+        with self._lock:
+            self._verified[self._key(fact, device, subject, fact == APPIUM_UP)] = time.monotonic()
+
+    def invalidate(self, device: Optional[str] = None, *, facts: Optional[Iterable[str]] = None) -> None:
+        """
+        Forget facts about one device (plus the default device, which may be the same box),
+        or about every device and host when device is None. `facts` limits which facts are dropped.
+        """
+        facts = set(facts) if facts is not None else None
+        with self._lock:
+            for key in list(self._verified):
+                fact, dev, _ = key
+                if facts is not None and fact not in facts:
+                    continue
+                if device is not None and dev not in (device, "default"):
+                    continue  # host-level facts (dev None) never match a device event
+                del self._verified[key]
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        return f"Precondition checks: {self.hits}/{total} served from cache"
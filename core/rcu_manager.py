@@ -1,12 +1,34 @@
 from __future__ import annotations
 
-from typing import Iterable, Union
+import re
+import time
+from typing import Iterable, List, Union
 
 from core.constants import RCU_KEYCODES
 from core.adb_manager import AdbManager
 
 KeyName = Union[str, int]
 
+_SEQ_ITEM = re.compile(r"([A-Za-z_]+|\d+)(?:\s*[*x]\s*(\d+))?[\s,;]*")
+
+
+def parse_key_sequence(text: str) -> List[KeyName]:
+    """
+    'DOWN*10, RIGHT x3, OK' -> ['DOWN', ... x10, 'RIGHT', 'RIGHT', 'RIGHT', 'OK'].
+    Items are key names or raw keycodes separated by commas or spaces; '*N' / ' xN' repeats.
+    """
+    text = text.strip()
+    keys: List[KeyName] = []
+    pos = 0
+    while pos < len(text):
+        m = _SEQ_ITEM.match(text, pos)
+        if not m:
+            raise ValueError(f"Bad key sequence near {text[pos:pos + 10]!r}")
+        key: KeyName = int(m.group(1)) if m.group(1).isdigit() else m.group(1).upper()
+        keys.extend([key] * int(m.group(2) or 1))
+        pos = m.end()
+    return keys
+
 
 class RcuManager:
     """
@@ -15,11 +37,14 @@ class RcuManager:
     - Accepts either key *names* (e.g., "UP", "DOWN", "LEFT", "RIGHT", "OK", "BACK", "HOME")
       or raw Android keycodes (ints).
     - Provides small convenience wrappers for common actions and sequences.
+    - `backend` picks the key injection path ("input" or "monkey", see core.monkey_input);
+      None follows the AdbManager's current key_backend.
     """
 
-    def __init__(self, adb: AdbManager, log_func):
+    def __init__(self, adb: AdbManager, log_func, *, backend: str | None = None):
         self.adb = adb
         self.log = log_func
+        self.backend = backend
 
     # ---------- Core ----------
 
@@ -37,12 +62,14 @@ class RcuManager:
         code = self._resolve_code(key)
         times = max(1, int(times))
         for _ in range(times):
-            out = self.adb.keyevent(code, device_ip=device_ip)
+            out = self.adb.keyevent(code, device_ip=device_ip, backend=self.backend)
             self.log(f"RCU press {key} ({code}) → {out}")
 
-    def press_sequence(self, keys: Iterable[KeyName], device_ip: str | None = None) -> None:
-        """Press a series of keys in order."""
-        for k in keys:
+    def press_sequence(self, keys: Iterable[KeyName], device_ip: str | None = None, delay: float = 0.0) -> None:
+        """Press a series of keys in order, optionally waiting `delay` seconds between keys."""
+        for i, k in enumerate(keys):
+            if i and delay:
+                time.sleep(delay)
             self.press(k, device_ip=device_ip)
 
     # ---------- Convenience ----------
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import csv
+import subprocess
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional
+
+from core.constants import RESOURCE_SAMPLE_HZ, RESOURCE_SAMPLE_CAPACITY
+from core.logger import logger
+
+# Runs on the device for the whole session. Each newline from the host is one tick; the
+# loop uses only shell builtins (read / [ / case / echo), so a tick forks nothing on the
+# device. pidof runs only while the app has no live process (every 10th tick).
+_DEVICE_LOOP = r"""
+p=0; n=0
+while read -r _; do
+  n=$((n+1))
+  if [ ! -d /proc/$p ] || [ $p = 0 ]; then
+    p=0
+    if [ $((n % 10)) = 1 ]; then p=$(pidof {package}); p=${{p%% *}}; p=${{p:-0}}; fi
+  fi
+  read -r c < /proc/stat
+  read -r o < /proc/$$/stat
+  s=; r=; t=
+  if [ $p != 0 ]; then
+    read -r s < /proc/$p/stat
+    while read -r k v _; do case $k in VmRSS:) r=$v;; Threads:) t=$v;; esac; done < /proc/$p/status
+  fi
+  echo "@@$p|$c|$o|$s|$r|$t"
+done
+"""
+
+CHANNELS = ("time", "pid", "cpu_pct", "sys_cpu_pct", "rss_kb", "threads", "self_cpu_pct")
+
+
+class RingBuffer:
+    """Fixed-capacity ring of numbers in a compact array (8 bytes per sample for 'd')."""
+
+    def __init__(self, capacity: int, typecode: str = "d") -> None:
+        self.capacity = capacity
+        self._data = array(typecode, [0] * capacity)
+        self._next = 0
+        self._size = 0
+
+    def append(self, value: float) -> None:
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def values(self) -> List[float]:
+        """Oldest first."""
+        if self._size < self.capacity:
+            return self._data[:self._size].tolist()
+        return (self._data[self._next:] + self._data[:self._next]).tolist()
+
+    def last(self) -> Optional[float]:
+        return self._data[(self._next - 1) % self.capacity] if self._size else None
+
+
+def _proc_cpu_ticks(stat_line: str) -> Optional[int]:
+    """utime + stime from a /proc/<pid>/stat line (comm may contain spaces and parens)."""
+    rest = stat_line[stat_line.rfind(")") + 2:].split()
+    if len(rest) < 13:
+        return None
+    return int(rest[11]) + int(rest[12])
+
+
+def _system_ticks(cpu_line: str) -> tuple[int, int]:
+    """(total, idle) jiffies from the aggregate 'cpu' line of /proc/stat."""
+    values = [int(v) for v in cpu_line.split()[1:9]]
+    return sum(values), values[3] + (values[4] if len(values) > 4 else 0)
+
+
+class ResourceSampler:
+    """
+    CPU% / RSS sampler for one package on one device, over one persistent `adb shell`.
+
+    - cpu_pct is top-style (100% = one core); sys_cpu_pct is whole-device usage (0-100);
+      self_cpu_pct is what the sampling shell itself costs on the device.
+    - PID changes (app restarted / crashed) are followed automatically and counted.
+    - Samples live in fixed-size ring buffers (one array per channel), so a long session
+      costs a bounded, small amount of memory.
+    """
+
+    def __init__(self, serial: Optional[str], package: str, *, hz: float = RESOURCE_SAMPLE_HZ,
+                 capacity: int = RESOURCE_SAMPLE_CAPACITY,
+                 on_sample: Optional[Callable[[Dict[str, float]], None]] = None) -> None:
+        self.serial = serial
+        self.package = package
+        self.hz = hz
+        self.on_sample = on_sample
+        self.buffers = {name: RingBuffer(capacity, "l" if name in ("pid", "threads") else "d")
+                        for name in CHANNELS}
+        self.restarts = 0
+        self.ncpu = 1
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prev: Optional[tuple] = None
+        self._last_pid = 0
+
+    # ---------- Lifecycle ----------
+
+    def _adb(self) -> List[str]:
+        return ["adb", "-s", self.serial] if self.serial else ["adb"]
+
+    def start(self) -> None:
+        if self._proc is not None:
+            return
+        ncpu = subprocess.run(self._adb() + ["shell", "grep -c ^processor /proc/cpuinfo"],
+                              capture_output=True, text=True).stdout.strip()
+        self.ncpu = int(ncpu) if ncpu.isdigit() and int(ncpu) > 0 else 1
+        self._proc = subprocess.Popen(
+            self._adb() + ["shell", _DEVICE_LOOP.format(package=self.package)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1,
+        )
+        self._stop.clear()
+        self._prev = None
+        self._last_pid = 0
+        self._threads = [
+            threading.Thread(target=self._tick_loop, name="res-sampler-tick", daemon=True),
+            threading.Thread(target=self._read_loop, name="res-sampler-read", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        logger.info(f"Resource sampler started for {self.package} on {self.serial or 'default'} at {self.hz:g} Hz",
+                    extra={"device": self.serial, "operation": "resource_sampler"})
+
+    def stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        self._stop.set()
+        try:
+            proc.stdin.close()  # ends the device loop
+            proc.wait(timeout=3)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+        for t in self._threads:
+            t.join(timeout=3)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None
+
+    # ---------- Threads ----------
+
+    def _tick_loop(self) -> None:
+        proc = self._proc
+        period = 1.0 / self.hz
+        next_tick = time.monotonic()
+        while not self._stop.is_set() and proc.poll() is None:
+            try:
+                proc.stdin.write("\n")
+                proc.stdin.flush()
+            except (OSError, ValueError):
+                break
+            next_tick += period
+            self._stop.wait(max(0.0, next_tick - time.monotonic()))
+
+    def _read_loop(self) -> None:
+        proc = self._proc
+        for line in proc.stdout:
+            if line.startswith("@@"):
+                try:
+                    self._ingest(time.time(), line[2:].rstrip("\n"))
+                except (ValueError, IndexError):
+                    logger.debug(f"Bad resource sample: {line!r}")
+        if not self._stop.is_set():
+            logger.warning(f"Resource sampler shell for {self.serial or 'default'} exited")
+
+    # ---------- Parsing ----------
+
+    def _ingest(self, now: float, line: str) -> None:
+        pid_s, cpu_line, self_line, stat_line, rss, threads = line.split("|", 5)
+        pid = int(pid_s or 0)
+        total, idle = _system_ticks(cpu_line)
+        self_ticks = _proc_cpu_ticks(self_line) or 0
+        proc_ticks = _proc_cpu_ticks(stat_line) if pid and stat_line else None
+        prev, self._prev = self._prev, (pid, total, idle, self_ticks, proc_ticks)
+        if prev is None or total <= prev[1]:
+            return
+        d_total = total - prev[1]
+        sample = {
+            "time": now,
+            "pid": pid,
+            "sys_cpu_pct": round(100.0 * (1 - (idle - prev[2]) / d_total), 2),
+            "self_cpu_pct": round(100.0 * self.ncpu * (self_ticks - prev[3]) / d_total, 2),
+            "rss_kb": float(rss or 0),
+            "threads": int(threads or 0),
+            "cpu_pct": 0.0,
+        }
+        if pid and self._last_pid and pid != self._last_pid:
+            self.restarts += 1
+            logger.info(f"{self.package} restarted on {self.serial or 'default'}: pid {self._last_pid} -> {pid}")
+        elif pid and proc_ticks is not None and prev[4] is not None:
+            sample["cpu_pct"] = round(100.0 * self.ncpu * (proc_ticks - prev[4]) / d_total, 2)
+        self._last_pid = pid or self._last_pid
+        with self._lock:
+            for name in CHANNELS:
+                self.buffers[name].append(sample[name])
+        if self.on_sample is not None:
+            self.on_sample(sample)
+
+    # ---------- Reporting ----------
+
+    def series(self, name: str) -> List[float]:
+        with self._lock:
+            return self.buffers[name].values()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """min / avg / max per channel over the buffered window (only while the app was running)."""
+        with self._lock:
+            pids = self.buffers["pid"].values()
+            columns = {name: self.buffers[name].values() for name in ("cpu_pct", "rss_kb", "threads",
+                                                                       "sys_cpu_pct", "self_cpu_pct")}
+        result = {}
+        for name, values in columns.items():
+            if name in ("cpu_pct", "rss_kb", "threads"):
+                values = [v for v, pid in zip(values, pids) if pid]
+            if values:
+                result[name] = {"min": min(values), "avg": sum(values) / len(values), "max": max(values)}
+        return result
+
+    def summary_text(self) -> str:
+        s = self.summary()
+        parts = []
+        if "cpu_pct" in s:
+            parts.append("CPU {min:.1f}/{avg:.1f}/{max:.1f}%".format(**s["cpu_pct"]))
+        if "rss_kb" in s:
+            parts.append("RSS {:.1f}/{:.1f}/{:.1f} MB".format(*(s["rss_kb"][k] / 1024 for k in ("min", "avg", "max"))))
+        if "self_cpu_pct" in s:
+            parts.append("sampler overhead avg {avg:.2f}%".format(**s["self_cpu_pct"]))
+        return (f"{self.package} on {self.serial or 'default'} (min/avg/max): " + ", ".join(parts)
+                + (f", {self.restarts} restart(s)" if self.restarts else "")) if parts else "no samples"
+
+    def export_csv(self, path: str) -> int:
+        with self._lock:
+            columns = [self.buffers[name].values() for name in CHANNELS]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CHANNELS)
+            writer.writerows(zip(*columns))
+        return len(columns[0])
@@ -0,0 +1,564 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from core.adb_exec import CancelToken
+from core.constants import (
+    KEYPAD_SUFFIX, SCENARIO_MAX_DEVICES, SCENARIO_POLL_INTERVAL, SCENARIO_STEP_WORKERS,
+)
+from core.logger import logger
+from core.rcu_manager import RcuManager, parse_key_sequence
+
+try:  # optional: YAML scenario files; JSON always works
+    import yaml
+except ImportError:
+    yaml = None
+
+_VAR = re.compile(r"\$\{(\w+)\}")
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+_UI_DUMP = "uiautomator dump /sdcard/aam_ui.xml >/dev/null && cat /sdcard/aam_ui.xml"
+
+
+class ScenarioError(ValueError):
+    """Invalid scenario file or missing variables."""
+
+
+class StepFailed(Exception):
+    """Raised by a step action when its check does not hold."""
+
+
+# ---------- Scenario model ----------
+
+@dataclass(frozen=True)
+class Step:
+    id: str
+    action: str
+    params: Mapping[str, Any]
+    needs: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    continue_on_error: bool = False   # dependents still run if this step fails
+
+
+@dataclass(frozen=True)
+class Variable:
+    name: str
+    default: Optional[str] = None
+    pattern: Optional[str] = None
+    prompt: Optional[str] = None
+
+
+@dataclass
+class Scenario:
+    """
+    A named flow of steps. Each step runs once everything in its `needs` has finished;
+    a step without `needs` depends on the step above it, so plain files read top to bottom
+    and `needs: []` (or an explicit list) opts into running concurrently.
+    """
+    name: str
+    steps: List[Step]
+    variables: Dict[str, Variable] = field(default_factory=dict)
+    description: str = ""
+
+    def missing_variables(self, values: Mapping[str, str]) -> List[Variable]:
+        return [v for v in self.variables.values() if values.get(v.name) is None and v.default is None]
+
+    def resolve_variables(self, values: Mapping[str, str]) -> Dict[str, str]:
+        resolved = {v.name: v.default for v in self.variables.values()}
+        resolved.update({k: str(v) for k, v in values.items() if v is not None})
+        missing = [v.name for v in self.missing_variables(resolved)]
+        if missing:
+            raise ScenarioError(f"Scenario '{self.name}' needs: {', '.join(missing)}")
+        for var in self.variables.values():
+            if var.pattern and not re.fullmatch(var.pattern, resolved[var.name] or ""):
+                raise ScenarioError(f"Invalid value for '{var.name}': {resolved[var.name]!r}")
+        return resolved
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The scenario as a document parse_scenario() accepts (e.g. to send it to an agent)."""
+        variables = {v.name: {"default": v.default, "pattern": v.pattern, "prompt": v.prompt}
+                     for v in self.variables.values()}
+        steps = [dict(s.params, id=s.id, action=s.action, needs=list(s.needs), timeout=s.timeout,
+                      continue_on_error=s.continue_on_error) for s in self.steps]
+        return {"name": self.name, "description": self.description, "variables": variables, "steps": steps}
+
+
+def _topological_check(steps: Sequence[Step]) -> None:
+    ids = {s.id for s in steps}
+    for s in steps:
+        unknown = [n for n in s.needs if n not in ids]
+        if unknown:
+            raise ScenarioError(f"Step '{s.id}' needs unknown step(s): {', '.join(unknown)}")
+    remaining = {s.id: set(s.needs) for s in steps}
+    while remaining:
+        ready = [sid for sid, needs in remaining.items() if not needs]
+        if not ready:
+            raise ScenarioError(f"Dependency cycle between steps: {', '.join(sorted(remaining))}")
+        for sid in ready:
+            del remaining[sid]
+        for needs in remaining.values():
+            needs.difference_update(ready)
+
+
+def parse_scenario(data: Mapping[str, Any]) -> Scenario:
+    """Build a Scenario from the decoded YAML/JSON document, validating actions and the step graph."""
+    if not isinstance(data, Mapping) or not isinstance(data.get("steps"), list):
+        raise ScenarioError("A scenario needs a 'steps' list")
+    variables: Dict[str, Variable] = {}
+    for name, spec in (data.get("variables") or {}).items():
+        if isinstance(spec, Mapping):
+            default = spec.get("default")
+            variables[name] = Variable(name, None if default is None else str(default),
+                                       spec.get("pattern"), spec.get("prompt"))
+        else:
+            variables[name] = Variable(name, None if spec is None else str(spec))
+
+    steps: List[Step] = []
+    for i, raw in enumerate(data["steps"]):
+        if not isinstance(raw, Mapping) or "action" not in raw:
+            raise ScenarioError(f"Step #{i + 1} has no 'action'")
+        raw = dict(raw)
+        action = raw.pop("action")
+        if action not in ACTIONS:
+            raise ScenarioError(f"Step #{i + 1}: unknown action '{action}' (known: {', '.join(sorted(ACTIONS))})")
+        step_id = str(raw.pop("id", f"{i + 1}_{action}"))
+        if any(s.id == step_id for s in steps):
+            raise ScenarioError(f"Duplicate step id '{step_id}'")
+        needs = raw.pop("needs", None)
+        if needs is None:
+            needs = [steps[-1].id] if steps else []
+        elif isinstance(needs, str):
+            needs = [needs]
+        timeout = raw.pop("timeout", None)
+        steps.append(Step(
+            id=step_id,
+            action=action,
+            needs=tuple(str(n) for n in needs),
+            timeout=float(timeout) if timeout is not None else None,
+            continue_on_error=bool(raw.pop("continue_on_error", False)),
+            params=raw,
+        ))
+    _topological_check(steps)
+    return Scenario(str(data.get("name", "scenario")), steps, variables, str(data.get("description", "")))
+
+
+def load_scenario(path: str) -> Scenario:
+    """Load a .json or .yaml/.yml scenario file (YAML needs PyYAML)."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        if yaml is None:
+            raise ScenarioError("PyYAML is not installed; use a .json scenario or `pip install pyyaml`")
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ScenarioError(f"{os.path.basename(path)}: invalid YAML: {e}") from e
+    else:
+        data = json.loads(text)
+    scenario = parse_scenario(data)
+    if scenario.name == "scenario":
+        scenario.name = os.path.splitext(os.path.basename(path))[0]
+    return scenario
+
+
+# ---------- UI hierarchy (uiautomator dump over adb) ----------
+
+@dataclass(frozen=True)
+class UiNode:
+    text: str
+    desc: str
+    resource_id: str
+    focused: bool
+    center: Tuple[int, int]
+
+    @property
+    def label(self) -> str:
+        return self.text or self.desc
+
+
+def parse_ui_dump(xml_text: str) -> List[UiNode]:
+    start = xml_text.find("<?xml")
+    if start < 0:
+        start = xml_text.find("<hierarchy")
+    if start < 0:
+        return []
+    end = xml_text.rfind(">")
+    try:
+        root = ET.fromstring(xml_text[start:end + 1])
+    except ET.ParseError:
+        return []
+    nodes = []
+    for el in root.iter("node"):
+        m = _BOUNDS.match(el.get("bounds", ""))
+        x1, y1, x2, y2 = (int(v) for v in m.groups()) if m else (0, 0, 0, 0)
+        nodes.append(UiNode(
+            text=(el.get("text") or "").strip(),
+            desc=(el.get("content-desc") or "").strip(),
+            resource_id=el.get("resource-id") or "",
+            focused=el.get("focused") == "true",
+            center=((x1 + x2) // 2, (y1 + y2) // 2),
+        ))
+    return nodes
+
+
+# ---------- Actions ----------
+
+@dataclass
+class StepContext:
+    adb: Any                              # core.adb_manager.AdbManager
+    rcu: RcuManager
+    device_ip: Optional[str]
+    params: Dict[str, Any]
+    timeout: Optional[float]
+    cancel: Optional[CancelToken]
+
+    def run(self, command: List[str]) -> str:
+        return self.adb.run(command, self.device_ip, timeout=self.timeout, cancel=self.cancel)
+
+    def ui(self) -> List[UiNode]:
+        return parse_ui_dump(self.adb.run(["adb", "shell", _UI_DUMP], self.device_ip,
+                                          cancel=self.cancel, hedge=False))
+
+    def wait_for(self, predicate: Callable[[List[UiNode]], bool], default_timeout: float = 10.0) -> List[UiNode]:
+        deadline = time.monotonic() + (self.timeout or default_timeout)
+        while True:
+            nodes = self.ui()
+            if predicate(nodes):
+                return nodes
+            if time.monotonic() >= deadline or (self.cancel is not None and self.cancel.cancelled):
+                raise StepFailed("Screen not reached within the timeout")
+            time.sleep(SCENARIO_POLL_INTERVAL)
+
+    def require(self, name: str) -> Any:
+        if name not in self.params:
+            raise StepFailed(f"Missing parameter '{name}'")
+        return self.params[name]
+
+
+ACTIONS: Dict[str, Callable[[StepContext], str]] = {}
+
+
+def action(name: str):
+    """Register a step action: fn(ctx) -> message; raise StepFailed when a check fails."""
+    def register(fn: Callable[[StepContext], str]) -> Callable[[StepContext], str]:
+        ACTIONS[name] = fn
+        return fn
+    return register
+
+
+@action("connect")
+def _connect(ctx: StepContext) -> str:
+    if ctx.device_ip:
+        ip, _, port = ctx.device_ip.partition(":")
+        out = ctx.adb.connect(ip, int(port)) if port else ctx.adb.connect(ip)
+        if "connected to" not in out:
+            raise StepFailed(out or "adb connect failed")
+        return out
+    devices = [ln for ln in ctx.adb.list_devices().splitlines() if ln.endswith("\tdevice")]
+    if not devices:
+        raise StepFailed("No device connected")
+    return f"{len(devices)} device(s) connected"
+
+
+@action("clear_data")
+def _clear_data(ctx: StepContext) -> str:
+    out = ctx.adb.clear_data(ctx.require("package"), ctx.device_ip)
+    if not out.startswith("Data cleared"):
+        raise StepFailed(out)
+    return out
+
+
+@action("kill")
+def _kill(ctx: StepContext) -> str:
+    return ctx.adb.kill_app(ctx.require("package"), ctx.device_ip)
+
+
+@action("launch")
+def _launch(ctx: StepContext) -> str:
+    component = ctx.params.get("component")
+    if component:
+        out = ctx.run(["adb", "shell", "am", "start", "-W", "-n", component])
+    else:
+        out = ctx.run(["adb", "shell", "monkey", "-p", ctx.require("package"),
+                       "-c", "android.intent.category.LEANBACK_LAUNCHER", "1"])
+    if "Error" in out or "No activities found" in out:
+        raise StepFailed(out)
+    return out.splitlines()[-1] if out else "launched"
+
+
+@action("assert_foreground")
+def _assert_foreground(ctx: StepContext) -> str:
+    package = ctx.require("package")
+    out = ctx.run(["adb", "shell", "dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'"])
+    if f"{package}/" not in out:
+        raise StepFailed(ctx.params.get("message") or f"{package} is not in the foreground")
+    return f"{package} in foreground"
+
+
+@action("wait_for_screen")
+def _wait_for_screen(ctx: StepContext) -> str:
+    texts = list(ctx.params.get("texts") or [])
+    ids = list(ctx.params.get("resource_ids") or [])
+    if not texts and not ids:
+        raise StepFailed("wait_for_screen needs 'texts' and/or 'resource_ids'")
+
+    def present(nodes: List[UiNode]) -> bool:
+        labels = {n.label for n in nodes}
+        rids = {n.resource_id for n in nodes}
+        return all(t in labels for t in texts) and all(r in rids for r in ids)
+
+    ctx.wait_for(present)
+    return "Screen detected"
+
+
+@action("assert_focused")
+def _assert_focused(ctx: StepContext) -> str:
+    """Without 'text' only reports what is focused; with it, fails unless that element has focus."""
+    focused = next((n.label for n in ctx.ui() if n.focused and n.label), "")
+    expected = ctx.params.get("text")
+    if expected is not None and focused != expected:
+        raise StepFailed(f"Focused {focused!r}, expected {expected!r}")
+    return f"Currently focused: {focused}" if focused else "No focused element detected"
+
+
+@action("focus")
+def _focus(ctx: StepContext) -> str:
+    """Press `key` until the element labelled `text` has focus (at most `max_presses` times)."""
+    text = ctx.require("text")
+    key = ctx.params.get("key", "RIGHT")
+    max_presses = int(ctx.params.get("max_presses", 5))
+    for presses in range(max_presses + 1):
+        if any(n.focused and n.label == text for n in ctx.ui()):
+            return f"Focused {text!r} after {presses} press(es)"
+        if presses < max_presses:
+            ctx.rcu.press(key, device_ip=ctx.device_ip)
+    raise StepFailed(f"Could not focus {text!r}")
+
+
+@action("press")
+def _press(ctx: StepContext) -> str:
+    keys = parse_key_sequence(str(ctx.require("keys")))
+    ctx.rcu.press_sequence(keys, device_ip=ctx.device_ip, delay=float(ctx.params.get("delay", 0.0)))
+    return f"Pressed {len(keys)} key(s)"
+
+
+@action("enter_digits")
+def _enter_digits(ctx: StepContext) -> str:
+    """
+    Tap on-screen keypad buttons. 'resource_id' is a template with {suffix} (Zero..Nine,
+    see KEYPAD_SUFFIX); the keypad is dumped once and every digit tapped by coordinates.
+    Without a template the digits are typed as KEYCODE_0..9.
+    """
+    digits = str(ctx.require("digits"))
+    template = ctx.params.get("resource_id")
+    if not template:
+        ctx.rcu.press_sequence([7 + int(d) for d in digits if d.isdigit()], device_ip=ctx.device_ip)
+        return f"Typed {len(digits)} digit(s)"
+    wanted = {template.format(suffix=KEYPAD_SUFFIX[d]) for d in set(digits) if d in KEYPAD_SUFFIX}
+    nodes = ctx.wait_for(lambda ns: wanted <= {n.resource_id for n in ns})
+    centers = {n.resource_id: n.center for n in nodes}
+    for d in digits:
+        x, y = centers[template.format(suffix=KEYPAD_SUFFIX[d])]
+        ctx.run(["adb", "shell", "input", "tap", str(x), str(y)])
+    return f"Entered {len(digits)} digit(s)"
+
+
+@action("tap_text")
+def _tap_text(ctx: StepContext) -> str:
+    text = ctx.require("text")
+    nodes = ctx.wait_for(lambda ns: any(n.label == text for n in ns))
+    x, y = next(n.center for n in nodes if n.label == text)
+    ctx.run(["adb", "shell", "input", "tap", str(x), str(y)])
+    return f"Tapped {text!r} at {x},{y}"
+
+
+@action("sleep")
+def _sleep(ctx: StepContext) -> str:
+    seconds = float(ctx.params.get("seconds", 1.0))
+    if ctx.cancel is not None:
+        ctx.cancel.wait(seconds)
+    else:
+        time.sleep(seconds)
+    return f"Slept {seconds:g}s"
+
+
+@action("shell")
+def _shell(ctx: StepContext) -> str:
+    out = ctx.run(["adb", "shell", str(ctx.require("command"))])
+    expect = ctx.params.get("expect")
+    if expect is not None and not re.search(expect, out):
+        raise StepFailed(f"Output did not match {expect!r}: {out[:200]}")
+    return out[:200]
+
+
+# ---------- Results ----------
+
+@dataclass
+class StepResult:
+    device: str
+    step: str
+    action: str
+    status: str        # ok / failed / skipped / cancelled
+    started: float     # seconds since the scenario started
+    duration: float
+    message: str = ""
+
+
+@dataclass
+class ScenarioReport:
+    scenario: str
+    duration: float = 0.0
+    results: List[StepResult] = field(default_factory=list)
+
+    def device_ok(self, device: str) -> bool:
+        return all(r.status == "ok" for r in self.results if r.device == device)
+
+    @property
+    def devices(self) -> List[str]:
+        return list(dict.fromkeys(r.device for r in self.results))
+
+    @property
+    def ok(self) -> bool:
+        return all(self.device_ok(d) for d in self.devices)
+
+    def summary(self) -> str:
+        lines = [f"Scenario '{self.scenario}': "
+                 f"{sum(self.device_ok(d) for d in self.devices)}/{len(self.devices)} device(s) passed "
+                 f"in {self.duration:.1f}s"]
+        for device in self.devices:
+            results = [r for r in self.results if r.device == device]
+            bad = next((r for r in results if r.status == "failed"), None)
+            slowest = max(results, key=lambda r: r.duration, default=None)
+            line = f"  {device}: " + (f"FAILED at {bad.step} ({bad.message})" if bad else "ok")
+            if slowest is not None:
+                line += f", slowest step {slowest.step} {slowest.duration:.2f}s"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def write_csv(self, path: str) -> None:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(StepResult.__dataclass_fields__))
+            writer.writeheader()
+            for r in self.results:
+                writer.writerow(asdict(r))
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"scenario": self.scenario, "duration": self.duration, "ok": self.ok,
+                       "results": [asdict(r) for r in self.results]}, f, ensure_ascii=False, indent=2)
+
+
+# ---------- Runner ----------
+
+def _substitute(value: Any, variables: Mapping[str, str]) -> Any:
+    if isinstance(value, str):
+        return _VAR.sub(lambda m: variables.get(m.group(1), m.group(0)), value)
+    if isinstance(value, list):
+        return [_substitute(v, variables) for v in value]
+    if isinstance(value, dict):
+        return {k: _substitute(v, variables) for k, v in value.items()}
+    return value
+
+
+class ScenarioRunner:
+    """
+    Executes a Scenario on one or more devices.
+
+    Devices run in parallel (up to max_devices); on each device the step graph is
+    scheduled as soon as a step's dependencies finish, with up to step_workers
+    independent steps in flight. A failed step skips everything that depends on it
+    unless it is marked continue_on_error. Every step gets a StepResult with timings.
+    """
+
+    def __init__(self, adb, log_func: Optional[Callable[..., None]] = None, *,
+                 max_devices: int = SCENARIO_MAX_DEVICES,
+                 step_workers: int = SCENARIO_STEP_WORKERS) -> None:
+        self.adb = adb
+        self.log = log_func or (lambda *_: None)
+        self.rcu = RcuManager(adb, lambda *_: None)  # per-key output would flood the log
+        self.max_devices = max_devices
+        self.step_workers = step_workers
+
+    def run(self, scenario: Scenario, devices: Sequence[Optional[str]],
+            variables: Optional[Mapping[str, str]] = None,
+            cancel: Optional[CancelToken] = None) -> ScenarioReport:
+        resolved = scenario.resolve_variables(variables or {})
+        devices = list(devices) or [None]
+        report = ScenarioReport(scenario.name)
+        lock = threading.Lock()
+        t0 = time.perf_counter()
+
+        def _device(device_ip: Optional[str]) -> None:
+            results = self._run_device(scenario, device_ip, dict(resolved, device=device_ip or ""), cancel, t0)
+            with lock:
+                report.results.extend(results)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_devices, len(devices))) as pool:
+            for f in [pool.submit(_device, d) for d in devices]:
+                f.result()
+        report.duration = round(time.perf_counter() - t0, 3)
+        logger.info(f"Scenario {scenario.name} finished: ok={report.ok} in {report.duration:.1f}s",
+                    extra={"operation": "scenario"})
+        return report
+
+    def _run_device(self, scenario: Scenario, device_ip: Optional[str], variables: Dict[str, str],
+                    cancel: Optional[CancelToken], t0: float) -> List[StepResult]:
+        device = device_ip or "default"
+        steps = {s.id: s for s in scenario.steps}
+        results: Dict[str, StepResult] = {}
+        running: Dict[Future, Step] = {}
+
+        def _execute(step: Step) -> StepResult:
+            ctx = StepContext(self.adb, self.rcu, device_ip, _substitute(dict(step.params), variables),
+                              step.timeout, cancel)
+            start = time.perf_counter()
+            try:
+                status, message = "ok", ACTIONS[step.action](ctx)
+            except StepFailed as e:
+                status, message = "failed", str(e)
+            except Exception as e:
+                logger.exception(f"Scenario step {step.id} crashed on {device}")
+                status, message = "failed", f"{type(e).__name__}: {e}"
+            if cancel is not None and cancel.cancelled and status != "ok":
+                status = "cancelled"
+            return StepResult(device, step.id, step.action, status, round(start - t0, 3),
+                              round(time.perf_counter() - start, 3), message)
+
+        def _blocked(step: Step) -> Optional[str]:
+            for need in step.needs:
+                r = results[need]
+                if r.status != "ok" and not (r.status == "failed" and steps[need].continue_on_error):
+                    return need
+            return None
+
+        with ThreadPoolExecutor(max_workers=self.step_workers) as pool:
+            while len(results) < len(steps):
+                started = set(results) | {s.id for s in running.values()}
+                for step in scenario.steps:
+                    if step.id in started or not all(n in results for n in step.needs):
+                        continue
+                    blocker = _blocked(step)
+                    if blocker or (cancel is not None and cancel.cancelled):
+                        status = "cancelled" if cancel is not None and cancel.cancelled else "skipped"
+                        results[step.id] = StepResult(device, step.id, step.action, status,
+                                                      round(time.perf_counter() - t0, 3), 0.0,
+                                                      f"after {blocker}" if blocker else "")
+                        continue
+                    running[pool.submit(_execute, step)] = step
+                if not running:
+                    continue  # newly skipped steps may unblock (skip) others
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in done:
+                    result = results[running.pop(f).id] = f.result()
+                    level = "INFO" if result.status == "ok" else "ERROR"
+                    self.log(f"[{device}] {result.step}: {result.status} in {result.duration:.2f}s"
+                             + (f" - {result.message}" if result.message else ""), level)
+        return [results[s.id] for s in scenario.steps]
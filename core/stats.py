@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Sequence
+
+try:  # optional: vectorized math; results are identical without it
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def percentiles(values: Sequence[float], pcts: Sequence[float] = (50, 90, 99)) -> Dict[str, float]:
+    """
+    n / min / mean / max plus the requested percentiles, keyed 'median' (50) and 'pNN'.
+    Linear interpolation between samples, like numpy.percentile's default.
+    """
+    keys = ["median" if p == 50 else f"p{p:g}" for p in pcts]
+    if len(values) == 0:
+        return {"n": 0}
+    if np is not None:
+        arr = np.asarray(values, dtype=float)
+        result = {"n": int(arr.size), "min": float(arr.min()), "mean": float(arr.mean()), "max": float(arr.max())}
+        result.update(zip(keys, (float(v) for v in np.percentile(arr, list(pcts)))))
+        return result
+    data = sorted(float(v) for v in values)
+
+    def _pct(p: float) -> float:
+        k = (len(data) - 1) * p / 100
+        lo, hi = math.floor(k), math.ceil(k)
+        return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+    result = {"n": len(data), "min": data[0], "mean": sum(data) / len(data), "max": data[-1]}
+    result.update(zip(keys, (_pct(p) for p in pcts)))
+    return result
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import http.client
+import json
+import re
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from core.constants import (
+    UIA2_DEVICE_PORT, UIA2_HTTP_TIMEOUT, UIA2_SERVER_INSTRUMENTATION, UIA2_START_TIMEOUT,
+)
+from core.adb_manager import AdbManager
+from core.logger import logger
+
+try:  # optional: lets AppiumManager's existing Selenium handlers catch our errors unchanged
+    from selenium.common.exceptions import NoSuchElementException as _NoSuchElementBase
+    from selenium.common.exceptions import WebDriverException as _WebDriverBase
+except ImportError:
+    _WebDriverBase = _NoSuchElementBase = Exception
+
+_ELEMENT_KEYS = ("element-6066-11e4-a52e-4f735466cecf", "ELEMENT")
+_FOCUS = re.compile(r"mCurrentFocus=Window\{\S+ \S+ ([\w.]+)/")
+
+
+class Uia2Error(_WebDriverBase):
+    """The UiAutomator2 server returned an error or could not be reached."""
+
+
+class Uia2NoSuchElement(Uia2Error, _NoSuchElementBase):
+    pass
+
+
+class Uia2Client:
+    """
+    Minimal HTTP client for the UiAutomator2 server that Appium installs on the device
+    (io.appium.uiautomator2.server), without the Appium/Node hop in between.
+
+    - The device port is forwarded with `adb forward tcp:0 ...` (adb picks a free local port);
+      pass `port` to talk to an already forwarded port or a local stub instead.
+    - One HTTP/1.1 keep-alive connection is reused for every call. A failed call is retried
+      once on a new connection if it is a GET/DELETE or never reached the server; a POST
+      that was sent is not repeated. Calls are serialized with a lock, like a WebDriver session.
+    """
+
+    def __init__(self, device_ip: Optional[str] = None, *, run: Optional[Callable[..., str]] = None,
+                 port: Optional[int] = None, host: str = "127.0.0.1",
+                 timeout: float = UIA2_HTTP_TIMEOUT, keep_alive: bool = True) -> None:
+        self.device_ip = device_ip
+        self._run = run
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.session_id: Optional[str] = None
+        self._forwarded = False
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+        self._instrument: Optional[subprocess.Popen] = None
+
+    # ---------- Transport ----------
+
+    def forward(self) -> int:
+        if self.port is None:
+            out = self._run(["adb", "forward", "tcp:0", f"tcp:{UIA2_DEVICE_PORT}"], self.device_ip)
+            if not out.strip().isdigit():
+                raise Uia2Error(f"adb forward failed: {out}")
+            self.port = int(out.strip())
+            self._forwarded = True
+        return self.port
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.forward(), timeout=self.timeout)
+        return self._conn
+
+    def _drop_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, *,
+                full: bool = False) -> Any:
+        """One W3C-style call; returns the response's "value" (whole body if full) or raises Uia2Error."""
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+        idempotent = method in ("GET", "DELETE")
+        with self._lock:
+            for attempt in (1, 2):
+                sent = False
+                try:
+                    conn = self._connection()
+                    conn.request(method, "/wd/hub" + path, payload, headers)
+                    sent = True
+                    resp = conn.getresponse()
+                    raw = resp.read()
+                    if not self.keep_alive or resp.will_close:
+                        self._drop_connection()
+                    break
+                except (http.client.HTTPException, ConnectionError, TimeoutError, OSError) as e:
+                    self._drop_connection()
+                    # A POST that reached the server may have run (click, sendKeys, new session): don't repeat it.
+                    if attempt == 2 or (sent and not idempotent):
+                        raise Uia2Error(f"UiAutomator2 server unreachable on port {self.port}: {e}") from e
+        try:
+            data = json.loads(raw or b"{}")
+        except ValueError:
+            raise Uia2Error(f"Bad response from UiAutomator2 server: {raw[:200]!r}")
+        value = data.get("value") if isinstance(data, dict) else None
+        if resp.status >= 400 or (isinstance(value, dict) and "error" in value):
+            error = value.get("error", "") if isinstance(value, dict) else ""
+            message = value.get("message", "") if isinstance(value, dict) else str(data)
+            if error == "no such element":
+                raise Uia2NoSuchElement(message or error)
+            raise Uia2Error(f"{error or resp.status}: {message}")
+        return data if full else value
+
+    def adb_shell(self, command: str) -> str:
+        return self._run(["adb", "shell", command], self.device_ip) if self._run is not None else ""
+
+    # ---------- Server / session ----------
+
+    def status(self) -> bool:
+        try:
+            self.request("GET", "/status")
+            return True
+        except Uia2Error:
+            return False
+
+    def ensure_server(self, timeout: float = UIA2_START_TIMEOUT) -> None:
+        """Start the on-device server through instrumentation unless it already answers."""
+        if self.status():
+            return
+        if self._run is None or not self._forwarded:
+            raise Uia2Error(f"No UiAutomator2 server on port {self.port}")
+        argv = ["adb"] + (["-s", AdbManager.serial(self.device_ip)] if self.device_ip else []) + [
+            "shell", "am", "instrument", "-w", "-e", "disableAnalytics", "true", UIA2_SERVER_INSTRUMENTATION]
+        self._instrument = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline, delay = time.monotonic() + timeout, 0.2
+        while time.monotonic() < deadline:
+            if self.status():
+                return
+            if self._instrument.poll() is not None:
+                break
+            time.sleep(delay)
+            delay = min(delay * 1.5, 1.0)
+        raise Uia2Error("UiAutomator2 server did not start (is it installed? run one Appium session first)")
+
+    def create_session(self, capabilities: Optional[Dict[str, Any]] = None) -> str:
+        data = self.request("POST", "/session", {"capabilities": {"alwaysMatch": capabilities or {}}}, full=True)
+        value = data.get("value") if isinstance(data.get("value"), dict) else {}
+        self.session_id = data.get("sessionId") or value.get("sessionId")  # JSONWP or W3C shape
+        if not self.session_id:
+            raise Uia2Error(f"No session id in response: {data}")
+        return self.session_id
+
+    def _s(self, path: str) -> str:
+        if not self.session_id:
+            raise Uia2Error("No UiAutomator2 session")
+        return f"/session/{self.session_id}{path}"
+
+    def close(self) -> None:
+        if self.session_id:
+            try:
+                self.request("DELETE", self._s(""))
+            except Uia2Error:
+                pass
+            self.session_id = None
+        self._drop_connection()
+        if self._instrument is not None:
+            if self._instrument.poll() is None:
+                self._instrument.terminate()
+                try:
+                    self._instrument.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._instrument.kill()
+                    self._instrument.wait()
+            self._instrument = None
+        if self._forwarded:
+            self._run(["adb", "forward", "--remove", f"tcp:{self.port}"], self.device_ip)
+            self._forwarded, self.port = False, None
+
+    # ---------- Operations ----------
+
+    @staticmethod
+    def _element_id(value: Any) -> str:
+        for key in _ELEMENT_KEYS:
+            if isinstance(value, dict) and key in value:
+                return value[key]
+        raise Uia2Error(f"Not an element: {value}")
+
+    def find_element(self, strategy: str, selector: str) -> str:
+        return self._element_id(self.request("POST", self._s("/element"), {
+            "strategy": strategy, "selector": selector, "context": "", "multiple": False}))
+
+    def find_elements(self, strategy: str, selector: str) -> List[str]:
+        try:
+            values = self.request("POST", self._s("/elements"), {
+                "strategy": strategy, "selector": selector, "context": "", "multiple": True})
+        except Uia2NoSuchElement:
+            return []
+        return [self._element_id(v) for v in values or []]
+
+    def attribute(self, element_id: str, name: str) -> Optional[str]:
+        return self.request("GET", self._s(f"/element/{element_id}/attribute/{name}"))
+
+    def text(self, element_id: str) -> str:
+        return self.request("GET", self._s(f"/element/{element_id}/text")) or ""
+
+    def click(self, element_id: str) -> None:
+        self.request("POST", self._s(f"/element/{element_id}/click"), {})
+
+    def page_source(self) -> str:
+        return self.request("GET", self._s("/source")) or ""
+
+    def press_keycode(self, keycode: int) -> None:
+        self.request("POST", self._s("/appium/device/press_keycode"), {"keycode": int(keycode)})
+
+    def tap(self, x: int, y: int) -> None:
+        self.request("POST", self._s("/appium/tap"), {"x": int(x), "y": int(y)})
+
+
+class Uia2Element:
+    """The subset of a Selenium WebElement that AppiumManager uses."""
+
+    def __init__(self, client: Uia2Client, element_id: str) -> None:
+        self._client = client
+        self.id = element_id
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self._client.attribute(self.id, name)
+
+    @property
+    def text(self) -> str:
+        return self._client.text(self.id)
+
+    def click(self) -> None:
+        self._client.click(self.id)
+
+    def is_displayed(self) -> bool:
+        return str(self.get_attribute("displayed")).lower() == "true"
+
+    def is_enabled(self) -> bool:
+        return str(self.get_attribute("enabled")).lower() == "true"
+
+
+class Uia2Driver:
+    """
+    Drop-in for the webdriver.Remote subset AppiumManager calls (find_element(s),
+    press_keycode, tap, current_package, page_source, quit), backed by Uia2Client, so the
+    existing flows run unchanged on either path.
+    """
+
+    def __init__(self, client: Uia2Client) -> None:
+        self.client = client
+
+    @classmethod
+    def connect(cls, device_ip: Optional[str], run: Callable[..., str],
+                capabilities: Optional[Dict[str, Any]] = None) -> "Uia2Driver":
+        client = Uia2Client(device_ip, run=run)
+        start = time.perf_counter()
+        try:
+            client.ensure_server()
+            client.create_session(capabilities)
+        except BaseException:
+            # Don't leave the instrumentation process, the forward or the socket behind.
+            client.close()
+            raise
+        logger.info(f"Direct UiAutomator2 session on {device_ip or 'default'} (port {client.port})",
+                    extra={"device": device_ip, "operation": "uia2_session",
+                           "duration_ms": round((time.perf_counter() - start) * 1000, 2)})
+        return cls(client)
+
+    @property
+    def session_id(self) -> Optional[str]:
+        return self.client.session_id
+
+    def find_element(self, by: str, value: str) -> Uia2Element:
+        return Uia2Element(self.client, self.client.find_element(by, value))
+
+    def find_elements(self, by: str, value: str) -> List[Uia2Element]:
+        return [Uia2Element(self.client, e) for e in self.client.find_elements(by, value)]
+
+    def press_keycode(self, keycode: int) -> None:
+        self.client.press_keycode(keycode)
+
+    def tap(self, positions: List[tuple], duration: Optional[int] = None) -> None:
+        for x, y in positions:
+            self.client.tap(x, y)
+
+    @property
+    def page_source(self) -> str:
+        return self.client.page_source()
+
+    @property
+    def current_package(self) -> str:
+        m = _FOCUS.search(self.client.adb_shell("dumpsys window | grep mCurrentFocus"))
+        return m.group(1) if m else ""
+
+    def quit(self) -> None:
+        self.client.close()
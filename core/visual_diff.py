@@ -0,0 +1,543 @@
+from __future__ import annotations
+
+import csv
+import html
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from core.adb_exec import CancelToken
+from core.constants import (
+    VISUAL_BASELINE_CACHE, VISUAL_CAPTURE_TIMEOUT, VISUAL_MAX_CHANGED_PCT, VISUAL_MAX_DEVICES, VISUAL_MIN_SCORE, VISUAL_PIXEL_THRESHOLD,
+    VISUAL_SETTLE, VISUAL_SSIM_BLOCK, VISUAL_WORKERS,
+)
+from core.logger import logger
+from core.rcu_manager import RcuManager, parse_key_sequence
+
+try:  # vectorized comparison; required for visual diffing
+    import numpy as np
+except ImportError:
+    np = None
+
+try:  # optional: fast PNG decoding; the built-in decoder reads what screencap writes, more slowly
+    from PIL import Image
+except ImportError:
+    Image = None
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_LUMA = (0.299, 0.587, 0.114)
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+Mask = Tuple[float, float, float, float]   # x, y, width, height as fractions of the screen
+
+
+class VisualDiffError(ValueError):
+    """Invalid sweep file, failed capture, unreadable image or NumPy missing."""
+
+
+# ---------- Sweep model ----------
+
+@dataclass(frozen=True)
+class Screen:
+    name: str                     # file name of the capture (<name>.png) and of its baseline
+    launch: str = ""              # component started first (package/activity)
+    keys: str = ""                # RCU key sequence pressed before the capture, e.g. "HOME, DOWN*2, OK"
+    settle: float = VISUAL_SETTLE
+    masks: Tuple[Mask, ...] = ()  # ignored regions (clock, live video, ads)
+
+
+@dataclass
+class Sweep:
+    """
+    Screens captured in order on every device; each screen navigates from the state the
+    previous one left. Masks are fractions of the screen so one file fits every resolution.
+    """
+    name: str
+    screens: List[Screen]
+    masks: Tuple[Mask, ...] = ()  # applied to every screen
+    key_delay: float = 0.3
+    description: str = ""
+
+
+def _masks(raw: Any, where: str) -> Tuple[Mask, ...]:
+    masks = []
+    for m in raw or []:
+        if not isinstance(m, (list, tuple)) or len(m) != 4 or not all(isinstance(v, (int, float)) for v in m):
+            raise VisualDiffError(f"{where}: a mask is [x, y, width, height] as fractions (0-1), got {m!r}")
+        masks.append(tuple(float(v) for v in m))
+    return tuple(masks)
+
+
+def parse_sweep(data: Mapping[str, Any]) -> Sweep:
+    """Build a Sweep from the decoded JSON document, validating names and key sequences."""
+    if not isinstance(data, Mapping) or not isinstance(data.get("screens"), list) or not data["screens"]:
+        raise VisualDiffError("A sweep needs a non-empty 'screens' list")
+    screens: List[Screen] = []
+    for i, raw in enumerate(data["screens"]):
+        if not isinstance(raw, Mapping) or not raw.get("name"):
+            raise VisualDiffError(f"Screen #{i + 1} has no 'name'")
+        name = str(raw["name"])
+        if any(s.name == name for s in screens) or not name.replace("-", "").replace("_", "").isalnum():
+            raise VisualDiffError(f"Screen #{i + 1}: name '{name}' must be unique and use letters, digits, - or _")
+        keys = str(raw.get("keys", ""))
+        try:
+            parse_key_sequence(keys)
+        except ValueError as e:
+            raise VisualDiffError(f"Screen '{name}': {e}")
+        screens.append(Screen(name, str(raw.get("launch", "")), keys, float(raw.get("settle", VISUAL_SETTLE)),
+                              _masks(raw.get("masks"), f"Screen '{name}'")))
+    return Sweep(str(data.get("name", "sweep")), screens, _masks(data.get("masks"), "Sweep"),
+                 float(data.get("key_delay", 0.3)), str(data.get("description", "")))
+
+
+def load_sweep(path: str) -> Sweep:
+    with open(path, encoding="utf-8") as f:
+        sweep = parse_sweep(json.load(f))
+    if sweep.name == "sweep":
+        sweep.name = os.path.splitext(os.path.basename(path))[0]
+    return sweep
+
+
+# ---------- PNG ----------
+
+def _unfilter_slow(kind: int, row: bytes, prior: bytes, bpp: int) -> bytes:
+    """Average / Paeth rows depend on the pixel to their left, so they cannot be vectorized."""
+    cur = bytearray(row)
+    for i in range(len(cur)):
+        a = cur[i - bpp] if i >= bpp else 0
+        b = prior[i]
+        if kind == 3:
+            cur[i] = (cur[i] + ((a + b) >> 1)) & 0xFF
+            continue
+        c = prior[i - bpp] if i >= bpp else 0
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        if pa <= pb and pa <= pc:
+            pred = a
+        elif pb <= pc:
+            pred = b
+        else:
+            pred = c
+        cur[i] = (cur[i] + pred) & 0xFF
+    return bytes(cur)
+
+
+def _decode_png(data: bytes) -> "np.ndarray":
+    """8-bit RGB / RGBA, non-interlaced PNG (what screencap and write_png produce) -> HxWx3 uint8."""
+    if not data.startswith(_PNG_SIGNATURE):
+        raise VisualDiffError("Not a PNG image")
+    pos, idat, width, height, bpp = len(_PNG_SIGNATURE), [], 0, 0, 0
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if kind == b"IHDR":
+            width, height, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", chunk)
+            if depth != 8 or color not in (2, 6) or interlace:
+                raise VisualDiffError(f"Unsupported PNG (depth {depth}, color type {color}); install Pillow")
+            bpp = 3 if color == 2 else 4
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        elif kind == b"IEND":
+            break
+    stride = width * bpp
+    raw = np.frombuffer(zlib.decompress(b"".join(idat)), np.uint8)
+    if not bpp or raw.size != height * (stride + 1):
+        raise VisualDiffError("Truncated or malformed PNG")
+    raw = raw.reshape(height, stride + 1)
+    out = np.empty((height, stride), np.uint8)
+    prior = np.zeros(stride, np.uint8)
+    for y in range(height):
+        kind, row = raw[y, 0], raw[y, 1:]
+        if kind == 0:
+            out[y] = row
+        elif kind == 1:   # Sub: running sum per channel along the row (uint8 wraps like the spec)
+            out[y] = np.cumsum(row.reshape(width, bpp), axis=0, dtype=np.uint8).reshape(-1)
+        elif kind == 2:   # Up
+            out[y] = row + prior
+        elif kind in (3, 4):
+            out[y] = np.frombuffer(_unfilter_slow(int(kind), row.tobytes(), prior.tobytes(), bpp), np.uint8)
+        else:
+            raise VisualDiffError(f"Bad PNG filter type {kind} in row {y}")
+        prior = out[y]
+    return out.reshape(height, width, bpp)[:, :, :3]
+
+
+def read_png(path: str) -> "np.ndarray":
+    """Screenshot as an HxWx3 uint8 array (Pillow if installed, else the built-in decoder)."""
+    if Image is not None:
+        with Image.open(path) as im:
+            return np.asarray(im.convert("RGB"))
+    with open(path, "rb") as f:
+        return _decode_png(f.read())
+
+
+def write_png(path: str, rgb: "np.ndarray", level: int = 1) -> None:
+    """HxWx3 uint8 -> PNG (no row filters, so the built-in decoder reads it back at full speed)."""
+    height, width = rgb.shape[:2]
+    raw = np.zeros((height, width * 3 + 1), np.uint8)
+    raw[:, 1:] = rgb.reshape(height, -1)
+
+    def _chunk(kind: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+    with open(path, "wb") as f:
+        f.write(_PNG_SIGNATURE)
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(raw.tobytes(), level)))
+        f.write(_chunk(b"IEND", b""))
+
+
+# ---------- Comparison ----------
+
+def _resize(img: "np.ndarray", height: int, width: int) -> "np.ndarray":
+    """Box average for integer downscales (4K -> 1080p), nearest neighbour otherwise."""
+    h, w = img.shape[:2]
+    if h % height == 0 and w % width == 0 and h // height == w // width:
+        f = h // height
+        return img.reshape(height, f, width, f, -1).mean(axis=(1, 3)).round().astype(np.uint8)
+    rows = np.arange(height) * h // height
+    cols = np.arange(width) * w // width
+    return img[rows[:, None], cols[None, :]]
+
+
+def _luma(img: "np.ndarray") -> "np.ndarray":
+    # float32 is plenty for 8-bit input and halves the memory traffic of the block statistics.
+    return img[..., 0] * np.float32(_LUMA[0]) + img[..., 1] * np.float32(_LUMA[1]) + img[..., 2] * np.float32(_LUMA[2])
+
+
+def _block_ssim(x: "np.ndarray", y: "np.ndarray", keep: "np.ndarray", block: int) -> float:
+    """
+    SSIM over non-overlapping block x block windows of the luma, averaged over windows that
+    are mostly unmasked. 1.0 = identical structure; layout shifts and missing elements drop
+    it much more than small colour or anti-aliasing differences do.
+    """
+    h, w = (x.shape[0] // block) * block, (x.shape[1] // block) * block
+    if not h or not w:
+        return 1.0 if np.array_equal(x, y) else 0.0
+    shape = (h // block, block, w // block, block)
+    x, y = x[:h, :w].reshape(shape), y[:h, :w].reshape(shape)
+    mx, my = x.mean(axis=(1, 3)), y.mean(axis=(1, 3))
+    vx = (x * x).mean(axis=(1, 3)) - mx * mx
+    vy = (y * y).mean(axis=(1, 3)) - my * my
+    cov = (x * y).mean(axis=(1, 3)) - mx * my
+    ssim = ((2 * mx * my + _SSIM_C1) * (2 * cov + _SSIM_C2)) / ((mx * mx + my * my + _SSIM_C1) * (vx + vy + _SSIM_C2))
+    counted = keep[:h, :w].reshape(shape).mean(axis=(1, 3)) > 0.5
+    return float(ssim[counted].mean(dtype=np.float64)) if counted.any() else 1.0
+
+
+def compare_images(baseline: "np.ndarray", candidate: "np.ndarray", masks: Sequence[Mask] = (), *,
+                   threshold: int = VISUAL_PIXEL_THRESHOLD,
+                   block: int = VISUAL_SSIM_BLOCK) -> Tuple[float, float, "np.ndarray", "np.ndarray"]:
+    """
+    Compare two HxWx3 uint8 screenshots; the candidate is scaled to the baseline's size first.
+    Returns (% of unmasked pixels changed, SSIM-like score, changed-pixel map, kept-pixel map).
+    """
+    if np is None:
+        raise VisualDiffError("NumPy is not installed; visual diffing needs `pip install numpy`")
+    height, width = baseline.shape[:2]
+    if candidate.shape[:2] != (height, width):
+        candidate = _resize(candidate, height, width)
+    keep = np.ones((height, width), bool)
+    for x, y, w, h in masks:
+        keep[int(round(y * height)):int(round((y + h) * height)), int(round(x * width)):int(round((x + w) * width))] = False
+    # |a - b| without widening to int16, then the largest channel difference per pixel.
+    delta = np.maximum(baseline, candidate)
+    delta -= np.minimum(baseline, candidate)
+    changed = np.maximum(np.maximum(delta[..., 0], delta[..., 1]), delta[..., 2]) > threshold
+    changed &= keep
+    kept = int(np.count_nonzero(keep))
+    changed_pct = 100.0 * int(np.count_nonzero(changed)) / kept if kept else 0.0
+    score = _block_ssim(_luma(baseline), _luma(candidate), keep, block)
+    return changed_pct, score, changed, keep
+
+
+def diff_image(baseline: "np.ndarray", changed: "np.ndarray", keep: "np.ndarray") -> "np.ndarray":
+    """The baseline dimmed, changed pixels red and masked regions blue."""
+    diff = np.repeat((_luma(baseline) * 0.35).astype(np.uint8)[..., None], 3, axis=2)
+    diff[~keep] = diff[~keep] // 2 + np.array([0, 0, 90], np.uint8)
+    diff[changed] = (255, 40, 40)
+    return diff
+
+
+_baselines: "OrderedDict[Tuple[str, int], np.ndarray]" = OrderedDict()
+
+
+def _read_baseline(path: str) -> "np.ndarray":
+    """
+    Per-process cache: every device's capture of a screen is compared with the same baseline,
+    and devices move through the sweep at about the same pace.
+    """
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if key in _baselines:
+        _baselines.move_to_end(key)
+        return _baselines[key]
+    img = _baselines[key] = read_png(path)
+    while len(_baselines) > VISUAL_BASELINE_CACHE:
+        _baselines.popitem(last=False)
+    return img
+
+
+def compare_files(baseline: str, candidate: str, diff_path: str, masks: Sequence[Mask], threshold: int,
+                  block: int, min_score: float, max_changed_pct: float) -> Tuple[bool, float, float, float]:
+    """
+    Process-pool entry point: decode both files, compare, and write the diff image if the
+    screen changed. Returns (changed, changed %, score, seconds).
+    """
+    start = time.perf_counter()
+    base = _read_baseline(baseline)
+    changed_pct, score, changed, keep = compare_images(base, read_png(candidate), masks,
+                                                       threshold=threshold, block=block)
+    is_changed = score < min_score or changed_pct > max_changed_pct
+    if is_changed:
+        os.makedirs(os.path.dirname(diff_path), exist_ok=True)
+        write_png(diff_path, diff_image(base, changed, keep))
+    return is_changed, changed_pct, score, time.perf_counter() - start
+
+
+# ---------- Report ----------
+
+@dataclass
+class ScreenDiff:
+    device: str
+    screen: str
+    status: str                       # match / changed / new (no baseline) / reference / failed / cancelled
+    changed_pct: Optional[float] = None
+    score: Optional[float] = None
+    capture_s: float = 0.0
+    compare_s: float = 0.0
+    candidate: str = ""
+    baseline: str = ""
+    diff: str = ""
+    message: str = ""
+
+
+@dataclass
+class VisualReport:
+    sweep: str
+    run_dir: str
+    reference: str                    # baseline folder, or "device <serial>"
+    results: List[ScreenDiff] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def changed(self) -> List[ScreenDiff]:
+        return [r for r in self.results if r.status == "changed"]
+
+    @property
+    def ok(self) -> bool:
+        return all(r.status in ("match", "reference") for r in self.results)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for r in self.results:
+            counts[r.status] = counts.get(r.status, 0) + 1
+        return counts
+
+    def summary(self) -> str:
+        devices = {r.device for r in self.results}
+        lines = [f"Visual sweep {self.sweep}: {len(self.results)} screenshot(s) on {len(devices)} device(s) "
+                 f"in {self.duration:.1f}s vs {self.reference} — "
+                 + ", ".join(f"{n} {status}" for status, n in sorted(self.counts().items()))]
+        for r in sorted(self.changed, key=lambda r: r.score if r.score is not None else 0.0):
+            lines.append(f"  {r.device}/{r.screen}: score {r.score:.3f}, {r.changed_pct:.2f}% pixels changed")
+        for r in self.results:
+            if r.status in ("failed", "new") and r.message:
+                lines.append(f"  {r.device}/{r.screen}: {r.status} - {r.message}")
+        return "\n".join(lines)
+
+    def write_csv(self, path: str) -> None:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=[fld.name for fld in fields(ScreenDiff)])
+            writer.writeheader()
+            for r in self.results:
+                writer.writerow(asdict(r))
+
+    def write_html(self, path: str) -> None:
+        """Baseline / capture / diff side by side, changed screens first."""
+        base = os.path.dirname(os.path.abspath(path))
+        order = {"changed": 0, "failed": 1, "new": 2, "match": 3, "reference": 4, "cancelled": 5}
+
+        def _img(p: str) -> str:
+            if not p or not os.path.exists(p):
+                return "<td></td>"
+            rel = html.escape(os.path.relpath(os.path.abspath(p), base).replace(os.sep, "/"))
+            return f'<td><a href="{rel}"><img src="{rel}" width="320"></a></td>'
+
+        rows = []
+        for r in sorted(self.results, key=lambda r: (order.get(r.status, 9), r.screen, r.device)):
+            score = "" if r.score is None else f"{r.score:.3f}<br>{r.changed_pct:.2f}% changed"
+            rows.append(
+                f'<tr class="{r.status}"><td><b>{html.escape(r.screen)}</b><br>{html.escape(r.device)}<br>'
+                f"{r.status}<br>{score}<br>{html.escape(r.message)}</td>"
+                f"{_img(r.baseline)}{_img(r.candidate)}{_img(r.diff)}</tr>"
+            )
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                "<!doctype html><meta charset='utf-8'>"
+                f"<title>{html.escape(self.sweep)}</title>"
+                "<style>body{font-family:sans-serif}td{vertical-align:top;padding:4px}"
+                ".changed td:first-child{color:#f44336}.failed td:first-child{color:#FF9800}</style>"
+                f"<h2>{html.escape(self.summary().splitlines()[0])}</h2>"
+                "<table><tr><th></th><th>Baseline</th><th>Capture</th><th>Diff</th></tr>"
+                + "".join(rows) + "</table>"
+            )
+
+
+# ---------- Runner ----------
+
+class VisualSweepRunner:
+    """
+    Captures a sweep on many devices and compares every screenshot with its baseline.
+
+    - Devices are captured in parallel (threads; adb does the work). On one device the
+      screens run in order, since each navigates from where the previous one left off.
+    - `adb exec-out screencap -p` streams each screenshot straight into its file.
+    - As soon as a capture's baseline is available, the capture goes to a process pool that
+      decodes and compares it with NumPy, so comparing overlaps capturing and uses every core.
+    - The baseline is a folder of <screen>.png (e.g. a device folder from an earlier run on
+      the PROD build), or a reference device captured in the same run (box model vs box model).
+    """
+
+    def __init__(self, adb, log_func=None, *, max_devices: int = VISUAL_MAX_DEVICES,
+                 workers: int = VISUAL_WORKERS, threshold: int = VISUAL_PIXEL_THRESHOLD,
+                 block: int = VISUAL_SSIM_BLOCK, min_score: float = VISUAL_MIN_SCORE,
+                 max_changed_pct: float = VISUAL_MAX_CHANGED_PCT) -> None:
+        self.adb = adb
+        self.log = log_func or (lambda *_: None)
+        self.rcu = RcuManager(adb, lambda *_: None)
+        self.max_devices = max_devices
+        self.workers = workers or min(os.cpu_count() or 1, 61)  # 61: ProcessPoolExecutor limit on Windows
+        self.threshold = threshold
+        self.block = block
+        self.min_score = min_score
+        self.max_changed_pct = max_changed_pct
+
+    def run(self, sweep: Sweep, devices: Sequence[Optional[str]], out_dir: str, *,
+            baseline_dir: Optional[str] = None, reference: Optional[str] = None,
+            cancel: Optional[CancelToken] = None) -> VisualReport:
+        if np is None:
+            raise VisualDiffError("NumPy is not installed; visual diffing needs `pip install numpy`")
+        if (baseline_dir is None) == (reference is None):
+            raise VisualDiffError("Compare against either a baseline folder or a reference device")
+        devices = list(devices)
+        if reference is not None:
+            devices = [reference] + [d for d in devices if d != reference]
+        devices = devices or [None]
+        run_dir = os.path.join(out_dir, f"{sweep.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        report = VisualReport(sweep.name, run_dir,
+                              f"device {reference}" if reference is not None else baseline_dir)
+        lock = threading.Lock()
+        pending: List[Tuple[Future, ScreenDiff]] = []
+        ref_done: Dict[str, Optional[str]] = {}          # screen -> reference capture (None if it failed)
+        waiting: Dict[str, List[ScreenDiff]] = {}        # captures waiting for the reference device
+        t0 = time.perf_counter()
+
+        # spawn, not fork: the GUI process has Qt and adb reader threads running.
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as procs:
+
+            def _compare(diff: ScreenDiff, baseline: str, screen: Screen) -> None:
+                diff.baseline = baseline
+                diff.diff = os.path.join(run_dir, "diff", diff.device.replace(":", "_"), f"{screen.name}.png")
+                future = procs.submit(compare_files, baseline, diff.candidate, diff.diff, sweep.masks + screen.masks,
+                                      self.threshold, self.block, self.min_score, self.max_changed_pct)
+                pending.append((future, diff))
+
+            def _captured(diff: ScreenDiff, screen: Screen, device_ip: Optional[str]) -> None:
+                with lock:
+                    report.results.append(diff)
+                    ok = diff.status == "captured"
+                    if reference is None:
+                        baseline = os.path.join(baseline_dir, f"{screen.name}.png")
+                        if ok and os.path.exists(baseline):
+                            _compare(diff, baseline, screen)
+                        elif ok:
+                            diff.status, diff.message = "new", f"no baseline {baseline}"
+                    elif device_ip == reference:
+                        ref_done[screen.name] = diff.candidate if ok else None
+                        if ok:
+                            diff.status = "reference"
+                        for other in waiting.pop(screen.name, []):
+                            if ok:
+                                _compare(other, diff.candidate, screen)
+                            else:
+                                other.status, other.message = "new", "reference capture failed"
+                    elif ok and screen.name not in ref_done:
+                        waiting.setdefault(screen.name, []).append(diff)
+                    elif ok and ref_done[screen.name] is not None:
+                        _compare(diff, ref_done[screen.name], screen)
+                    elif ok:
+                        diff.status, diff.message = "new", "reference capture failed"
+
+            def _device(device_ip: Optional[str]) -> None:
+                label = device_ip or "default"
+                folder = os.path.join(run_dir, label.replace(":", "_"))
+                os.makedirs(folder, exist_ok=True)
+                for screen in sweep.screens:
+                    diff = ScreenDiff(label, screen.name, "captured", candidate=os.path.join(folder, f"{screen.name}.png"))
+                    if cancel is not None and cancel.cancelled:
+                        diff.status = "cancelled"
+                    else:
+                        start = time.perf_counter()
+                        try:
+                            self._navigate(screen, device_ip, sweep.key_delay)
+                            self._capture(device_ip, diff.candidate, cancel)
+                        except (VisualDiffError, ValueError, OSError) as e:
+                            diff.status, diff.message = "failed", str(e)
+                            self.log(f"[{label}] {screen.name}: capture failed - {e}", "ERROR")
+                        diff.capture_s = round(time.perf_counter() - start, 3)
+                    _captured(diff, screen, device_ip)
+
+            with ThreadPoolExecutor(max_workers=min(self.max_devices, len(devices))) as pool:
+                for f in [pool.submit(_device, d) for d in devices]:
+                    f.result()
+
+            for future, diff in pending:
+                try:
+                    changed, changed_pct, score, seconds = future.result()
+                except Exception as e:
+                    logger.exception(f"Visual compare of {diff.device}/{diff.screen} failed")
+                    diff.status, diff.message, diff.diff = "failed", f"{type(e).__name__}: {e}", ""
+                    continue
+                diff.changed_pct, diff.score, diff.compare_s = round(changed_pct, 3), round(score, 4), round(seconds, 3)
+                diff.status = "changed" if changed else "match"
+                if not changed:
+                    diff.diff = ""  # only changed screens get a diff image
+
+        report.duration = round(time.perf_counter() - t0, 3)
+        report.results.sort(key=lambda r: (r.device, [s.name for s in sweep.screens].index(r.screen)))
+        os.makedirs(run_dir, exist_ok=True)
+        report.write_csv(os.path.join(run_dir, "report.csv"))
+        report.write_html(os.path.join(run_dir, "report.html"))
+        logger.info(f"Visual sweep {sweep.name} finished: {report.counts()} in {report.duration:.1f}s",
+                    extra={"operation": "visual_sweep", "duration_ms": round(report.duration * 1000, 2)})
+        return report
+
+    def _navigate(self, screen: Screen, device_ip: Optional[str], key_delay: float) -> None:
+        if screen.launch:
+            self.adb.run(["adb", "shell", "am", "start", "-n", screen.launch], device_ip)
+        if screen.keys:
+            self.rcu.press_sequence(parse_key_sequence(screen.keys), device_ip=device_ip, delay=key_delay)
+        if screen.settle > 0:
+            time.sleep(screen.settle)
+
+    def _capture(self, device_ip: Optional[str], path: str, cancel: Optional[CancelToken]) -> None:
+        """PNG straight from adb's stdout into the file; nothing passes through Python memory."""
+        with open(path, "wb") as f:
+            result = self.adb.execute(["adb", "exec-out", "screencap", "-p"], device_ip,
+                                      timeout=VISUAL_CAPTURE_TIMEOUT, cancel=cancel, stdout_file=f)
+        if not result.ok:
+            raise VisualDiffError(f"screencap {result.outcome}: {result.stderr.strip() or result.output}")
+        with open(path, "rb") as f:
+            if f.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE:
+                raise VisualDiffError("screencap did not return a PNG (screen off or secure window?)")
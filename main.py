@@ -1,10 +1,33 @@
+import argparse
 import sys
-from PySide6.QtWidgets import QApplication
-from ui.android_manager_app import AndroidManagerApp
+
+from core.constants import AGENT_HOST, AGENT_PORT
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Android QA Tool")
+    parser.add_argument("--agent", action="store_true",
+                        help="run headless as the shared agent that owns adb (no GUI)")
+    parser.add_argument("--host", default=AGENT_HOST, help="agent bind address")
+    parser.add_argument("--port", type=int, default=AGENT_PORT, help="agent port")
+    parser.add_argument("--connect", metavar="URL",
+                        help="GUI client mode: send device operations to the agent at URL (e.g. 127.0.0.1:8765)")
+    parser.add_argument("--token", help="shared secret required by the agent / sent by the client")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = _parse_args()
+    if args.agent:
+        from core.agent import AgentServer, AgentService
+        AgentServer(AgentService(), args.host, args.port, token=args.token).run()
+        sys.exit(0)
+
+    from PySide6.QtWidgets import QApplication
+    from ui.android_manager_app import AndroidManagerApp
+
     app = QApplication(sys.argv)
-    window = AndroidManagerApp()
+    window = AndroidManagerApp(agent_url=args.connect, agent_token=args.token)
     window.resize(1200, 800)
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Scan a /22 of loopback addresses against fake adbd listeners (Linux: all of 127/8 is local).
+
+A few listeners answer the CNXN handshake like adbd, one is a plain TCP service that must
+be filtered out by verification.
+
+Usage: python scripts/bench_discovery.py [cidr] [port]
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.discovery import SubnetScanner, expand_targets  # noqa: E402
+
+_A_AUTH = 0x48545541
+_FAKE_DEVICES = ["127.0.1.10", "127.0.2.20", "127.0.3.30"]
+_NOT_ADB = "127.0.2.99"
+
+
+async def _fake_adbd(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        await reader.readexactly(24)
+        writer.write(struct.pack("<6I", _A_AUTH, 1, 0, 0, 0, _A_AUTH ^ 0xFFFFFFFF))
+        await writer.drain()
+    except (asyncio.IncompleteReadError, OSError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _not_adb(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n" + b"\x00" * 16)
+    await writer.drain()
+    writer.close()
+
+
+async def main() -> None:
+    cidr = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.0/22"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 15555
+
+    servers = [await asyncio.start_server(_fake_adbd, host, port) for host in _FAKE_DEVICES]
+    servers.append(await asyncio.start_server(_not_adb, _NOT_ADB, port))
+
+    scanner = SubnetScanner(port, timeout=0.3)
+    hosts = expand_targets([cidr])
+    start = time.perf_counter()
+    found = await scanner.scan_async(hosts)
+    elapsed = time.perf_counter() - start
+
+    for s in servers:
+        s.close()
+        await s.wait_closed()
+
+    print(f"hosts scanned: {len(hosts)} (concurrency {scanner.concurrency})")
+    print(f"elapsed:       {elapsed:.2f}s")
+    print(f"found:         {', '.join(d.address for d in found) or 'none'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare the key injection paths on connected devices:
+
+- input:   `adb shell input keyevent` (a new adb shell + `input` process per key)
+- monkey:  one `monkey --port` server per device, one line per key over a kept-open socket
+
+Per key, the host round trip of AdbManager.keyevent is timed (the first monkey key, which
+starts the server, is reported on its own). With `--package`, the key-to-screen probe
+(core.input_latency) also runs once per backend: what the app shows should not change,
+only the injection overhead.
+
+Keys are cycled from `--keys` (default "DOWN, UP" so focus ends where it started).
+
+Usage: python scripts/bench_keys.py [iterations] [--device SERIAL]... [--keys "DOWN, UP"] [--package PKG]
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.adb_manager import AdbManager  # noqa: E402
+from core.input_latency import InputLatencyProbe  # noqa: E402
+from core.monkey_input import BACKENDS  # noqa: E402
+from core.rcu_manager import RcuManager, parse_key_sequence  # noqa: E402
+from core.stats import percentiles  # noqa: E402
+
+
+def _bench(adb: AdbManager, backend: str, device, keys, iterations: int) -> None:
+    rcu = RcuManager(adb, lambda *_: None, backend=backend)
+    cycle = itertools.cycle(keys)
+    start = time.perf_counter()
+    rcu.press(next(cycle), device_ip=device)  # warm-up; starts monkey on the device
+    first = (time.perf_counter() - start) * 1000
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rcu.press(next(cycle), device_ip=device)
+        times.append((time.perf_counter() - start) * 1000)
+    s = percentiles(times, (50, 90, 99))
+    print(f"{device or 'default':<22} {backend:<7} mean {s['mean']:7.1f} ms  p50 {s['median']:7.1f}  "
+          f"p90 {s['p90']:7.1f}  p99 {s['p99']:7.1f}  (first key {first:.0f} ms, {iterations} keys)")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    devices, keys, package = [], "DOWN, UP", None
+    for flag in ("--device", "--keys", "--package"):
+        while flag in args:
+            i = args.index(flag)
+            value = args[i + 1]
+            del args[i:i + 2]
+            if flag == "--device":
+                devices.append(value)
+            elif flag == "--keys":
+                keys = value
+            else:
+                package = value
+    iterations = int(args[0]) if args else 100
+    key_list = parse_key_sequence(keys)
+
+    adb = AdbManager(lambda *_: None)
+    devices = devices or [None]
+    try:
+        for device in devices:
+            for backend in BACKENDS:
+                _bench(adb, backend, device, key_list, iterations)
+        if package:
+            for backend in BACKENDS:
+                result = InputLatencyProbe(adb, package, backend=backend).run(
+                    devices, key_list, iterations=max(1, iterations // 10))
+                print(f"--- {backend} ---\n{result.summary()}")
+    finally:
+        adb.monkey.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of a logger call on the *caller* thread:
+  - sync:  FileHandler + StreamHandler writing directly (the old setup)
+  - queue: QueueHandler -> QueueListener (current core.logger pipeline)
+
+Usage: python scripts/bench_logging.py [iterations]
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.logger import formatter, listener, logger  # noqa: E402
+
+
+def _per_call_us(log: logging.Logger, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        log.info("bench message %d", i, extra={"device": "192.168.1.25", "operation": "bench"})
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_log = logging.getLogger("AndroidManager.bench.sync")
+        sync_log.propagate = False
+        handler = logging.FileHandler(os.path.join(tmp, "sync.log"), encoding="utf-8")
+        handler.setFormatter(formatter)
+        sync_log.addHandler(handler)
+        with open(os.devnull, "w", encoding="utf-8") as devnull:
+            console = logging.StreamHandler(devnull)
+            console.setFormatter(formatter)
+            sync_log.addHandler(console)
+            sync_us = _per_call_us(sync_log, iterations)
+        handler.close()
+
+    # Console output from the real pipeline would dominate the run; silence it for the bench.
+    logger.setLevel(logging.DEBUG)
+    for h in listener.handlers:
+        if isinstance(h, logging.StreamHandler) and not isinstance(h, logging.FileHandler):
+            h.setLevel(logging.CRITICAL + 1)
+    queue_us = _per_call_us(logger, iterations)
+
+    drain_start = time.perf_counter()
+    listener.stop()  # flushes the queue
+    drain_ms = (time.perf_counter() - drain_start) * 1000
+
+    print(f"iterations:        {iterations}")
+    print(f"sync handlers:     {sync_us:8.2f} us/call on caller thread")
+    print(f"queue pipeline:    {queue_us:8.2f} us/call on caller thread")
+    print(f"listener drain:    {drain_ms:8.1f} ms (background)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Compare the automation paths against a local stub of the UiAutomator2 server.
+
+- direct:      Uia2Client -> stub (one keep-alive connection)
+- direct-new:  Uia2Client -> stub, new TCP connection per call
+- relay:       Uia2Client -> relay -> stub; the relay stands in for the Appium server hop
+               (parses each command and proxies it, like Appium's UiAutomator2 driver)
+
+Each iteration runs the calls the login flow makes: find by text, read "focused",
+press a key, find by id and click. `--device-ms` adds a fixed delay per stub call to
+model on-device work; the differences between paths are the transport overhead.
+
+Usage: python scripts/bench_uia2.py [iterations] [--device-ms N]
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.stats import percentiles  # noqa: E402
+from core.uia2_client import Uia2Client  # noqa: E402
+
+_ELEMENT = "element-6066-11e4-a52e-4f735466cecf"
+_DEVICE_DELAY = 0.0
+
+
+class _StubUia2(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are separate writes; avoid the delayed-ACK stall
+
+    def _reply(self, value, session="stub-session") -> None:
+        body = json.dumps({"sessionId": session, "value": value}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if _DEVICE_DELAY:
+            time.sleep(_DEVICE_DELAY)
+        path = self.path
+        if path.endswith("/elements"):
+            self._reply([{_ELEMENT: "1"}, {_ELEMENT: "2"}])
+        elif path.endswith("/element"):
+            self._reply({_ELEMENT: "1", "ELEMENT": "1"})
+        elif "/attribute/" in path:
+            self._reply("true")
+        elif path.endswith("/source"):
+            self._reply("<hierarchy>" + "<node text='x'/>" * 200 + "</hierarchy>")
+        else:
+            self._reply(None)
+
+    do_GET = do_POST = do_DELETE = _handle
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _relay_handler(upstream_port: int):
+    local = threading.local()
+
+    class _Relay(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _handle(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else None
+            if body:
+                body = json.dumps(json.loads(body)).encode()  # the hop parses and re-serializes commands
+            conn = getattr(local, "conn", None)
+            if conn is None:
+                conn = local.conn = http.client.HTTPConnection("127.0.0.1", upstream_port)
+            conn.request(self.command, self.path, body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            data = json.dumps(json.loads(resp.read())).encode()
+            self.send_response(resp.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_DELETE = _handle
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return _Relay
+
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _flow(client: Uia2Client) -> None:
+    client.find_elements("-android uiautomator", 'new UiSelector().text("Login")')
+    el = client.find_element("-android uiautomator", "new UiSelector().focused(true)")
+    client.attribute(el, "focused")
+    client.press_keycode(21)
+    el = client.find_element("id", "tv.freetv.androidtv:id/keypadButtonOne")
+    client.click(el)
+
+
+def _bench(name: str, client: Uia2Client, iterations: int) -> None:
+    client.create_session()
+    _flow(client)  # warm-up
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _flow(client)
+        times.append((time.perf_counter() - start) * 1000)
+    client.close()
+    s = percentiles(times, (50, 90, 99))
+    print(f"{name:<11} mean {s['mean']:7.2f} ms  p50 {s['median']:7.2f}  p90 {s['p90']:7.2f}  "
+          f"p99 {s['p99']:7.2f}  ({iterations} flows x 6 calls)")
+
+
+def main() -> None:
+    global _DEVICE_DELAY
+    args = sys.argv[1:]
+    if "--device-ms" in args:
+        i = args.index("--device-ms")
+        _DEVICE_DELAY = float(args[i + 1]) / 1000
+        del args[i:i + 2]
+    iterations = int(args[0]) if args else 300
+
+    stub = _serve(_StubUia2)
+    relay = _serve(_relay_handler(stub.server_port))
+    _bench("direct", Uia2Client(port=stub.server_port), iterations)
+    _bench("direct-new", Uia2Client(port=stub.server_port, keep_alive=False), iterations)
+    _bench("relay", Uia2Client(port=relay.server_port), iterations)
+    relay.shutdown()
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
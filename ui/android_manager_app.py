@@ -1,22 +1,41 @@
 from __future__ import annotations
 
 from datetime import datetime
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QFileDialog, QMessageBox
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QFileDialog, QMessageBox, QInputDialog
 
+from core.discovery import local_subnet_guess
 from core.logger import logger
 from core.constants import (
+    APP_START_ITERATIONS,
     APPIUM_HOST,
     APPIUM_PORT,
     FREETV_PROD_PACKAGE,
     FREETV_UAT_PACKAGE,
+    INPUT_LATENCY_ITERATIONS,
+    INPUT_LATENCY_KEYS,
+    SCENARIO_DIR,
+    VISUAL_DIR,
+    VISUAL_RUNS_DIR,
 )
+from core.jobs import PRIORITY_BULK, PRIORITY_NORMAL
+from core.log_search import LogSearch
+from core.rcu_manager import parse_key_sequence
+from core.scenario import ScenarioError, load_scenario
+from core.visual_diff import load_sweep
 
 from controllers.android_manager_controller import AndroidManagerController
 from ui.sections.top_bar import TopBar
+from ui.sections.device_table import DeviceTable
 from ui.sections.actions_grid import ActionsGrid
 from ui.sections.log_panel import LogPanel
 from ui.dialogs.confirm_dialog import ConfirmDialog
+from ui.background import run_in_background
 from widgets.rcu_dialog import RCUDialog  # Option A: widgets outside /ui
+from widgets.jank_dialog import JankDialog
+from widgets.resource_dialog import ResourceDialog
+from widgets.job_queue_dialog import JobQueueDialog
+from widgets.log_browser_dialog import LogBrowserDialog
 
 
 class AndroidManagerApp(QWidget):
@@ -25,41 +44,52 @@ class AndroidManagerApp(QWidget):
     All heavy logic (ADB/Appium/account flow) is delegated to AndroidManagerController.
     """
 
-    def __init__(self) -> None:
+    # Log lines may come from worker threads; the panel is only touched on the GUI thread.
+    sigLogLine = Signal(str)
+
+    def __init__(self, *, agent_url: str | None = None, agent_token: str | None = None) -> None:
         super().__init__()
 
         # --- Window ---
-        self.setWindowTitle("Android QA Tool")
+        self.setWindowTitle(f"Android QA Tool — agent {agent_url}" if agent_url else "Android QA Tool")
         self.resize(1200, 800)
 
         # --- State ---
-        self._apk_path: str = ""
+        self._apk_paths: list[str] = []  # one APK, or base + split APKs
+        self._log_search = LogSearch()   # index outlives the browser dialog
 
         # --- UI sections ---
         self._root = QVBoxLayout(self)
         self.top_bar = TopBar(parent=self)
+        self.device_table = DeviceTable(parent=self)
         self.actions = ActionsGrid(parent=self)
         self.log_panel = LogPanel(parent=self)
 
         self._root.addWidget(self.top_bar)
+        self._root.addWidget(self.device_table)
         self._root.addWidget(self.actions)
         self._root.addWidget(self.log_panel)
+        self.sigLogLine.connect(self.log_panel.append_line)
 
         # --- Controller ---
         self.controller = AndroidManagerController(
             log_cb=self.log_output,
             app_host=APPIUM_HOST,
             app_port=APPIUM_PORT,
+            agent_url=agent_url,
+            agent_token=agent_token,
             parent=self,
         )
 
         self._wire_signals()
+        self.controller.start_fleet_monitor(self.device_table.post)
 
     # ========================= Wire-up ========================= #
     def _wire_signals(self) -> None:
         # Top bar
         self.top_bar.sigConnectDevice.connect(self._connect_device)
         self.top_bar.sigDisconnectDevice.connect(self._disconnect_device)
+        self.top_bar.sigScanNetwork.connect(self._scan_network)
         self.top_bar.sigConnectAccount.connect(self._connect_account)
 
         # Actions grid — General
@@ -68,16 +98,38 @@ class AndroidManagerApp(QWidget):
         self.actions.sigInstallApk.connect(self._install_apk)
         self.actions.sigRebootDevice.connect(self._reboot_device)
         self.actions.sigGetDeviceIp.connect(self._get_device_ip)
+        self.actions.sigDeviceInfo.connect(
+            lambda: self._on_targets("device_info", lambda ip: self.controller.show_device_info(device_ip=ip))
+        )
         self.actions.sigGoHome.connect(
-            lambda: self.controller.go_home(device_ip=self.top_bar.current_ip())
+            lambda: self._on_targets("go_home", lambda ip: self.controller.go_home(device_ip=ip))
         )
         self.actions.sigOpenRcu.connect(self._open_rcu)
+        self.actions.sigFleetInventory.connect(
+            lambda: run_in_background(
+                self.controller.fleet_inventory,
+                on_error=lambda msg: self._error("Inventory Failed", msg),
+            )
+        )
+
+        # Actions grid — Tools
+        self.actions.sigPushFiles.connect(self._push_files)
+        self.actions.sigPullFiles.connect(self._pull_files)
+        self.actions.sigCollectDiagnostics.connect(self._collect_diagnostics)
+        self.actions.sigBenchmarkAppStart.connect(self._benchmark_app_start)
+        self.actions.sigOpenJank.connect(self._open_jank)
+        self.actions.sigOpenResources.connect(self._open_resources)
+        self.actions.sigRunScenario.connect(self._run_scenario)
+        self.actions.sigOpenJobs.connect(self._open_jobs)
+        self.actions.sigOpenLogs.connect(self._open_logs)
+        self.actions.sigVisualSweep.connect(self._visual_sweep)
+        self.actions.sigKeyLatency.connect(self._measure_key_latency)
 
         # Actions grid — PROD
         self.actions.sigUninstallProd.connect(
             lambda: self._confirm_and(
-                action=lambda: self.controller.uninstall_package(
-                    FREETV_PROD_PACKAGE, device_ip=self.top_bar.current_ip()
+                action=lambda: self._on_targets(
+                    "uninstall", lambda ip: self.controller.uninstall_package(FREETV_PROD_PACKAGE, device_ip=ip)
                 ),
                 title="Confirm Uninstall",
                 message=(
@@ -86,16 +138,12 @@ class AndroidManagerApp(QWidget):
                 ),
             )
         )
-        self.actions.sigLaunchProd.connect(
-            lambda: self._launch_activity(
-                "tv.freetv.androidtv/pl.atende.mobile.tv.ui.gui.main.activity.MainActivity"
-            )
-        )
+        self.actions.sigLaunchProd.connect(lambda: self._launch_package(FREETV_PROD_PACKAGE))
         self.actions.sigConnectAccountProd.connect(self._connect_account)
         self.actions.sigClearDataProd.connect(
             lambda: self._confirm_and(
-                action=lambda: self.controller.clear_data(
-                    FREETV_PROD_PACKAGE, device_ip=self.top_bar.current_ip()
+                action=lambda: self._on_targets(
+                    "clear_data", lambda ip: self.controller.clear_data(FREETV_PROD_PACKAGE, device_ip=ip)
                 ),
                 title="Confirm Clear Data",
                 message=(
@@ -107,8 +155,8 @@ class AndroidManagerApp(QWidget):
         )
         self.actions.sigKillProd.connect(
             lambda: self._confirm_and(
-                action=lambda: self.controller.kill_app(
-                    FREETV_PROD_PACKAGE, device_ip=self.top_bar.current_ip()
+                action=lambda: self._on_targets(
+                    "kill_app", lambda ip: self.controller.kill_app(FREETV_PROD_PACKAGE, device_ip=ip)
                 ),
                 title="Confirm Kill App",
                 message="This will immediately stop the app from running.\n\nDo you want to continue?",
@@ -118,8 +166,8 @@ class AndroidManagerApp(QWidget):
         # Actions grid — UAT
         self.actions.sigUninstallUat.connect(
             lambda: self._confirm_and(
-                action=lambda: self.controller.uninstall_package(
-                    FREETV_UAT_PACKAGE, device_ip=self.top_bar.current_ip()
+                action=lambda: self._on_targets(
+                    "uninstall", lambda ip: self.controller.uninstall_package(FREETV_UAT_PACKAGE, device_ip=ip)
                 ),
                 title="Confirm Uninstall",
                 message=(
@@ -128,15 +176,11 @@ class AndroidManagerApp(QWidget):
                 ),
             )
         )
-        self.actions.sigLaunchUat.connect(
-            lambda: self._launch_activity(
-                "tv.freetv.androidtv.uat/pl.atende.mobile.tv.ui.gui.main.activity.MainActivity"
-            )
-        )
+        self.actions.sigLaunchUat.connect(lambda: self._launch_package(FREETV_UAT_PACKAGE))
         self.actions.sigClearDataUat.connect(
             lambda: self._confirm_and(
-                action=lambda: self.controller.clear_data(
-                    FREETV_UAT_PACKAGE, device_ip=self.top_bar.current_ip()
+                action=lambda: self._on_targets(
+                    "clear_data", lambda ip: self.controller.clear_data(FREETV_UAT_PACKAGE, device_ip=ip)
                 ),
                 title="Confirm Clear Data",
                 message=(
@@ -150,11 +194,18 @@ class AndroidManagerApp(QWidget):
         # Actions grid — Appium
         self.actions.sigStartAppium.connect(self._start_appium)
         self.actions.sigKillAppium.connect(self._kill_appium)
+        self.actions.sigDirectUia2Toggled.connect(self.controller.set_direct_uia2)
+
+    def closeEvent(self, event) -> None:
+        self.device_table.stop()
+        self.controller.shutdown()  # Appium servers we started die with the tool
+        super().closeEvent(event)
 
     # ========================= UI Helpers ========================= #
     def log_output(self, text: str, level: str = "INFO") -> None:
         """
         Central logging: prints to python logger and to the UI log panel with timestamp.
+        Safe to call from any thread.
         """
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         line = f"[{ts}] [{level}] {text}"
@@ -165,12 +216,15 @@ class AndroidManagerApp(QWidget):
         else:
             logger.info(text)
 
-        self.log_panel.append_line(line)
+        self.sigLogLine.emit(line)
 
     def _error(self, title: str, text: str) -> None:
         QMessageBox.critical(self, title, text)
 
     def _confirm_and(self, *, action, title: str, message: str) -> None:
+        targets = self._target_devices()
+        if len(targets) > 1:
+            message += f"\n\nThis will run on {len(targets)} selected devices."
         if ConfirmDialog.ask(self, title=title, message=message):
             try:
                 action()
@@ -188,14 +242,39 @@ class AndroidManagerApp(QWidget):
     def _disconnect_device(self) -> None:
         self.controller.disconnect_device()
 
+    def _scan_network(self) -> None:
+        text, ok = QInputDialog.getText(
+            self,
+            "Scan Network",
+            "CIDR range(s) to scan, comma separated:",
+            text=local_subnet_guess(),
+        )
+        cidrs = [c.strip() for c in text.split(",") if c.strip()] if ok else []
+        if not cidrs:
+            return
+        run_in_background(
+            self.controller.discover_devices,
+            cidrs,
+            on_done=self._on_devices_discovered,
+            on_error=lambda msg: self._error("Scan Failed", msg),
+        )
+
+    def _on_devices_discovered(self, addresses: list[str]) -> None:
+        if len(addresses) == 1 and not self.top_bar.current_ip():
+            self.top_bar.set_ip(addresses[0].rsplit(":", 1)[0])
+
     def _connect_account(self) -> None:
         phone = self.top_bar.current_phone()
         if not phone:
             self._error("Error", "Please enter phone number (e.g., 05XXXXXXXX).")
             return
+        targets = self._target_devices()
+        if len(targets) > 1:
+            self.log_output(f"Connect to Account runs on one device ({targets[0]}); use Run Scenario "
+                            f"with scenarios/connect_account.json for all {len(targets)} selected.", "WARN")
         self.controller.connect_account(
             phone=phone,
-            device_ip=self.top_bar.current_ip(),
+            device_ip=self._primary_device(),
         )
 
     # ========================= Actions Grid Handlers ========================= #
@@ -203,23 +282,35 @@ class AndroidManagerApp(QWidget):
         self.controller.list_devices()
 
     def _select_apk(self) -> None:
-        path, _ = QFileDialog.getOpenFileName(self, "Select APK", "", "APK Files (*.apk)")
-        if not path:
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select APK (or base + split APKs)", "", "APK Files (*.apk)"
+        )
+        if not paths:
             return
-        if not path.endswith(".apk"):
+        if not all(p.endswith(".apk") for p in paths):
             self._error("Error", "Not an APK file.")
             return
-        self._apk_path = path
-        self.log_output(f"APK selected: {path}")
+        self._apk_paths = paths
+        self.log_output(f"APK selected: {', '.join(paths)}")
+        info = self.controller.select_apk(paths)
+        if info is not None:
+            label = f"{info.package} {info.version_name} ({info.version_code})"
+            if len(paths) > 1:
+                label += f" + {len(paths) - 1} split(s)"
+        else:
+            label = ", ".join(p.rsplit("/", 1)[-1] for p in paths)
+        self.actions.set_selected_apk(label)
 
     def _install_apk(self) -> None:
-        if not self._apk_path:
+        if not self._apk_paths:
             self._error("Error", "No APK selected.")
             return
-        self.controller.install_apk(self._apk_path, device_ip=self.top_bar.current_ip())
+        paths = list(self._apk_paths)
+        self._on_targets("install_apk", lambda ip: self.controller.install_apk(paths, device_ip=ip),
+                         priority=PRIORITY_BULK)
 
     def _reboot_device(self) -> None:
-        self.controller.reboot_device(device_ip=self.top_bar.current_ip())
+        self._on_targets("reboot", lambda ip: self.controller.reboot_device(device_ip=ip))
 
     def _get_device_ip(self) -> None:
         ip = self.controller.get_device_ip()
@@ -228,21 +319,241 @@ class AndroidManagerApp(QWidget):
         self.log_output(f"Detected IP: {ip}")
 
     def _open_rcu(self) -> None:
-        dialog = RCUDialog(self.log_output, self.controller.adb_manager, self)
+        dialog = RCUDialog(
+            self.log_output, self.controller.adb_manager, self,
+            send_key=lambda name, code: self.controller.send_key(name, code, device_ips=self._target_devices()),
+        )
+        dialog.setModal(False)
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
+    def _open_jobs(self) -> None:
+        dialog = JobQueueDialog(self.controller.jobs, self)
         dialog.setModal(False)
         dialog.show()
         dialog.raise_()
         dialog.activateWindow()
 
-    def _launch_activity(self, package_activity: str) -> None:
-        self.controller.launch_activity(
-            package_activity=package_activity,
-            device_ip=self.top_bar.current_ip(),
+    def _open_logs(self) -> None:
+        dialog = LogBrowserDialog(self._log_search, self)
+        dialog.setModal(False)
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
+    def _open_jank(self) -> None:
+        dialog = JankDialog(self.log_output, self.controller.adb_manager, self._primary_device, self)
+        dialog.setModal(False)
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
+    def _open_resources(self) -> None:
+        dialog = ResourceDialog(self.log_output, self.controller.adb_manager, self._primary_device, self)
+        dialog.setModal(False)
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
+    def _launch_package(self, package: str) -> None:
+        self._on_targets(f"launch {package}", lambda ip: self.controller.launch_package(package, device_ip=ip))
+
+    def _target_devices(self) -> list[str]:
+        """Devices selected in the device table, else the IP field (empty = adb's default device)."""
+        selected = self.device_table.selected_serials()
+        if selected:
+            return selected
+        ip = self.top_bar.current_ip()
+        return [ip] if ip else []
+
+    def _primary_device(self) -> str:
+        targets = self._target_devices()
+        return targets[0] if targets else ""
+
+    def _on_targets(self, operation: str, action, *, priority: int = PRIORITY_NORMAL) -> None:
+        """Queue action(device_ip) as a job per target (see core.jobs); never blocks the GUI."""
+        self.controller.schedule(operation, action, self._target_devices(), priority=priority)
+
+    def _push_files(self) -> None:
+        local = QFileDialog.getExistingDirectory(self, "Folder to push")
+        if not local:
+            return
+        remote, ok = QInputDialog.getText(self, "Push Files", "Destination folder on device:",
+                                          text="/sdcard/Download")
+        if not ok or not remote.strip():
+            return
+        remote = remote.strip()
+        self._on_targets(
+            "push", lambda ip: self.controller.push_files(local, remote, device_ips=[ip] if ip else []),
+            priority=PRIORITY_BULK,
+        )
+
+    def _pull_files(self) -> None:
+        remote, ok = QInputDialog.getText(self, "Pull Files", "File or folder on device:",
+                                          text="/sdcard/Download")
+        if not ok or not remote.strip():
+            return
+        local = QFileDialog.getExistingDirectory(self, "Save pulled files to")
+        if not local:
+            return
+        remote = remote.strip()
+        self._on_targets(
+            "pull", lambda ip: self.controller.pull_files(remote, local, device_ips=[ip] if ip else []),
+            priority=PRIORITY_BULK,
+        )
+
+    def _collect_diagnostics(self) -> None:
+        out_dir = QFileDialog.getExistingDirectory(self, "Save diagnostics bundle to")
+        if not out_dir:
+            return
+        include_bugreport = QMessageBox.question(
+            self,
+            "Collect Diagnostics",
+            "Include a full bugreport? (adds a few minutes)",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        ) == QMessageBox.Yes
+        run_in_background(
+            self.controller.collect_diagnostics,
+            out_dir,
+            device_ips=self._target_devices(),
+            include_bugreport=include_bugreport,
+            on_done=lambda archive: self.log_output(f"Diagnostics saved: {archive}"),
+            on_error=lambda msg: self._error("Diagnostics Failed", msg),
+        )
+
+    def _benchmark_app_start(self) -> None:
+        packages = {"FreeTV Prod": FREETV_PROD_PACKAGE, "FreeTV UAT": FREETV_UAT_PACKAGE}
+        choice, ok = QInputDialog.getItem(self, "App Start Benchmark", "Package:", list(packages), 0, False)
+        if not ok:
+            return
+        iterations, ok = QInputDialog.getInt(
+            self, "App Start Benchmark", "Iterations (cold + warm each):", APP_START_ITERATIONS, 1, 500
+        )
+        if not ok:
+            return
+        csv_path, _ = QFileDialog.getSaveFileName(
+            self, "Save results", f"app_start_{packages[choice]}.csv", "CSV Files (*.csv)"
+        )
+        if not csv_path:
+            return
+        run_in_background(
+            self.controller.benchmark_app_start,
+            packages[choice],
+            csv_path,
+            iterations=iterations,
+            device_ips=self._target_devices(),
+            on_done=lambda path: self.log_output(f"App start results saved: {path}"),
+            on_error=lambda msg: self._error("Benchmark Failed", msg),
+        )
+
+    def _measure_key_latency(self) -> None:
+        packages = {"FreeTV Prod": FREETV_PROD_PACKAGE, "FreeTV UAT": FREETV_UAT_PACKAGE}
+        choice, ok = QInputDialog.getItem(self, "Key Latency", "Package (open on the screen to test):",
+                                          list(packages), 0, False)
+        if not ok:
+            return
+        sequence, ok = QInputDialog.getText(self, "Key Latency", "Keys (each pressed once per iteration):",
+                                            text=INPUT_LATENCY_KEYS)
+        if not ok or not sequence.strip():
+            return
+        try:
+            parse_key_sequence(sequence)
+        except ValueError as e:
+            self._error("Invalid Keys", str(e))
+            return
+        iterations, ok = QInputDialog.getInt(self, "Key Latency", "Iterations:", INPUT_LATENCY_ITERATIONS, 1, 500)
+        if not ok:
+            return
+        csv_path, _ = QFileDialog.getSaveFileName(
+            self, "Save samples (optional)", f"key_latency_{packages[choice]}.csv", "CSV Files (*.csv)"
+        )
+        run_in_background(
+            self.controller.measure_key_latency,
+            packages[choice],
+            sequence,
+            iterations=iterations,
+            device_ips=self._target_devices(),
+            csv_path=csv_path or None,
+            on_error=lambda msg: self._error("Key Latency Failed", msg),
+        )
+
+    def _run_scenario(self) -> None:
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Run Scenario", SCENARIO_DIR, "Scenarios (*.json *.yaml *.yml);;All Files (*)"
+        )
+        if not path:
+            return
+        try:
+            scenario = load_scenario(path)
+        except (OSError, ValueError) as e:  # ScenarioError and JSON/YAML syntax errors
+            self._error("Invalid Scenario", str(e))
+            return
+        variables: dict[str, str] = {}
+        for var in scenario.missing_variables({}):
+            value, ok = QInputDialog.getText(self, scenario.name, f"{var.prompt or var.name}:")
+            if not ok:
+                return
+            variables[var.name] = value.strip()
+        try:
+            scenario.resolve_variables(variables)
+        except ScenarioError as e:
+            self._error("Invalid Scenario Input", str(e))
+            return
+        report_path, _ = QFileDialog.getSaveFileName(
+            self, "Save step report (optional)", f"{scenario.name}_report.json", "JSON (*.json);;CSV (*.csv)"
+        )
+        run_in_background(
+            self.controller.run_scenario,
+            scenario,
+            variables,
+            device_ips=self._target_devices(),
+            report_path=report_path or None,
+            on_error=lambda msg: self._error("Scenario Failed", msg),
+        )
+
+    def _visual_sweep(self) -> None:
+        path, _ = QFileDialog.getOpenFileName(self, "Visual Diff — sweep", VISUAL_DIR, "Sweeps (*.json);;All Files (*)")
+        if not path:
+            return
+        try:
+            sweep = load_sweep(path)
+        except (OSError, ValueError) as e:  # VisualDiffError and JSON syntax errors
+            self._error("Invalid Sweep", str(e))
+            return
+        devices = self._target_devices()
+        modes = ["Baseline folder..."]
+        if len(devices) > 1:
+            modes.append(f"Reference device ({devices[0]}; select the others in the device table)")
+        mode, ok = QInputDialog.getItem(self, "Visual Diff", "Compare against:", modes, 0, False)
+        if not ok:
+            return
+        baseline_dir = reference = None
+        if mode == modes[0]:
+            baseline_dir = QFileDialog.getExistingDirectory(
+                self, "Baseline screenshots (<screen>.png, e.g. a device folder of an earlier run)", VISUAL_RUNS_DIR
+            )
+            if not baseline_dir:
+                return
+        else:
+            reference, devices = devices[0], devices[1:]
+        run_in_background(
+            self.controller.visual_sweep,
+            sweep,
+            device_ips=devices,
+            baseline_dir=baseline_dir,
+            reference=reference,
+            on_error=lambda msg: self._error("Visual Diff Failed", msg),
         )
 
     # ========================= Appium Controls ========================= #
     def _start_appium(self) -> None:
-        self.controller.start_appium()
+        run_in_background(
+            self.controller.start_appium,
+            device_ips=self._target_devices(),
+            on_error=lambda msg: self._error("Appium Error", msg),
+        )
 
     def _kill_appium(self) -> None:
         self.controller.kill_appium()
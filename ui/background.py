@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, Set
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal
+
+from core.logger import logger
+
+
+class _TaskSignals(QObject):
+    finished = Signal(object)
+    failed = Signal(str)
+
+
+class BackgroundTask(QRunnable):
+    """
+    Runs a plain callable on the global QThreadPool.
+    Results/errors are delivered back on the GUI thread via queued signals.
+    """
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs) -> None:
+        super().__init__()
+        self.setAutoDelete(False)  # lifetime is managed from Python (see _active)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = _TaskSignals()
+
+    def run(self) -> None:
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logger.exception("Background task failed")
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+# Keep tasks (and their signal objects) alive until their result has been delivered.
+_active: Set[BackgroundTask] = set()
+
+
+def run_in_background(
+    fn: Callable[..., Any],
+    *args,
+    on_done: Optional[Callable[[Any], None]] = None,
+    on_error: Optional[Callable[[str], None]] = None,
+    **kwargs,
+) -> BackgroundTask:
+    """Run fn(*args, **kwargs) off the GUI thread; call on_done/on_error on the GUI thread."""
+    task = BackgroundTask(fn, *args, **kwargs)
+    _active.add(task)
+
+    def _finish(result: Any) -> None:
+        _active.discard(task)
+        if on_done:
+            on_done(result)
+
+    def _fail(message: str) -> None:
+        _active.discard(task)
+        if on_error:
+            on_error(message)
+
+    task.signals.finished.connect(_finish, Qt.ConnectionType.QueuedConnection)
+    task.signals.failed.connect(_fail, Qt.ConnectionType.QueuedConnection)
+    QThreadPool.globalInstance().start(task)
+    return task
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from PySide6.QtCore import Qt, Signal, SignalInstance
 from PySide6.QtGui import QCursor
-from PySide6.QtWidgets import QWidget, QGridLayout, QLabel, QPushButton
+from PySide6.QtWidgets import QCheckBox, QWidget, QGridLayout, QLabel, QPushButton
 
 from core.constants import BUTTON_STYLE
 
@@ -14,6 +14,8 @@ class ActionsGrid(QWidget):
     sigInstallApk = Signal()
     sigRebootDevice = Signal()
     sigGetDeviceIp = Signal()
+    sigDeviceInfo = Signal()
+    sigFleetInventory = Signal()
     sigOpenRcu = Signal()
     sigGoHome = Signal()
     # PROD
@@ -29,9 +31,23 @@ class ActionsGrid(QWidget):
     # Appium
     sigStartAppium = Signal()
     sigKillAppium = Signal()
+    sigDirectUia2Toggled = Signal(bool)
+
+    sigPushFiles = Signal()
+    sigPullFiles = Signal()
+    sigCollectDiagnostics = Signal()
+    sigBenchmarkAppStart = Signal()
+    sigOpenJank = Signal()
+    sigOpenResources = Signal()
+    sigRunScenario = Signal()
+    sigOpenJobs = Signal()
+    sigOpenLogs = Signal()
+    sigVisualSweep = Signal()
+    sigKeyLatency = Signal()
 
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
+        self.apk_label = QLabel("No APK selected")
         self._build_ui()
 
     # -------------------- UI -------------------- #
@@ -47,8 +63,10 @@ class ActionsGrid(QWidget):
         grid.addWidget(self._btn("Install APK", self.sigInstallApk), 3, 0)
         grid.addWidget(self._btn("Reboot Device", self.sigRebootDevice), 4, 0)
         grid.addWidget(self._btn("Get Device IP", self.sigGetDeviceIp), 5, 0)
-        grid.addWidget(self._btn("Go Background (HOME)", self.sigGoHome), 6, 0)
-        grid.addWidget(self._btn("Open RCU Control", self.sigOpenRcu), 7, 0)
+        grid.addWidget(self._btn("Device Info", self.sigDeviceInfo), 6, 0)
+        grid.addWidget(self._btn("Go Background (HOME)", self.sigGoHome), 7, 0)
+        grid.addWidget(self._btn("Open RCU Control", self.sigOpenRcu), 8, 0)
+        grid.addWidget(self._btn("Fleet Inventory", self.sigFleetInventory), 9, 0)
 
         # ==== PROD COLUMN ====
         grid.addWidget(QLabel("<b>Prod Version</b>"), 0, 1)
@@ -67,6 +85,32 @@ class ActionsGrid(QWidget):
         grid.addWidget(QLabel("<b>Appium Server</b>"), 0, 3)
         grid.addWidget(self._btn("Start Appium Server", self.sigStartAppium), 1, 3)
         grid.addWidget(self._btn("Kill Appium Server", self.sigKillAppium), 2, 3)
+        self.direct_uia2 = QCheckBox("Direct UiAutomator2")
+        self.direct_uia2.setToolTip("New sessions talk to the on-device UiAutomator2 server directly "
+                                    "(adb forward), skipping the Appium server hop")
+        self.direct_uia2.toggled.connect(self.sigDirectUia2Toggled)
+        grid.addWidget(self.direct_uia2, 3, 3)
+
+        # ==== TOOLS COLUMN ====
+        grid.addWidget(QLabel("<b>Tools</b>"), 0, 4)
+        grid.addWidget(self._btn("Push Files...", self.sigPushFiles), 1, 4)
+        grid.addWidget(self._btn("Pull Files...", self.sigPullFiles), 2, 4)
+        grid.addWidget(self._btn("Collect Diagnostics", self.sigCollectDiagnostics), 3, 4)
+        grid.addWidget(self._btn("App Start Benchmark...", self.sigBenchmarkAppStart), 4, 4)
+        grid.addWidget(self._btn("Frame Rate / Jank", self.sigOpenJank), 5, 4)
+        grid.addWidget(self._btn("CPU / Memory", self.sigOpenResources), 6, 4)
+        grid.addWidget(self._btn("Run Scenario...", self.sigRunScenario), 7, 4)
+        grid.addWidget(self._btn("Job Queue", self.sigOpenJobs), 8, 4)
+        grid.addWidget(self._btn("Search Logs", self.sigOpenLogs), 9, 4)
+        grid.addWidget(self._btn("Visual Diff...", self.sigVisualSweep), 10, 4)
+        grid.addWidget(self._btn("Key Latency...", self.sigKeyLatency), 11, 4)
+
+        # ==== SELECTED APK ====
+        self.apk_label.setStyleSheet("QLabel { color: #9E9E9E; }")
+        grid.addWidget(self.apk_label, 12, 0, 1, 5)
+
+    def set_selected_apk(self, text: str) -> None:
+        self.apk_label.setText(f"Selected APK: {text}")
 
     # -------------------- Helper -------------------- #
     def _btn(self, text: str, signal_obj: SignalInstance) -> QPushButton:
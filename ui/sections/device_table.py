@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import fields
+from typing import Any, Dict, List
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, QTimer, Signal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QAbstractItemView, QHeaderView, QLabel, QTableView, QVBoxLayout, QWidget
+
+from core.constants import FLEET_UI_FLUSH_MS
+from core.fleet import DeviceRow
+
+_COLUMNS = (
+    ("serial", "Device"),
+    ("state", "State"),
+    ("model", "Model"),
+    ("prod_version", "FreeTV Prod"),
+    ("uat_version", "FreeTV UAT"),
+    ("last_operation", "Last Operation"),
+    ("last_duration_ms", "Duration"),
+    ("updated_at", "Updated"),
+)
+_FIELDS = {f.name for f in fields(DeviceRow)}
+_STATE_COLORS = {"device": "#4CAF50", "offline": "#FF9800", "unauthorized": "#FF9800", "missing": "#9E9E9E"}
+
+
+class FleetTableModel(QAbstractTableModel):
+    """
+    One row per device, never reset: new devices are appended with beginInsertRows and
+    changed rows emit dataChanged for the changed span only, so selection and scroll
+    position survive every refresh.
+    """
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._rows: List[DeviceRow] = []
+        self._index: Dict[str, int] = {}
+
+    # ---- Qt model API ----
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(_COLUMNS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return _COLUMNS[section][1]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        name = _COLUMNS[index.column()][0]
+        value = getattr(row, name)
+        if role == Qt.ItemDataRole.DisplayRole:
+            if name == "last_duration_ms":
+                if value is None:
+                    return ""
+                return f"{value / 1000:.1f}s" if value >= 1000 else f"{value:.0f}ms"
+            if name == "updated_at":
+                return time.strftime("%H:%M:%S", time.localtime(value)) if value else ""
+            return value
+        if role == Qt.ItemDataRole.UserRole:  # raw value for sorting
+            return -1 if value is None else value
+        if role == Qt.ItemDataRole.ForegroundRole and name == "state" and value in _STATE_COLORS:
+            return QColor(_STATE_COLORS[value])
+        return None
+
+    # ---- Updates ----
+    def apply(self, updates: Dict[str, Dict[str, object]]) -> None:
+        """Merge {serial: {field: value}}: changed rows get one dataChanged span, new rows one insert."""
+        new = [s for s in updates if s not in self._index]
+        first = last = None
+        for serial, changes in updates.items():
+            i = self._index.get(serial)
+            if i is None:
+                continue
+            row = self._rows[i]
+            changed = False
+            for name, value in changes.items():
+                if name in _FIELDS and getattr(row, name) != value:
+                    setattr(row, name, value)
+                    changed = True
+            if changed:
+                first = i if first is None else min(first, i)
+                last = i if last is None else max(last, i)
+        if first is not None:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(_COLUMNS) - 1))
+        if new:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(new) - 1)
+            for serial in new:
+                row = DeviceRow(serial)
+                for name, value in updates[serial].items():
+                    if name in _FIELDS:
+                        setattr(row, name, value)
+                self._index[serial] = len(self._rows)
+                self._rows.append(row)
+            self.endInsertRows()
+
+    def serial_at(self, row: int) -> str:
+        return self._rows[row].serial
+
+
+class DeviceTable(QWidget):
+    """
+    Fleet view: state, model, installed FreeTV builds and the last operation per device.
+
+    post() may be called from any thread (it only merges into a pending dict); a GUI-thread
+    timer applies the pending updates every FLEET_UI_FLUSH_MS, so a fleet-wide operation
+    costs one model update per tick instead of one queued signal per log line.
+
+    Public API:
+      - post(serial, changes)
+      - selected_serials() -> list[str]
+      - sigSelectionChanged(list)
+    """
+
+    sigSelectionChanged = Signal(list)
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.model = FleetTableModel(self)
+        self._proxy = QSortFilterProxyModel(self)
+        self._proxy.setSourceModel(self.model)
+        self._proxy.setSortRole(Qt.ItemDataRole.UserRole)
+        self._pending: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+
+        self.view = QTableView(self)
+        self.view.setModel(self._proxy)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setSortingEnabled(True)
+        self.view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.view.verticalHeader().setVisible(False)
+        self.view.verticalHeader().setDefaultSectionSize(22)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.view.horizontalHeader().setStretchLastSection(True)
+        self.view.selectionModel().selectionChanged.connect(
+            lambda *_: self.sigSelectionChanged.emit(self.selected_serials())
+        )
+
+        self._hint = QLabel("No devices selected: actions use the IP field")
+        self._hint.setStyleSheet("QLabel { color: #9E9E9E; }")
+        self.sigSelectionChanged.connect(self._update_hint)
+
+        root = QVBoxLayout(self)
+        root.setContentsMargins(0, 4, 0, 0)
+        root.setSpacing(4)
+        root.addWidget(QLabel("<b>Devices</b>"))
+        root.addWidget(self.view)
+        root.addWidget(self._hint)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(FLEET_UI_FLUSH_MS)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start()
+
+    def post(self, serial: str, changes: Dict[str, object]) -> None:
+        """Queue a row update (thread-safe); later values for the same field win."""
+        with self._lock:
+            self._pending.setdefault(serial, {}).update(changes)
+
+    def _flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            updates, self._pending = self._pending, {}
+        self.model.apply(updates)
+
+    def selected_serials(self) -> List[str]:
+        rows = {self._proxy.mapToSource(i).row() for i in self.view.selectionModel().selectedRows()}
+        return [self.model.serial_at(r) for r in sorted(rows)]
+
+    def _update_hint(self, serials: List[str]) -> None:
+        if not serials:
+            self._hint.setText("No devices selected: actions use the IP field")
+        else:
+            self._hint.setText(f"{len(serials)} device(s) selected: actions run on all of them")
+
+    def stop(self) -> None:
+        self._timer.stop()
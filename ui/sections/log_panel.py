@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from pathlib import Path
 
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton
 
-from core.constants import LOG_PATH
+from core.logger import clear_log_file
 
 
 class LogPanel(QWidget):
@@ -66,11 +65,10 @@ class LogPanel(QWidget):
     def clear(self) -> None:
         """
         Clear the on-disk log file (LOG_PATH) and the UI text area.
+        The file truncation is queued to the logging thread, so the UI never touches disk.
         """
         try:
-            log_path = Path(LOG_PATH)
-            log_path.parent.mkdir(parents=True, exist_ok=True)
-            log_path.write_text("", encoding="utf-8")
+            clear_log_file()
         except Exception as e:
             self.output.clear()
             self.append_line(
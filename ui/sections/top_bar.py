@@ -10,6 +10,7 @@ from core.constants import BUTTON_STYLE
 class TopBar(QWidget):
     sigConnectDevice = Signal()
     sigDisconnectDevice = Signal()
+    sigScanNetwork = Signal()
     sigConnectAccount = Signal()
 
     def __init__(self, parent: QWidget | None = None) -> None:
@@ -44,6 +45,11 @@ class TopBar(QWidget):
         self._style_button(btn_disconnect, width=top_btn_width, height=row_height)
         btn_disconnect.clicked.connect(self.sigDisconnectDevice.emit)
         ip_row.addWidget(btn_disconnect)
+
+        btn_scan = QPushButton("Scan Network")
+        self._style_button(btn_scan, width=top_btn_width, height=row_height)
+        btn_scan.clicked.connect(self.sigScanNetwork.emit)
+        ip_row.addWidget(btn_scan)
         root.addLayout(ip_row)
 
         root.addWidget(QLabel("Enter Phone:"))
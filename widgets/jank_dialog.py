@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import (
+    QComboBox, QDialog, QFileDialog, QFormLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout
+)
+
+from core.constants import BUTTON_STYLE, FREETV_PROD_PACKAGE, FREETV_UAT_PACKAGE
+from core.frame_stats import FrameSample, JankSampler
+from core.rcu_manager import RcuManager, parse_key_sequence
+from ui.background import run_in_background
+from widgets.live_chart import LiveChart
+
+
+class JankDialog(QDialog):
+    """
+    Live frame-time / jank view for the FreeTV app (gfxinfo framestats).
+
+    - Start / Stop: continuous sampling, one point per poll.
+    - Run & Measure: plays an RCU key sequence (e.g. a scroll through the channel grid)
+      while sampling and logs one jank score for it.
+    """
+
+    sigSample = Signal(object)
+
+    def __init__(self, log_func, adb, device_ip_func: Callable[[], Optional[str]], parent=None):
+        super().__init__(parent)
+        self.log = log_func
+        self.adb = adb
+        self.rcu = RcuManager(adb, lambda *_: None)  # key-by-key output would flood the log
+        self.device_ip_func = device_ip_func
+        self.sampler: Optional[JankSampler] = None
+        self.setWindowTitle("Frame Rate / Jank")
+        self._init_ui()
+        self.sigSample.connect(self._on_sample)
+
+    # ---------- UI ----------
+
+    def _init_ui(self) -> None:
+        root = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.package = QComboBox()
+        self.package.addItem("FreeTV Prod", FREETV_PROD_PACKAGE)
+        self.package.addItem("FreeTV UAT", FREETV_UAT_PACKAGE)
+        form.addRow("Package:", self.package)
+
+        self.sequence = QLineEdit("DOWN*10, UP*10")
+        self.sequence.setToolTip("Key names or keycodes; '*N' repeats, e.g. RIGHT*20, OK")
+        form.addRow("RCU sequence:", self.sequence)
+
+        csv_row = QHBoxLayout()
+        self.csv_path = QLineEdit()
+        self.csv_path.setPlaceholderText("optional: stream samples to CSV")
+        browse = QPushButton("...")
+        browse.clicked.connect(self._browse_csv)
+        csv_row.addWidget(self.csv_path)
+        csv_row.addWidget(browse)
+        form.addRow("CSV:", csv_row)
+        root.addLayout(form)
+
+        self.chart = LiveChart("Frame time per poll", "ms")
+        root.addWidget(self.chart)
+        self.status = QLabel("Idle")
+        root.addWidget(self.status)
+
+        buttons = QHBoxLayout()
+        self.start_btn = QPushButton("Start")
+        self.stop_btn = QPushButton("Stop")
+        self.measure_btn = QPushButton("Run && Measure")
+        for b in (self.start_btn, self.stop_btn, self.measure_btn):
+            b.setStyleSheet(BUTTON_STYLE)
+            buttons.addWidget(b)
+        self.stop_btn.setEnabled(False)
+        self.start_btn.clicked.connect(self._start)
+        self.stop_btn.clicked.connect(self._stop)
+        self.measure_btn.clicked.connect(self._measure)
+        root.addLayout(buttons)
+
+    def _browse_csv(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, "Save samples", "jank.csv", "CSV Files (*.csv)")
+        if path:
+            self.csv_path.setText(path)
+
+    # ---------- Sampling ----------
+
+    def _new_sampler(self) -> JankSampler:
+        self.chart.clear()
+        return JankSampler(
+            self.adb.run,
+            self.package.currentData(),
+            self.device_ip_func(),
+            csv_path=self.csv_path.text().strip() or None,
+            on_sample=self.sigSample.emit,  # called on the sampler thread; queued to the GUI
+        )
+
+    def _set_running(self, running: bool) -> None:
+        self.start_btn.setEnabled(not running)
+        self.measure_btn.setEnabled(not running)
+        self.stop_btn.setEnabled(running)
+
+    def _start(self) -> None:
+        self.sampler = self._new_sampler()
+        self._set_running(True)
+        self.status.setText("Sampling...")
+        run_in_background(
+            self.sampler.start,
+            on_done=lambda _: self.chart.set_reference(f"{self.sampler.budget_ms:.1f}ms budget",
+                                                       self.sampler.budget_ms),
+            on_error=self._on_error,
+        )
+
+    def _stop(self) -> None:
+        if self.sampler is None:
+            return
+        run_in_background(self.sampler.stop, on_done=self._on_result, on_error=self._on_error)
+
+    def _measure(self) -> None:
+        try:
+            keys = parse_key_sequence(self.sequence.text())
+        except ValueError as e:
+            self.status.setText(str(e))
+            return
+        sampler = self.sampler = self._new_sampler()
+        device_ip = self.device_ip_func()
+        self._set_running(True)
+        self.stop_btn.setEnabled(False)
+        self.status.setText(f"Playing {len(keys)} key(s) and measuring...")
+        run_in_background(
+            sampler.measure,
+            lambda: self.rcu.press_sequence(keys, device_ip=device_ip, delay=0.15),
+            on_done=self._on_result,
+            on_error=self._on_error,
+        )
+
+    def _on_sample(self, sample: FrameSample) -> None:
+        self.chart.add_point("p50", sample.p50_ms)
+        self.chart.add_point("p90", sample.p90_ms)
+        self.chart.add_point("p99", sample.p99_ms)
+        self.status.setText(
+            f"{sample.frames} frames, {sample.jank_pct:.1f}% janky, p90 {sample.p90_ms:.1f}ms"
+            + (" (frames missed between polls)" if sample.overflow else "")
+        )
+
+    def _on_result(self, result: FrameSample) -> None:
+        self._set_running(False)
+        text = (
+            f"Jank: {result.jank_pct:.1f}% ({result.janky}/{result.frames} frames, "
+            f"{result.missed_vsyncs} missed vsyncs), p50 {result.p50_ms:.1f}ms, "
+            f"p90 {result.p90_ms:.1f}ms, p99 {result.p99_ms:.1f}ms, max {result.max_ms:.1f}ms"
+        )
+        self.status.setText(text)
+        self.log(text)
+
+    def _on_error(self, msg: str) -> None:
+        self._set_running(False)
+        self.status.setText(f"Error: {msg}")
+        self.log(f"Jank sampler error: {msg}", "ERROR")
+
+    def closeEvent(self, event) -> None:
+        if self.sampler is not None:
+            run_in_background(self.sampler.stop)  # joins the poll thread; keep it off the GUI thread
+        super().closeEvent(event)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Any, List, Set
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import (
+    QAbstractItemView, QDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableView, QVBoxLayout
+)
+
+from core.constants import BUTTON_STYLE
+from core.jobs import FINISHED, PENDING, RUNNING, Job, JobScheduler
+
+_COLUMNS = ("#", "Device", "Job", "Priority", "State", "Waited", "Duration", "Error")
+_STATE_COLORS = {"running": "#2196F3", "done": "#4CAF50", "failed": "#f44336",
+                 "timeout": "#f44336", "cancelled": "#9E9E9E"}
+
+
+def _seconds(value) -> str:
+    return "" if value is None else f"{value:.1f}s"
+
+
+class JobTableModel(QAbstractTableModel):
+    """Rows follow the scheduler's job list: appended / removed in ranges, live rows updated in place."""
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._jobs: List[Job] = []
+        self._live: Set[int] = set()   # ids that were pending / running at the last refresh
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._jobs)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(_COLUMNS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return _COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        job = self._jobs[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return (job.id, job.device, job.name, job.priority, job.state,
+                    _seconds(job.waited), _seconds(job.duration), job.error)[index.column()]
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 4 and job.state in _STATE_COLORS:
+            return QColor(_STATE_COLORS[job.state])
+        return None
+
+    def refresh(self, jobs: List[Job]) -> None:
+        """Jobs come sorted by id: evicted ones are removed (usually from the front), new ones appended."""
+        present = {j.id for j in jobs}
+        row = len(self._jobs) - 1
+        while row >= 0:  # remove contiguous runs of evicted jobs, bottom up
+            if self._jobs[row].id in present:
+                row -= 1
+                continue
+            end = row
+            while row >= 0 and self._jobs[row].id not in present:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, end)
+            del self._jobs[row + 1:end + 1]
+            self.endRemoveRows()
+        known = {j.id for j in self._jobs}
+        new = [j for j in jobs if j.id not in known]
+        # Pending / running rows change every tick (waited / duration), plus once more when they
+        # finish; finished rows never change again.
+        active = [i for i, j in enumerate(self._jobs) if j.state in (PENDING, RUNNING) or j.id in self._live]
+        if active:
+            self.dataChanged.emit(self.index(active[0], 0), self.index(active[-1], len(_COLUMNS) - 1))
+        self._live = {j.id for j in jobs if j.state in (PENDING, RUNNING)}
+        if new:
+            start = len(self._jobs)
+            self.beginInsertRows(QModelIndex(), start, start + len(new) - 1)
+            self._jobs.extend(new)
+            self.endInsertRows()
+
+    def job_at(self, row: int) -> Job:
+        return self._jobs[row]
+
+
+class JobQueueDialog(QDialog):
+    """Pending / running / finished jobs of the scheduler (see core.jobs), refreshed twice a second."""
+
+    def __init__(self, scheduler: JobScheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.setWindowTitle("Job Queue")
+        self.resize(900, 420)
+        self.model = JobTableModel(self)
+        self._init_ui()
+        self._timer = QTimer(self)
+        self._timer.setInterval(500)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start()
+        self._refresh()
+
+    # ---------- UI ----------
+
+    def _init_ui(self) -> None:
+        root = QVBoxLayout(self)
+        self.view = QTableView(self)
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.verticalHeader().setVisible(False)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.view.horizontalHeader().setStretchLastSection(True)
+        root.addWidget(self.view)
+        self.status = QLabel("")
+        root.addWidget(self.status)
+
+        buttons = QHBoxLayout()
+        cancel_selected = QPushButton("Cancel Selected")
+        cancel_pending = QPushButton("Cancel All Pending")
+        for b in (cancel_selected, cancel_pending):
+            b.setStyleSheet(BUTTON_STYLE)
+            buttons.addWidget(b)
+        cancel_selected.clicked.connect(self._cancel_selected)
+        cancel_pending.clicked.connect(self._cancel_pending)
+        root.addLayout(buttons)
+
+    # ---------- Actions ----------
+
+    def _refresh(self) -> None:
+        self.model.refresh(self.scheduler.jobs())
+        self.status.setText(self.scheduler.summary())
+
+    def _cancel_selected(self) -> None:
+        for index in self.view.selectionModel().selectedRows():
+            job = self.model.job_at(index.row())
+            if job.state not in FINISHED:
+                self.scheduler.cancel(job.id)
+        self._refresh()
+
+    def _cancel_pending(self) -> None:
+        for job in self.scheduler.jobs():
+            if job.state == PENDING:
+                self.scheduler.cancel(job.id)
+        self._refresh()
+
+    def closeEvent(self, event) -> None:
+        self._timer.stop()
+        super().closeEvent(event)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QPointF, QRectF, Qt
+from PySide6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PySide6.QtWidgets import QSizePolicy, QWidget
+
+SERIES_COLORS = ["#4FC3F7", "#FFB74D", "#E57373", "#81C784", "#BA68C8", "#FFF176"]
+
+
+class LiveChart(QWidget):
+    """
+    Minimal scrolling line chart (QPainter only, no QtCharts dependency).
+
+    Each series keeps the last `capacity` points; the Y axis auto-scales to the visible
+    data and optional reference lines (e.g. the frame budget). Call add_point() from the
+    GUI thread; repaints are coalesced by Qt.
+    """
+
+    def __init__(self, title: str = "", unit: str = "", capacity: int = 120, parent=None) -> None:
+        super().__init__(parent)
+        self.title = title
+        self.unit = unit
+        self.capacity = capacity
+        self._series: Dict[str, Tuple[Deque[float], QColor]] = {}
+        self._refs: List[Tuple[str, float]] = []
+        self.setMinimumSize(420, 180)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    # ---------- Data ----------
+
+    def add_series(self, name: str, color: Optional[str] = None) -> None:
+        if name not in self._series:
+            color = color or SERIES_COLORS[len(self._series) % len(SERIES_COLORS)]
+            self._series[name] = (deque(maxlen=self.capacity), QColor(color))
+
+    def add_point(self, name: str, value: float) -> None:
+        self.add_series(name)
+        self._series[name][0].append(float(value))
+        self.update()
+
+    def set_reference(self, label: str, value: float) -> None:
+        self._refs = [(lbl, v) for lbl, v in self._refs if lbl != label] + [(label, float(value))]
+        self.update()
+
+    def clear(self) -> None:
+        for values, _ in self._series.values():
+            values.clear()
+        self.update()
+
+    # ---------- Painting ----------
+
+    def paintEvent(self, event) -> None:
+        p = QPainter(self)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.fillRect(self.rect(), QColor("#1E1E1E"))
+        plot = QRectF(self.rect()).adjusted(48, 24, -12, -20)
+        p.setPen(QPen(QColor("#555555"), 1))
+        p.drawRect(plot)
+
+        values = [v for data, _ in self._series.values() for v in data] + [v for _, v in self._refs]
+        top = max(values) * 1.1 if values and max(values) > 0 else 1.0
+
+        def y_of(v: float) -> float:
+            return plot.bottom() - (v / top) * plot.height()
+
+        p.setPen(QColor("#DDDDDD"))
+        p.drawText(QRectF(plot.left(), 2, plot.width(), 20), Qt.AlignmentFlag.AlignLeft, self.title)
+        for frac in (0.0, 0.5, 1.0):
+            v = top * frac
+            p.drawText(QRectF(0, y_of(v) - 8, 44, 16), Qt.AlignmentFlag.AlignRight, f"{v:.0f}{self.unit}")
+
+        for label, v in self._refs:
+            p.setPen(QPen(QColor("#9E9E9E"), 1, Qt.PenStyle.DashLine))
+            p.drawLine(QPointF(plot.left(), y_of(v)), QPointF(plot.right(), y_of(v)))
+            p.drawText(QPointF(plot.left() + 4, y_of(v) - 3), label)
+
+        step = plot.width() / max(1, self.capacity - 1)
+        legend_x = plot.right()
+        for name, (data, color) in reversed(list(self._series.items())):
+            if data:
+                x0 = plot.right() - (len(data) - 1) * step
+                poly = QPolygonF([QPointF(x0 + i * step, y_of(v)) for i, v in enumerate(data)])
+                p.setPen(QPen(color, 2))
+                p.drawPolyline(poly)
+            text = f"{name}: {data[-1]:.1f}" if data else name
+            width = p.fontMetrics().horizontalAdvance(text) + 12
+            legend_x -= width
+            p.setPen(color)
+            p.drawText(QRectF(legend_x, 2, width, 20), Qt.AlignmentFlag.AlignRight, text)
+        p.end()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from PySide6.QtCore import QAbstractTableModel, QDateTime, QModelIndex, Qt, QTimer
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import (
+    QAbstractItemView, QCheckBox, QComboBox, QDateTimeEdit, QDialog, QHBoxLayout, QHeaderView, QLabel,
+    QLineEdit, QPlainTextEdit, QPushButton, QSplitter, QTableView, QVBoxLayout,
+)
+
+from core.constants import BUTTON_STYLE, LOG_SEARCH_PAGE
+from core.log_search import LEVELS, LogHit, LogQuery, LogSearch
+from ui.background import run_in_background
+
+_COLUMNS = ("Time", "Level", "Message", "File")
+_LEVEL_COLORS = {"WARNING": "#FF9800", "ERROR": "#f44336", "CRITICAL": "#f44336", "DEBUG": "#9E9E9E"}
+# (label, seconds back from now); None = any time, -1 = custom range
+_RANGES = (("Any time", None), ("Last 15 minutes", 900), ("Last hour", 3600), ("Last 24 hours", 86400),
+           ("Last 7 days", 7 * 86400), ("Custom", -1))
+
+
+class LogResultsModel(QAbstractTableModel):
+    """Rows are pulled from a LogSearch generator one page at a time as the view scrolls (fetchMore)."""
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._hits: List[LogHit] = []
+        self._source: Optional[Iterator[LogHit]] = None
+
+    def reset(self, source: Optional[Iterator[LogHit]]) -> None:
+        self.beginResetModel()
+        self._hits, self._source = [], source
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._hits)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(_COLUMNS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return _COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        hit = self._hits[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == 0:
+                return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(hit.ts))
+            if index.column() == 2:
+                # Drop the "[ts] [LEVEL] " prefix the first two columns already show.
+                return hit.first_line.split("] ", 2)[-1] if hit.first_line.startswith("[") else hit.first_line
+            return (None, hit.level, None, hit.source)[index.column()]
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 1 and hit.level in _LEVEL_COLORS:
+            return QColor(_LEVEL_COLORS[hit.level])
+        return None
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._source is not None
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if self._source is None:
+            return
+        page: List[LogHit] = []
+        for hit in self._source:
+            page.append(hit)
+            if len(page) >= LOG_SEARCH_PAGE:
+                break
+        else:
+            self._source = None  # exhausted
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._hits), len(self._hits) + len(page) - 1)
+            self._hits.extend(page)
+            self.endInsertRows()
+
+    def hit_at(self, row: int) -> LogHit:
+        return self._hits[row]
+
+    @property
+    def exhausted(self) -> bool:
+        return self._source is None
+
+
+class LogBrowserDialog(QDialog):
+    """
+    Search the current and rotated tool logs (see core.log_search): regex, levels and a
+    time range; results are newest first and load page by page while scrolling.
+    """
+
+    def __init__(self, search: LogSearch, parent=None):
+        super().__init__(parent)
+        self.search = search
+        self.setWindowTitle("Log Browser")
+        self.resize(1100, 650)
+        self.model = LogResultsModel(self)
+        self._indexing = False
+        self._init_ui()
+        self._follow_timer = QTimer(self)
+        self._follow_timer.setInterval(2000)
+        self._follow_timer.timeout.connect(self._reindex)  # new lines; re-searched if the newest rows are in view
+        self._reindex(then_search=True)
+
+    # ---------- UI ----------
+
+    def _init_ui(self) -> None:
+        root = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        self.pattern = QLineEdit()
+        self.pattern.setPlaceholderText("Regex, e.g. install_apk|192\\.168\\.1\\.25")
+        self.pattern.returnPressed.connect(self._run_search)
+        filters.addWidget(self.pattern, 1)
+        self.ignore_case = QCheckBox("Ignore case")
+        self.ignore_case.setChecked(True)
+        filters.addWidget(self.ignore_case)
+        self.levels = {}
+        for name in LEVELS:
+            if name == "CRITICAL":
+                continue
+            box = QCheckBox(name.title())
+            box.setChecked(name != "DEBUG")
+            self.levels[name] = box
+            filters.addWidget(box)
+        root.addLayout(filters)
+
+        times = QHBoxLayout()
+        self.range = QComboBox()
+        for label, seconds in _RANGES:
+            self.range.addItem(label, seconds)
+        self.range.currentIndexChanged.connect(self._on_range)
+        times.addWidget(self.range)
+        now = QDateTime.currentDateTime()
+        self.since = QDateTimeEdit(now.addDays(-1))
+        self.until = QDateTimeEdit(now)
+        for edit in (self.since, self.until):
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+            edit.setCalendarPopup(True)
+            edit.setEnabled(False)
+        times.addWidget(QLabel("From"))
+        times.addWidget(self.since)
+        times.addWidget(QLabel("to"))
+        times.addWidget(self.until)
+        times.addStretch(1)
+        self.follow = QCheckBox("Follow")
+        self.follow.toggled.connect(self._on_follow)
+        times.addWidget(self.follow)
+        self.search_btn = QPushButton("Search")
+        self.search_btn.setStyleSheet(BUTTON_STYLE)
+        self.search_btn.clicked.connect(self._run_search)
+        times.addWidget(self.search_btn)
+        root.addLayout(times)
+
+        splitter = QSplitter(Qt.Orientation.Vertical, self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.view.verticalHeader().setVisible(False)
+        self.view.verticalHeader().setDefaultSectionSize(20)
+        header = self.view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.view.setColumnWidth(0, 150)
+        self.view.setColumnWidth(1, 70)
+        self.view.selectionModel().currentRowChanged.connect(self._show_record)
+        splitter.addWidget(self.view)
+        self.detail = QPlainTextEdit()
+        self.detail.setReadOnly(True)
+        splitter.addWidget(self.detail)
+        splitter.setSizes([480, 140])
+        root.addWidget(splitter, 1)
+
+        self.status = QLabel("Indexing logs...")
+        root.addWidget(self.status)
+
+    # ---------- Actions ----------
+
+    def _query(self) -> LogQuery:
+        seconds = self.range.currentData()
+        since = until = None
+        if seconds == -1:
+            since = float(self.since.dateTime().toSecsSinceEpoch())
+            until = float(self.until.dateTime().toSecsSinceEpoch())
+        elif seconds is not None:
+            since = time.time() - seconds
+        levels = frozenset(name for name, box in self.levels.items() if box.isChecked())
+        if "ERROR" in levels:
+            levels |= {"CRITICAL"}
+        return LogQuery(self.pattern.text().strip(), levels if len(levels) < len(LEVELS) else frozenset(),
+                        since, until, self.ignore_case.isChecked())
+
+    def _reindex(self, then_search: bool = False) -> None:
+        if self._indexing:
+            return
+        self._indexing = True
+        run_in_background(
+            self.search.refresh,
+            on_done=lambda added: self._on_indexed(added, then_search),
+            on_error=self._on_index_failed,
+        )
+
+    def _on_indexed(self, added: int, then_search: bool) -> None:
+        self._indexing = False
+        if then_search or (added and self._at_top()):
+            self._run_search()
+
+    def _on_index_failed(self, message: str) -> None:
+        self._indexing = False
+        self.status.setText(f"Indexing failed: {message}")
+
+    def _run_search(self) -> None:
+        try:
+            query = self._query()
+            query.regex()
+        except re.error as e:
+            self.status.setText(f"Invalid regex: {e}")
+            return
+        start = time.perf_counter()
+        self.model.reset(self.search.search(query))
+        self.model.fetchMore()
+        files, records, size = self.search.stats()
+        shown = f"{self.model.rowCount()}{'' if self.model.exhausted else '+'}"
+        self.status.setText(f"{shown} match(es) in {(time.perf_counter() - start) * 1000:.0f} ms — "
+                            f"{records} records in {files} file(s), {size / 1e6:.1f} MB indexed")
+        self.detail.clear()
+
+    def _show_record(self, current: QModelIndex, _previous: QModelIndex) -> None:
+        if current.isValid():
+            self.detail.setPlainText(self.model.hit_at(current.row()).text)
+
+    def _on_range(self) -> None:
+        custom = self.range.currentData() == -1
+        self.since.setEnabled(custom)
+        self.until.setEnabled(custom)
+
+    def _on_follow(self, enabled: bool) -> None:
+        if enabled:
+            self._follow_timer.start()
+        else:
+            self._follow_timer.stop()
+
+    def _at_top(self) -> bool:
+        return self.view.verticalScrollBar().value() == 0
+
+    def closeEvent(self, event) -> None:
+        self._follow_timer.stop()
+        super().closeEvent(event)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QSizePolicy
+    QCheckBox, QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QSizePolicy
 )
 from PySide6.QtCore import Qt, QSize
 
@@ -41,10 +41,11 @@ class RCUDialog(QDialog):
     －     🔇      CH↓
     """
 
-    def __init__(self, log_func, adb, parent=None):
+    def __init__(self, log_func, adb, parent=None, *, send_key=None):
         super().__init__(parent)
         self.log = log_func
         self.adb = adb
+        self.send_key = send_key  # optional: send_key(name, code) queues the key instead of sending it here
         self.setWindowTitle("RCU Control")
         self._init_ui()
         # lock window to its content (prevents extra gaps)
@@ -142,10 +143,25 @@ class RCUDialog(QDialog):
 
         root.addLayout(bottom)
 
+        # === Injection backend: `input keyevent` per key, or a persistent monkey server ===
+        self.fast_keys = QCheckBox("Fast keys (monkey)")
+        self.fast_keys.setToolTip("Send keys over a persistent `monkey --port` connection instead of "
+                                  "`adb shell input keyevent` (falls back to it if monkey can't start)")
+        self.fast_keys.setChecked(getattr(self.adb, "key_backend", "input") == "monkey")
+        self.fast_keys.toggled.connect(self._on_fast_keys)
+        root.addWidget(self.fast_keys, alignment=Qt.AlignmentFlag.AlignCenter)
+
     # ---------- Send Keys ----------
 
+    def _on_fast_keys(self, enabled: bool) -> None:
+        self.adb.key_backend = "monkey" if enabled else "input"
+        self.log(f"RCU: key injection via {self.adb.key_backend}")
+
     def _send_key(self, name: str, code: int) -> None:
         """Always send a normal keyevent."""
+        if self.send_key is not None:
+            self.send_key(name, code)
+            return
         try:
             out = self.adb.keyevent(code)
             self.log(f"RCU: {name} ({code}) → {out}")
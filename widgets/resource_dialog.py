@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+from PySide6.QtCore import QTimer, Signal
+from PySide6.QtWidgets import (
+    QComboBox, QDialog, QDoubleSpinBox, QFileDialog, QFormLayout, QHBoxLayout, QLabel, QPushButton, QVBoxLayout
+)
+
+from core.constants import BUTTON_STYLE, FREETV_PROD_PACKAGE, FREETV_UAT_PACKAGE, RESOURCE_SAMPLE_HZ
+from core.resource_sampler import ResourceSampler
+from ui.background import run_in_background
+from widgets.live_chart import LiveChart
+
+
+class ResourceDialog(QDialog):
+    """Live CPU% / RSS of the FreeTV app on the current device (see core.resource_sampler)."""
+
+    sigSample = Signal(object)
+
+    def __init__(self, log_func, adb, device_ip_func: Callable[[], Optional[str]], parent=None):
+        super().__init__(parent)
+        self.log = log_func
+        self.adb = adb
+        self.device_ip_func = device_ip_func
+        self.sampler: Optional[ResourceSampler] = None
+        self.setWindowTitle("CPU / Memory")
+        self._init_ui()
+        self.sigSample.connect(self._on_sample)
+        # The summary is recomputed over the whole buffer; once a second is plenty.
+        self._summary_timer = QTimer(self)
+        self._summary_timer.setInterval(1000)
+        self._summary_timer.timeout.connect(self._refresh_summary)
+
+    # ---------- UI ----------
+
+    def _init_ui(self) -> None:
+        root = QVBoxLayout(self)
+        form = QFormLayout()
+        self.package = QComboBox()
+        self.package.addItem("FreeTV Prod", FREETV_PROD_PACKAGE)
+        self.package.addItem("FreeTV UAT", FREETV_UAT_PACKAGE)
+        form.addRow("Package:", self.package)
+        self.rate = QDoubleSpinBox()
+        self.rate.setRange(0.5, 20.0)
+        self.rate.setSingleStep(0.5)
+        self.rate.setValue(RESOURCE_SAMPLE_HZ)
+        self.rate.setSuffix(" Hz")
+        form.addRow("Rate:", self.rate)
+        root.addLayout(form)
+
+        self.cpu_chart = LiveChart("CPU", "%", capacity=300)
+        self.mem_chart = LiveChart("Memory (RSS)", "MB", capacity=300)
+        root.addWidget(self.cpu_chart)
+        root.addWidget(self.mem_chart)
+        self.status = QLabel("Idle")
+        self.status.setWordWrap(True)
+        root.addWidget(self.status)
+
+        buttons = QHBoxLayout()
+        self.start_btn = QPushButton("Start")
+        self.stop_btn = QPushButton("Stop")
+        self.export_btn = QPushButton("Export CSV")
+        for b in (self.start_btn, self.stop_btn, self.export_btn):
+            b.setStyleSheet(BUTTON_STYLE)
+            buttons.addWidget(b)
+        self.stop_btn.setEnabled(False)
+        self.export_btn.setEnabled(False)
+        self.start_btn.clicked.connect(self._start)
+        self.stop_btn.clicked.connect(self._stop)
+        self.export_btn.clicked.connect(self._export)
+        root.addLayout(buttons)
+
+    # ---------- Actions ----------
+
+    def _start(self) -> None:
+        device_ip = self.device_ip_func()
+        self.sampler = ResourceSampler(
+            self.adb.serial(device_ip) if device_ip else None,
+            self.package.currentData(),
+            hz=self.rate.value(),
+            on_sample=self.sigSample.emit,  # reader thread -> queued to the GUI
+        )
+        self.cpu_chart.clear()
+        self.mem_chart.clear()
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.export_btn.setEnabled(True)
+        self.status.setText("Starting...")
+        self._summary_timer.start()
+        run_in_background(self.sampler.start, on_error=self._on_error)
+
+    def _stop(self) -> None:
+        if self.sampler is None:
+            return
+        self._summary_timer.stop()
+        self.start_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+        sampler = self.sampler
+        run_in_background(sampler.stop, on_done=lambda _: self._finish(sampler), on_error=self._on_error)
+
+    def _finish(self, sampler: ResourceSampler) -> None:
+        text = sampler.summary_text()
+        self.status.setText(text)
+        self.log(text)
+
+    def _export(self) -> None:
+        if self.sampler is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export samples", "resources.csv", "CSV Files (*.csv)")
+        if path:
+            rows = self.sampler.export_csv(path)
+            self.log(f"Exported {rows} resource sample(s) to {path}")
+
+    def _on_sample(self, sample: dict) -> None:
+        self.cpu_chart.add_point("app", sample["cpu_pct"])
+        self.cpu_chart.add_point("device", sample["sys_cpu_pct"])
+        self.mem_chart.add_point("RSS", sample["rss_kb"] / 1024)
+
+    def _refresh_summary(self) -> None:
+        if self.sampler is not None:
+            self.status.setText(self.sampler.summary_text())
+
+    def _on_error(self, msg: str) -> None:
+        self._summary_timer.stop()
+        self.start_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+        self.status.setText(f"Error: {msg}")
+        self.log(f"Resource sampler error: {msg}", "ERROR")
+
+    def closeEvent(self, event) -> None:
+        self._summary_timer.stop()
+        if self.sampler is not None and self.sampler.running:
+            run_in_background(self.sampler.stop)
+        super().closeEvent(event)